@@ -23,7 +23,9 @@ def create_app():
          resources={r"/*": {"origins": "*"}},
          supports_credentials=True,
          methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-         allow_headers=["Content-Type", "Authorization", "Access-Control-Allow-Origin"])
+         allow_headers=["Content-Type", "Authorization", "Access-Control-Allow-Origin"],
+         # Paginated listings return the next page's cursor in headers
+         expose_headers=["X-Next-Cursor", "Link", "X-Total-Count", "X-Cache"])
 
     # Configure MongoDB with connection options
     app.config["MONGO_URI"] = "mongodb://localhost:27017/eduspark"
@@ -82,15 +84,32 @@ def create_app():
     app.register_blueprint(opportunity_bp, url_prefix="/opportunity")
     app.register_blueprint(match_bp, url_prefix="/match")
 
-    # Health check endpoint to test MongoDB connection
+    from app.utils import embedding_service, write_behind, response_cache
+    from app.routes.student import groq_guard
+
+    # Health check endpoint to test MongoDB connection, embedding model readiness and the LLM upstream
     @app.route('/health')
     def health_check():
         try:
             # Test MongoDB connection
             mongo.db.command('ping')
-            return jsonify({"status": "ok", "message": "Database connection is healthy"}), 200
+            return jsonify({
+                "status": "ok",
+                "message": "Database connection is healthy",
+                "embedding_model": embedding_service.status(),
+                "llm_upstream": groq_guard.stats(),
+                "write_behind": write_behind.stats(),
+                "response_cache": response_cache.stats()
+            }), 200
         except Exception as e:
-            return jsonify({"status": "error", "message": f"Database error: {str(e)}"}), 500
+            return jsonify({
+                "status": "error",
+                "message": f"Database error: {str(e)}",
+                "embedding_model": embedding_service.status(),
+                "llm_upstream": groq_guard.stats(),
+                "write_behind": write_behind.stats(),
+                "response_cache": response_cache.stats()
+            }), 500
 
     # Serve static files from upload directory
     @app.route('/uploads/<path:filename>')
@@ -123,6 +123,15 @@ def register():
         result = collection.insert_one(new_user)
         user_id = result.inserted_id
 
+        if role == "mentor":
+            from app.routes.matching import mentor_index
+            from app.utils import response_cache
+            mentor_index.mark_stale()
+            response_cache.invalidate("mentors")
+        elif role == "student":
+            from app.routes.matching import match_table
+            match_table.mark_stale(user_id)
+
         # Create user response with only necessary fields
         user_response = {
             "id": str(user_id),
@@ -3,6 +3,7 @@ from app import mongo
 from bson.objectid import ObjectId
 from datetime import datetime
 import logging
+from app.utils import opportunity_hooks
 
 entrepreneur_bp = Blueprint('entrepreneur', __name__)
 
@@ -152,6 +153,7 @@ def create_opportunity(entrepreneur_id):
         
         result = mongo.db.opportunities.insert_one(opportunity)
         opportunity['_id'] = str(result.inserted_id)
+        opportunity_hooks.notify(opportunity['_id'], 'created')
         
         return jsonify(opportunity), 201
     except Exception as e:
@@ -189,6 +191,8 @@ def update_opportunity(entrepreneur_id, opportunity_id):
         
         # Remove None values
         update_data = {k: v for k, v in update_data.items() if v is not None}
+        # Lets other workers' search indexes notice the edit
+        update_data['updated_at'] = datetime.now().isoformat()
         
         result = mongo.db.opportunities.update_one(
             {'_id': ObjectId(opportunity_id)},
@@ -196,6 +200,7 @@ def update_opportunity(entrepreneur_id, opportunity_id):
         )
         
         if result.modified_count:
+            opportunity_hooks.notify(opportunity_id, 'updated')
             updated_opportunity = mongo.db.opportunities.find_one({'_id': ObjectId(opportunity_id)})
             updated_opportunity['_id'] = str(updated_opportunity['_id'])
             return jsonify(updated_opportunity), 200
@@ -223,6 +228,7 @@ def delete_opportunity(entrepreneur_id, opportunity_id):
         result = mongo.db.opportunities.delete_one({'_id': ObjectId(opportunity_id)})
         
         if result.deleted_count:
+            opportunity_hooks.notify(opportunity_id, 'deleted')
             return jsonify({'message': 'Opportunity deleted successfully'}), 200
         else:
             return jsonify({'error': 'Failed to delete opportunity'}), 500
@@ -319,6 +325,16 @@ def get_opportunity_applications(entrepreneur_id, opportunity_id):
                         'email': '',
                         'projects': []
                     }
+
+        if request.args.get('rank', 'false').lower() in ('true', '1', 't'):
+            # Best-fitting applicants first, scored against the opportunity's skills and description
+            from app.routes.matching import match_service
+            from app.utils.match_service import opportunity_text, student_text
+            applications = match_service.rank(
+                opportunity_text(opportunity),
+                applications,
+                lambda application: student_text(application.get('student') or {})
+            )
                 
         return jsonify(applications), 200
     except Exception as e:
@@ -1,16 +1,23 @@
-from flask import Flask, request, jsonify, Blueprint
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
-from sklearn.feature_extraction.text import TfidfVectorizer
+from flask import Flask, request, jsonify, Blueprint, Response, stream_with_context
 import numpy as np
+import os
+import json
+from datetime import datetime
 from pymongo import MongoClient
 from bson import ObjectId
+from app.utils.mentor_index import MentorEmbeddingIndex, DEFAULT_INDEX_DIR
+from app.utils import embedding_model, embedding_service
+from app.utils.tfidf_index import TfidfMentorIndex
+from app.utils.ann_index import AnnMentorIndex, top_k_indices, top_k_per_row
+from app.utils.embedding_cache import EmbeddingCache
+from app.utils.match_table import MatchTable
+from app.utils.facet_index import FACET_FIELDS, facet_values, parse_filters
+from app.utils.match_service import MatchService, opportunity_text
+from app.utils.opportunity_index import OpportunityIndex
+from app.utils import opportunity_hooks
 
 match_bp = Blueprint('match', __name__)
 
-# Load sentence embedding model
-embed_model = SentenceTransformer("intfloat/e5-small-v2")
-
 # MongoDB connection
 client = MongoClient("mongodb://localhost:27017/")
 db = client["eduspark"]
@@ -21,34 +28,204 @@ mentors_collection = db["mentors"]
 def list_to_text(lst):
     return " ".join(lst).lower()
 
-# Fetch mentor profiles
-def fetch_mentors():
-    mentors = []
-    for doc in mentors_collection.find({}, {"_id": 1, "expertise": 1}):
-        expertise = list_to_text(doc.get("expertise", []))
-        mentors.append({
-            "id": str(doc["_id"]),
-            "profile_text": expertise
-        })
-    return mentors
-
-# Fetch student profile
-def fetch_student_profile(student_id):
+# Inference goes through the shared micro-batching embedding service
+def encode_texts(texts):
+    return embedding_service.encode(texts)
+
+# Student interest embeddings keyed by content hash, optionally shared through Mongo
+student_embedding_cache = EmbeddingCache(
+    embedding_model.EMBED_MODEL_NAME,
+    max_size=int(os.getenv("STUDENT_EMBED_CACHE_SIZE", "10000")),
+    ttl=int(os.getenv("STUDENT_EMBED_CACHE_TTL", "86400")),
+    collection=db["embedding_cache"] if os.getenv("STUDENT_EMBED_CACHE_MONGO", "false").lower() in ("true", "1", "t") else None
+)
+
+def encode_students(texts):
+    return student_embedding_cache.get_many(texts, encode_texts)
+
+# Reverse matching (students for a mentor, applicants for an opportunity) through the same cache
+match_service = MatchService(encode_students)
+
+# Skill postings + embeddings over opportunities for the student recommendation feed
+opportunity_index = OpportunityIndex(
+    db["opportunities"],
+    encode=encode_texts,
+    text_fn=opportunity_text,
+    overlap_weight=float(os.getenv("OPPORTUNITY_REC_OVERLAP_WEIGHT", "0.5")),
+    refresh_interval=int(os.getenv("OPPORTUNITY_REC_REFRESH_SECONDS", "60"))
+)
+opportunity_hooks.subscribe(lambda opportunity_id, action: opportunity_index.mark_changed(opportunity_id))
+
+# Precomputed mentor embeddings, re-embedded only when a mentor's expertise changes
+mentor_index = MentorEmbeddingIndex(
+    mentors_collection,
+    encode=encode_texts,
+    text_fn=lambda doc: list_to_text(doc.get("expertise", [])),
+    model_name=embedding_model.EMBED_MODEL_NAME,
+    index_dir=os.getenv("MATCH_INDEX_DIR", DEFAULT_INDEX_DIR),
+    refresh_interval=int(os.getenv("MATCH_INDEX_REFRESH_SECONDS", "60")),
+    dtype=os.getenv("MATCH_INDEX_DTYPE", "float32"),
+    mmap=os.getenv("MATCH_INDEX_MMAP", "true").lower() in ("true", "1", "t"),
+    fields=("expertise",) + FACET_FIELDS,
+    facet_fn=facet_values
+)
+
+# Fitted TF-IDF model kept across requests, refit in the background after enough mentors change
+tfidf_index = TfidfMentorIndex(refit_ratio=float(os.getenv("MATCH_TFIDF_REFIT_RATIO", "0.1")))
+
+# IVF candidate generation for large mentor pools; small pools are scored exactly
+ann_index = AnnMentorIndex(
+    min_size=int(os.getenv("MATCH_ANN_MIN_MENTORS", "5000")),
+    n_probe=int(os.getenv("MATCH_ANN_PROBES", "8"))
+)
+
+DEFAULT_TOP_K = int(os.getenv("MATCH_DEFAULT_K", "50"))
+MAX_TOP_K = int(os.getenv("MATCH_MAX_K", "1000"))
+RERANK_CANDIDATES = int(os.getenv("MATCH_RERANK_CANDIDATES", "200"))
+BATCH_MAX_STUDENTS = int(os.getenv("MATCH_BATCH_MAX_STUDENTS", "1000"))
+# Upper bound on score-matrix cells held at once while streaming a batch
+BATCH_MAX_CELLS = int(os.getenv("MATCH_BATCH_MAX_CELLS", str(16 * 1024 * 1024)))
+
+def sync_mentor_indexes(snapshot):
+    """Bring the TF-IDF and ANN indexes in line with a mentor index snapshot (no-op if they are)"""
+    tfidf_index.sync(snapshot)
+    ann_index.sync(snapshot)
+
+def load_snapshot():
+    """
+    Current mentor snapshot with the TF-IDF and ANN indexes in line with it.
+    Once the background refresher is running this does no rescan; before
+    that it refreshes inline as needed.
+    """
+    mentor_index.refresh()
+    snapshot = mentor_index.snapshot()
+    sync_mentor_indexes(snapshot)
+    return snapshot
+
+def start_mentor_index():
+    """Rescan mentors and rebuild the derived indexes in the background (idempotent)"""
+    mentor_index.start(on_refresh=sync_mentor_indexes)
+
+def rank_mentors(student_profile, student_embedding, snapshot, k, mask=None):
+    """
+    Top-k mentors for one student: ANN candidates reranked with the exact hybrid score.
+    With a facet mask only eligible mentors are scored.
+    """
+    rows = ann_index.candidates(snapshot, student_embedding, max(RERANK_CANDIDATES, k), mask=mask)
+    if rows is None and mask is not None:
+        rows = np.flatnonzero(mask)
+    if rows is not None and not len(rows):
+        return []
+    embed_scores = mentor_index.score(student_embedding, rows=rows, snapshot=snapshot)
+    tfidf_scores = tfidf_index.score(student_profile, snapshot, rows=rows)
+
+    # Combine scores (weighted)
+    final_scores = 0.6 * embed_scores + 0.4 * tfidf_scores
+
+    top = top_k_indices(final_scores, k)
+    mentor_rows = top if rows is None else rows[top]
+    return [
+        {"mentor_id": snapshot.ids[row], "similarity_score": float(final_scores[i])}
+        for i, row in zip(top, mentor_rows)
+    ]
+
+def rank_mentors_many(texts, embeddings, snapshot, k, rows=None):
+    """
+    Top-k mentors for many students, scored in chunks that keep the score matrix bounded.
+    When rows is given (eligible mentors after filtering) only those columns are scored.
+    """
+    width = len(snapshot.ids) if rows is None else len(rows)
+    chunk = max(1, BATCH_MAX_CELLS // max(1, width))
+    for start in range(0, len(texts), chunk):
+        stop = start + chunk
+        if rows is None:
+            embed_scores = mentor_index.score_many(embeddings[start:stop], snapshot=snapshot)
+            tfidf_scores = tfidf_index.score_many(texts[start:stop], snapshot)
+            final_scores = 0.6 * embed_scores + 0.4 * tfidf_scores
+        else:
+            final_scores = score_mentor_rows(texts[start:stop], embeddings[start:stop], snapshot, rows)
+        top = top_k_per_row(final_scores, k)
+
+        for offset in range(final_scores.shape[0]):
+            row_scores = final_scores[offset]
+            yield [
+                {"mentor_id": snapshot.ids[col if rows is None else rows[col]], "similarity_score": float(row_scores[col])}
+                for col in top[offset]
+            ]
+
+def score_mentor_rows(texts, embeddings, snapshot, rows):
+    """Hybrid scores (students x rows) against a subset of mentor rows"""
+    embed_scores = np.asarray(embeddings, dtype=np.float32) @ snapshot.vectors[rows].T
+    tfidf_scores = tfidf_index.score_many(texts, snapshot, rows=rows)
+    return 0.6 * embed_scores + 0.4 * tfidf_scores
+
+def lookup_precomputed(student_id, k, filters):
+    """Serve from the match table; with filters, keep only the stored mentors that pass them"""
+    if not filters:
+        return match_table.lookup(student_id, k)
+    snapshot = mentor_index.snapshot()
+    if not snapshot.ids:
+        return None
+    mask = snapshot.facets.mask(filters)
+
+    def keep(mentor_id):
+        row = snapshot.facets.row_of(mentor_id)
+        return row is not None and bool(mask[row])
+
+    return match_table.lookup(student_id, k, keep=keep)
+
+def parse_k(value):
+    """Clamp a requested k to [1, MAX_TOP_K]; raises ValueError for non-integers"""
+    k = DEFAULT_TOP_K if value is None else int(value)
+    return max(1, min(k, MAX_TOP_K))
+
+# Fetch student document (interests and the ids it can be looked up by)
+def fetch_student(student_id):
+    projection = {"interests": 1, "id": 1, "student_id": 1}
     try:
         # Try with ObjectId first
         try:
             oid = ObjectId(student_id)
-            doc = students_collection.find_one({"_id": oid}, {"interests": 1})
+            return students_collection.find_one({"_id": oid}, projection)
         except:
             # If that fails, try with string ID
-            doc = students_collection.find_one({"id": student_id}, {"interests": 1})
-            
-        if doc:
-            return list_to_text(doc.get("interests", []))
-        return ""
+            return students_collection.find_one({"id": student_id}, projection)
     except Exception as e:
         print(f"Fetch Error: {e}")
-        return ""
+        return None
+
+def student_profile_text(doc):
+    return list_to_text(doc.get("interests", []))
+
+# Fetch many student profiles with a single $in query
+def fetch_student_profiles(student_ids):
+    oids = [ObjectId(sid) for sid in student_ids if ObjectId.is_valid(sid)]
+    query = {"$or": [{"_id": {"$in": oids}}, {"id": {"$in": list(student_ids)}}]}
+    profiles = {}
+    for doc in students_collection.find(query, {"interests": 1, "id": 1}):
+        text = list_to_text(doc.get("interests", []))
+        profiles[str(doc["_id"])] = text
+        if doc.get("id"):
+            profiles[str(doc["id"])] = text
+    return {sid: profiles.get(sid, "") for sid in student_ids}
+
+# Precomputed top-N per student, kept current by a background worker (one per deployment)
+match_table = MatchTable(
+    db["mentor_matches"],
+    students_collection,
+    db["mentor_matches_state"],
+    profile_fn=student_profile_text,
+    encode=encode_students,
+    load_snapshot=load_snapshot,
+    rank_many=lambda texts, embeddings, snapshot, k: list(rank_mentors_many(texts, embeddings, snapshot, k)),
+    score_rows=score_mentor_rows,
+    model_name=embedding_model.EMBED_MODEL_NAME,
+    generation_fn=lambda: tfidf_index.refit_count,
+    top_n=int(os.getenv("MATCH_TABLE_TOP_N", str(DEFAULT_TOP_K))),
+    interval=float(os.getenv("MATCH_TABLE_INTERVAL_SECONDS", "5")),
+    scan_interval=float(os.getenv("MATCH_TABLE_SCAN_SECONDS", "600")),
+    enabled=os.getenv("MATCH_TABLE_ENABLED", "true").lower() in ("true", "1", "t")
+)
 
 # Match route
 @match_bp.route('/', methods=['POST'])
@@ -60,38 +237,103 @@ def match_mentor():
         if not student_id:
             return jsonify({"error": "student_id is required"}), 400
 
-        student_profile = fetch_student_profile(student_id)
+        try:
+            k = parse_k(data.get("k"))
+        except (TypeError, ValueError):
+            return jsonify({"error": "k must be an integer"}), 400
+
+        try:
+            filters = parse_filters(data.get("filters"))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        # Precomputed ranking: one indexed read
+        matches = lookup_precomputed(student_id, k, filters)
+        if matches is not None:
+            response = jsonify({"matches": matches})
+            response.headers["X-Match-Source"] = "table"
+            return response
+
+        started = datetime.utcnow()
+        student = fetch_student(student_id)
+        student_profile = student_profile_text(student) if student else ""
         if not student_profile:
             return jsonify({"error": "Student profile not found"}), 404
 
-        mentors = fetch_mentors()
-        if not mentors:
+        snapshot = load_snapshot()
+        if not snapshot.ids:
             return jsonify({"error": "No mentors available"}), 404
 
-        mentor_texts = [m["profile_text"] for m in mentors]
+        student_embedding = encode_students([student_profile])[0]
+        if filters:
+            # Filtered rankings are not stored; the table holds the unfiltered top-N
+            mask = snapshot.facets.mask(filters)
+            matches = rank_mentors(student_profile, student_embedding, snapshot, k, mask=mask)
+        else:
+            matches = rank_mentors(student_profile, student_embedding, snapshot, max(k, match_table.top_n))
+            match_table.store(student, student_profile, matches, started)
+
+        response = jsonify({"matches": matches[:k]})
+        response.headers["X-Match-Source"] = "live"
+        return response
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+# Batch match route: one $in fetch, one encode call, one matrix multiply per chunk
+@match_bp.route('/batch', methods=['POST'])
+def match_mentors_batch():
+    try:
+        data = request.get_json() or {}
+        student_ids = data.get("student_ids")
 
-        # TF-IDF vectorization
-        tfidf = TfidfVectorizer()
-        tfidf_matrix = tfidf.fit_transform([student_profile] + mentor_texts)
-        student_vec = tfidf_matrix[0]
-        mentor_vecs = tfidf_matrix[1:]
-        tfidf_scores = cosine_similarity(student_vec, mentor_vecs)[0]
+        if not isinstance(student_ids, list) or not student_ids:
+            return jsonify({"error": "student_ids must be a non-empty list"}), 400
+        if len(student_ids) > BATCH_MAX_STUDENTS:
+            return jsonify({"error": f"At most {BATCH_MAX_STUDENTS} student_ids per batch"}), 400
 
-        # Sentence Embedding similarity
-        mentor_embeddings = embed_model.encode(mentor_texts, normalize_embeddings=True)
-        student_embedding = embed_model.encode([student_profile], normalize_embeddings=True)
-        embed_scores = cosine_similarity(student_embedding, mentor_embeddings)[0]
+        try:
+            k = parse_k(data.get("k"))
+        except (TypeError, ValueError):
+            return jsonify({"error": "k must be an integer"}), 400
 
-        # Combine scores (weighted)
-        final_scores = 0.6 * embed_scores + 0.4 * tfidf_scores
+        try:
+            filters = parse_filters(data.get("filters"))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
 
-        # Rank mentors
-        matches = sorted([
-            {"mentor_id": mentors[i]["id"], "similarity_score": float(final_scores[i])}
-            for i in range(len(mentors))
-        ], key=lambda x: x["similarity_score"], reverse=True)
+        student_ids = [str(sid) for sid in dict.fromkeys(student_ids)]
+        profiles = fetch_student_profiles(student_ids)
+        found = [sid for sid in student_ids if profiles[sid]]
 
-        return jsonify({"matches": matches})
+        snapshot = load_snapshot()
+        if not snapshot.ids:
+            return jsonify({"error": "No mentors available"}), 404
+
+        texts = [profiles[sid] for sid in found]
+        embeddings = encode_students(texts) if texts else np.zeros((0, 0), dtype=np.float32)
+        rows = np.flatnonzero(snapshot.facets.mask(filters)) if filters else None
+
+        def generate():
+            for sid in student_ids:
+                if not profiles[sid]:
+                    yield json.dumps({"student_id": sid, "error": "Student profile not found"}) + "\n"
+
+            for sid, matches in zip(found, rank_mentors_many(texts, embeddings, snapshot, k, rows=rows)):
+                yield json.dumps({"student_id": sid, "matches": matches}) + "\n"
+
+        return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
 
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
\ No newline at end of file
+        return jsonify({"error": str(e)}), 500
+
+# Matching metrics for tuning caches and indexes
+@match_bp.route('/metrics', methods=['GET'])
+def match_metrics():
+    snapshot = mentor_index.snapshot()
+    return jsonify({
+        "mentors_indexed": len(snapshot.ids),
+        "mentor_vectors": {"dtype": snapshot.vectors.dtype, "bytes": int(snapshot.vectors.nbytes)},
+        "student_embedding_cache": student_embedding_cache.stats(),
+        "match_table": match_table.stats()
+    }), 200
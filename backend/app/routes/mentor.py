@@ -4,10 +4,13 @@ from bson.objectid import ObjectId
 import os
 import datetime
 import logging
+from app.utils import response_cache
+from app.utils.facet_index import FACET_FIELDS
 
 mentor_bp = Blueprint('mentor', __name__)
 
 @mentor_bp.route('/all', methods=['GET'])
+@response_cache.cached("mentors")
 def get_all_mentors():
     try:
         mentors = list(mongo.db.mentors.find({}))
@@ -67,6 +70,14 @@ def update_mentor_profile(mentor_id):
             
         if result.matched_count == 0:
             return jsonify({"error": "Mentor not found"}), 404
+
+        response_cache.invalidate("mentors")
+
+        if any(field in data for field in ('expertise',) + FACET_FIELDS):
+            # Refresh the index now rather than after the refresh interval: expertise changes
+            # re-embed this mentor, availability/rating changes update the /match filters
+            from app.routes.matching import mentor_index
+            mentor_index.mark_stale()
             
         return jsonify({"message": "Profile updated successfully"}), 200
 
@@ -212,6 +223,20 @@ def get_mentor_connections(mentor_id):
                     'email': '',
                     'role': user_role
                 }
+
+        if request.args.get('rank', 'false').lower() in ('true', '1', 't'):
+            # Best-fitting students first, scored against this mentor's expertise
+            from app.routes.matching import match_service
+            from app.utils.match_service import mentor_text, student_text
+            try:
+                mentor = mongo.db.mentors.find_one({"_id": ObjectId(mentor_id)}, {"expertise": 1})
+            except Exception:
+                mentor = mongo.db.mentors.find_one({"id": mentor_id}, {"expertise": 1})
+            connections = match_service.rank(
+                mentor_text(mentor or {}),
+                connections,
+                lambda connection: student_text(connection['user']) if connection['user'].get('role') == 'student' else ""
+            )
             
         return jsonify(connections), 200
     except Exception as e:
@@ -2,17 +2,48 @@ from flask import Blueprint, jsonify, request
 from app import mongo
 from bson.objectid import ObjectId
 from datetime import datetime
+import os
+from app.utils import opportunity_hooks
+from app.utils.pagination import PaginationError, keyset_response, parse_fields
+from app.utils.search_index import OpportunitySearchIndex, FILTER_FIELDS
+from app.utils.facets import facet_counts, parse_facet_filters
+from app.utils.ttl_cache import LRUTTLCache
+import logging
+import re
 
 opportunity_bp = Blueprint('opportunity', __name__)
 
+# Listing page sizes; larger limit values are capped rather than rejected
+OPPORTUNITY_PAGE_DEFAULT = int(os.getenv("OPPORTUNITY_PAGE_DEFAULT", "50"))
+OPPORTUNITY_PAGE_MAX = int(os.getenv("OPPORTUNITY_PAGE_MAX", "200"))
+OPPORTUNITY_SORTS = ('_id', 'postedDate')
+SEARCH_PAGE_MAX = int(os.getenv("OPPORTUNITY_SEARCH_PAGE_MAX", "100"))
+
+# BM25 full-text search; built in the background, kept current through opportunity_hooks
+opportunity_search = OpportunitySearchIndex(
+    lambda: mongo.db.opportunities,
+    refresh_interval=int(os.getenv("OPPORTUNITY_SEARCH_REFRESH_SECONDS", "30")),
+    rescan_interval=int(os.getenv("OPPORTUNITY_SEARCH_RESCAN_SECONDS", "600"))
+)
+opportunity_hooks.subscribe(lambda opportunity_id, action: opportunity_search.mark_changed(opportunity_id))
+
+# Facet counts per filter combination. Writes here clear it at once; the TTL
+# bounds how long other workers' writes can go unseen
+FACET_VALUE_LIMIT = int(os.getenv("OPPORTUNITY_FACET_VALUE_LIMIT", "50"))
+facet_cache = LRUTTLCache(
+    max_size=int(os.getenv("OPPORTUNITY_FACET_CACHE_SIZE", "256")),
+    ttl=float(os.getenv("OPPORTUNITY_FACET_CACHE_TTL", "30"))
+)
+opportunity_hooks.subscribe(lambda opportunity_id, action: facet_cache.clear())
+
 @opportunity_bp.route('/', methods=['GET'])
 def get_opportunities():
-    """Get all opportunities"""
+    """Get opportunities a page at a time (limit, cursor, fields, sort=_id|postedDate, order)"""
     try:
-        opportunities = list(mongo.db.opportunities.find())
-        for opp in opportunities:
-            opp['_id'] = str(opp['_id'])
-        return jsonify(opportunities), 200
+        return keyset_response(mongo.db.opportunities, sort_fields=OPPORTUNITY_SORTS,
+                               default_limit=OPPORTUNITY_PAGE_DEFAULT, max_limit=OPPORTUNITY_PAGE_MAX)
+    except PaginationError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -39,6 +70,7 @@ def create_opportunity():
         
         result = mongo.db.opportunities.insert_one(data)
         data['_id'] = str(result.inserted_id)
+        opportunity_hooks.notify(data['_id'], 'created')
         
         return jsonify(data), 201
     except Exception as e:
@@ -60,6 +92,7 @@ def update_opportunity(opportunity_id):
         )
         
         if result.matched_count:
+            opportunity_hooks.notify(opportunity_id, 'updated')
             opportunity = mongo.db.opportunities.find_one({'_id': ObjectId(opportunity_id)})
             opportunity['_id'] = str(opportunity['_id'])
             return jsonify(opportunity), 200
@@ -73,36 +106,95 @@ def delete_opportunity(opportunity_id):
     try:
         result = mongo.db.opportunities.delete_one({'_id': ObjectId(opportunity_id)})
         if result.deleted_count:
+            opportunity_hooks.notify(opportunity_id, 'deleted')
             return jsonify({'message': 'Opportunity deleted successfully'}), 200
         return jsonify({'error': 'Opportunity not found'}), 404
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def regex_search(query, filters, limit, offset, projection):
+    """Unranked fallback used until the search index has finished building"""
+    filter = dict(filters)
+    if query:
+        pattern = re.escape(query)
+        filter['$or'] = [
+            {'title': {'$regex': pattern, '$options': 'i'}},
+            {'description': {'$regex': pattern, '$options': 'i'}}
+        ]
+    total = mongo.db.opportunities.count_documents(filter)
+    opportunities = list(mongo.db.opportunities.find(filter, projection).sort('_id', -1).skip(offset).limit(limit))
+    for opp in opportunities:
+        opp['_id'] = str(opp['_id'])
+    return total, opportunities
+
 @opportunity_bp.route('/search', methods=['GET'])
 def search_opportunities():
-    """Search opportunities with filters"""
+    """Search opportunities by relevance with filters; page/limit paging, total in X-Total-Count"""
     try:
         # Get search parameters
         query = request.args.get('query', '')
-        category = request.args.get('category')
-        type = request.args.get('type')
-        
-        # Build filter
-        filter = {}
-        if query:
-            filter['$or'] = [
-                {'title': {'$regex': query, '$options': 'i'}},
-                {'description': {'$regex': query, '$options': 'i'}}
-            ]
-        if category:
-            filter['category'] = category
-        if type:
-            filter['type'] = type
-            
-        opportunities = list(mongo.db.opportunities.find(filter))
-        for opp in opportunities:
-            opp['_id'] = str(opp['_id'])
-            
-        return jsonify(opportunities), 200
+        filters = {field: request.args.get(field) for field in FILTER_FIELDS if request.args.get(field)}
+        try:
+            page = int(request.args.get('page', 1))
+            limit = int(request.args.get('limit', 20))
+        except ValueError:
+            return jsonify({'error': 'page and limit must be integers'}), 400
+        if page < 1 or not 1 <= limit <= SEARCH_PAGE_MAX:
+            return jsonify({'error': f'page must be >= 1 and limit between 1 and {SEARCH_PAGE_MAX}'}), 400
+        try:
+            projection = parse_fields(request.args.get('fields'))
+        except PaginationError as e:
+            return jsonify({'error': str(e)}), 400
+        offset = (page - 1) * limit
+
+        opportunity_search.start()
+        if not opportunity_search.ready:
+            total, opportunities = regex_search(query, filters, limit, offset, projection)
+        else:
+            total, ranked = opportunity_search.search(query, filters, limit, offset)
+            # One $in read for the page, returned in rank order
+            wanted = [ObjectId(oid) if ObjectId.is_valid(oid) else oid for oid, _ in ranked]
+            docs = {str(doc['_id']): doc for doc in mongo.db.opportunities.find({'_id': {'$in': wanted}}, projection)}
+            opportunities = []
+            for opportunity_id, score in ranked:
+                opportunity = docs.get(opportunity_id)
+                if not opportunity:
+                    continue
+                opportunity['_id'] = opportunity_id
+                if score is not None:
+                    opportunity['score'] = round(score, 4)
+                opportunities.append(opportunity)
+
+        response = jsonify(opportunities)
+        response.headers['X-Total-Count'] = str(total)
+        return response, 200
+    except Exception as e:
+        logging.error(f"Opportunity search failed: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@opportunity_bp.route('/facets', methods=['GET'])
+def get_opportunity_facets():
+    """Counts per type, location, category and skill for the active filters"""
+    try:
+        filters = parse_facet_filters(request.args)
+        try:
+            limit = min(int(request.args.get('limit', FACET_VALUE_LIMIT)), 200)
+        except ValueError:
+            return jsonify({'error': 'limit must be an integer'}), 400
+        if limit < 1:
+            return jsonify({'error': 'limit must be at least 1'}), 400
+
+        key = (tuple(sorted((field, tuple(values)) for field, values in filters.items())), limit)
+        counts = facet_cache.get(key)
+        cache_status = 'HIT'
+        if counts is None:
+            cache_status = 'MISS'
+            counts = facet_counts(mongo.db.opportunities, filters, limit)
+            facet_cache.set(key, counts)
+
+        response = jsonify(dict(counts, filters=filters))
+        response.headers['X-Cache'] = cache_status
+        return response, 200
     except Exception as e:
-        return jsonify({'error': str(e)}), 500 
\ No newline at end of file
+        logging.error(f"Opportunity facets failed: {e}")
+        return jsonify({'error': str(e)}), 500
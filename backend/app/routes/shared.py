@@ -7,25 +7,91 @@ from datetime import datetime
 import os
 from pymongo import MongoClient
 from flask_cors import CORS
+from app.utils.pagination import PaginationError, keyset_response
+from app.utils import opportunity_hooks, response_cache
 
 shared_bp = Blueprint('shared', __name__)
 
+# Cached opportunity responses are dropped on every opportunity write
+opportunity_hooks.subscribe(lambda opportunity_id, action: response_cache.invalidate("opportunities"))
+
 # Opportunities endpoints
 @shared_bp.route('/opportunities', methods=['GET'])
+@response_cache.cached("opportunities")
 def get_all_opportunities():
-    """Get all opportunities from the database"""
+    """Get opportunities a page at a time; the next page's cursor is in the X-Next-Cursor header"""
+    from app.routes.opportunity import OPPORTUNITY_PAGE_DEFAULT, OPPORTUNITY_PAGE_MAX, OPPORTUNITY_SORTS
     try:
-        opportunities = list(mongo.db.opportunities.find())
-        # Convert ObjectId to string for JSON serialization
-        for opportunity in opportunities:
-            if '_id' in opportunity:
-                opportunity['_id'] = str(opportunity['_id'])
-                
-        return jsonify(opportunities), 200
+        return keyset_response(mongo.db.opportunities, sort_fields=OPPORTUNITY_SORTS,
+                               default_limit=OPPORTUNITY_PAGE_DEFAULT, max_limit=OPPORTUNITY_PAGE_MAX)
+    except PaginationError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@shared_bp.route('/opportunities/recommended/<student_id>', methods=['GET'])
+def get_recommended_opportunities(student_id):
+    """Opportunities ranked for a student by skill overlap and embedding similarity, paginated"""
+    try:
+        try:
+            page = int(request.args.get('page', 1))
+            limit = int(request.args.get('limit', 20))
+        except ValueError:
+            return jsonify({'error': 'page and limit must be integers'}), 400
+        if page < 1 or not 1 <= limit <= 100:
+            return jsonify({'error': 'page must be >= 1 and limit between 1 and 100'}), 400
+
+        query = {'$or': [{'id': student_id}, {'student_id': student_id}]}
+        if ObjectId.is_valid(student_id):
+            query['$or'].append({'_id': ObjectId(student_id)})
+        student = mongo.db.students.find_one(query, {'skills': 1, 'interests': 1})
+        if not student:
+            return jsonify({'error': 'Student not found'}), 404
+
+        from app.routes.matching import encode_students, opportunity_index
+        from app.utils.opportunity_index import matched_skills, skill_tokens
+
+        profile = list(student.get('skills') or []) + list(student.get('interests') or [])
+        tokens = skill_tokens(profile)
+        if not tokens:
+            return jsonify({'error': 'Student has no skills or interests to match on'}), 404
+
+        # Built and rescanned in the background; only this process's own edits are applied here
+        opportunity_index.start()
+        if not opportunity_index.ready:
+            response = jsonify({'error': 'Recommendations are still being prepared, please retry shortly'})
+            response.headers['Retry-After'] = '5'
+            return response, 503
+        opportunity_index.apply_pending()
+        query_vector = encode_students([", ".join(str(item) for item in profile).lower()])[0]
+        total, ranked = opportunity_index.recommend(tokens, query_vector, limit, offset=(page - 1) * limit)
+
+        # One $in read for the page, returned in rank order
+        wanted = [ObjectId(oid) if ObjectId.is_valid(oid) else oid for oid, _, _ in ranked]
+        docs = {str(doc['_id']): doc for doc in mongo.db.opportunities.find({'_id': {'$in': wanted}})}
+        recommendations = []
+        for opportunity_id, score, overlap in ranked:
+            opportunity = docs.get(opportunity_id)
+            if not opportunity:
+                continue
+            opportunity['_id'] = opportunity_id
+            opportunity['match_score'] = round(score, 4)
+            opportunity['skill_overlap'] = round(overlap, 4)
+            opportunity['matched_skills'] = matched_skills(opportunity.get('skills'), tokens)
+            recommendations.append(opportunity)
+
+        return jsonify({
+            'recommendations': recommendations,
+            'page': page,
+            'limit': limit,
+            'total': total,
+            'has_more': page * limit < total
+        }), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @shared_bp.route('/opportunities/<opportunity_id>', methods=['GET'])
+@response_cache.cached("opportunities")
 def get_opportunity(opportunity_id):
     """Get a specific opportunity by ID"""
     try:
@@ -47,6 +113,7 @@ def get_opportunity(opportunity_id):
         return jsonify({'error': str(e)}), 500
 
 @shared_bp.route('/mentors', methods=['GET'])
+@response_cache.cached("mentors")
 def get_all_mentors():
     """Get all mentors from the database"""
     try:
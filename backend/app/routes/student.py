@@ -1,11 +1,19 @@
-from flask import Blueprint, jsonify, request, current_app
+from flask import Blueprint, jsonify, request, current_app, Response, stream_with_context
 from app import mongo
 from bson.objectid import ObjectId
 from datetime import datetime
 import os
+import json
+import time
 from werkzeug.utils import secure_filename
 import logging
 from dotenv import load_dotenv
+from app.utils.semantic_cache import SemanticCache, normalize_query
+from app.utils.single_flight import SingleFlight
+from app.utils.upstream_guard import UpstreamGuard, CircuitBreaker, AIMDLimiter, UpstreamRejected
+from app.utils import write_behind, response_cache, embedding_service, embedding_model
+from app.utils.job_queue import JobQueue, QueueFull, validate_callback_url
+from app.utils.conversation_sessions import ConversationStore, message_tokens
 
 # Load environment variables
 load_dotenv()
@@ -34,10 +42,19 @@ os.makedirs(DOCS_FOLDER, exist_ok=True)
 # Initialize Groq client with API key
 groq_client = None
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+# Upper bound on one upstream call; the circuit breaker keeps requests from queueing behind it
+GROQ_TIMEOUT_SECONDS = float(os.getenv("GROQ_TIMEOUT_SECONDS", "60"))
+# Another OpenAI-compatible endpoint, e.g. fake_llm_server.py for load tests; unset means api.groq.com
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL") or None
+# Client-side retries on 429/5xx; each one holds the request (and a limiter slot) longer
+GROQ_MAX_RETRIES = int(os.getenv("GROQ_MAX_RETRIES", "2"))
 
 if GROQ_AVAILABLE and GROQ_API_KEY:
     try:
-        groq_client = Groq(api_key=GROQ_API_KEY)
+        groq_client = Groq(api_key=GROQ_API_KEY, base_url=GROQ_BASE_URL,
+                           timeout=GROQ_TIMEOUT_SECONDS, max_retries=GROQ_MAX_RETRIES)
+        if GROQ_BASE_URL:
+            logging.info(f"Groq client using {GROQ_BASE_URL}")
         logging.info("Groq client initialized successfully")
     except Exception as e:
         logging.error(f"Failed to initialize Groq client: {e}")
@@ -48,6 +65,69 @@ else:
     if not GROQ_AVAILABLE:
         logging.warning("Groq package not available")
 
+# Fails fast while Groq is erroring or slow, and caps concurrent upstream calls adaptively
+groq_guard = UpstreamGuard(
+    "groq",
+    CircuitBreaker(
+        window=int(os.getenv("GROQ_BREAKER_WINDOW", "20")),
+        min_calls=int(os.getenv("GROQ_BREAKER_MIN_CALLS", "5")),
+        failure_rate=float(os.getenv("GROQ_BREAKER_FAILURE_RATE", "0.5")),
+        slow_call_seconds=float(os.getenv("GROQ_BREAKER_SLOW_SECONDS", "30")),
+        slow_rate=float(os.getenv("GROQ_BREAKER_SLOW_RATE", "0.5")),
+        open_seconds=float(os.getenv("GROQ_BREAKER_OPEN_SECONDS", "30"))
+    ),
+    AIMDLimiter(
+        initial=int(os.getenv("GROQ_LIMIT_INITIAL", "8")),
+        min_limit=int(os.getenv("GROQ_LIMIT_MIN", "1")),
+        max_limit=int(os.getenv("GROQ_LIMIT_MAX", "64")),
+        latency_target=float(os.getenv("GROQ_LIMIT_LATENCY_TARGET_SECONDS", "20"))
+    )
+)
+GROQ_BUSY_MESSAGE = "The AI mentor is busy right now. Please try again in a moment."
+
+def encode_queries(texts):
+    # Straight to the inference service: the semantic cache already keys exact repeats, and
+    # questions must not churn (or, with STUDENT_EMBED_CACHE_MONGO, be persisted by) the student cache
+    return embedding_service.encode(texts)
+
+# Earlier answers served for near-duplicate tech-mentor questions
+tech_mentor_cache = SemanticCache(
+    encode_queries,
+    threshold=float(os.getenv("TECH_MENTOR_CACHE_THRESHOLD", "0.93")),
+    max_size=int(os.getenv("TECH_MENTOR_CACHE_SIZE", "5000")),
+    ttl=int(os.getenv("TECH_MENTOR_CACHE_TTL", "604800")),
+    warm_limit=int(os.getenv("TECH_MENTOR_CACHE_WARM", "2000")),
+    # e5 models are trained with "query: " on questions; without it unrelated questions score too close
+    query_prefix="query: " if "e5" in embedding_model.EMBED_MODEL_NAME.lower() else "",
+    min_term_overlap=float(os.getenv("TECH_MENTOR_CACHE_MIN_TERM_OVERLAP", "0.6"))
+)
+TECH_MENTOR_CACHE_ENABLED = os.getenv("TECH_MENTOR_CACHE_ENABLED", "true").lower() in ("true", "1", "t")
+
+# Identical questions asked at the same time share one upstream call, optionally across processes
+TECH_MENTOR_COALESCE = os.getenv("TECH_MENTOR_COALESCE", "true").lower() in ("true", "1", "t")
+tech_mentor_flights = SingleFlight(
+    collection_fn=(lambda: mongo.db.tech_mentor_inflight)
+    if os.getenv("TECH_MENTOR_COALESCE_MONGO", "false").lower() in ("true", "1", "t") else None,
+    lease_seconds=int(os.getenv("TECH_MENTOR_COALESCE_LEASE_SECONDS", "120")),
+    result_ttl=int(os.getenv("TECH_MENTOR_COALESCE_RESULT_TTL", "10"))
+)
+
+# Q&A log entries are batched into tech_mentoring by a background flusher instead of one insert per request
+TECH_MENTOR_LOG_WRITE_BEHIND = os.getenv("TECH_MENTOR_LOG_WRITE_BEHIND", "true").lower() in ("true", "1", "t")
+tech_mentor_log = write_behind.get_buffer(
+    "tech_mentoring",
+    lambda: mongo.db.tech_mentoring,
+    max_items=int(os.getenv("TECH_MENTOR_LOG_MAX_QUEUED", "10000")),
+    batch_size=int(os.getenv("TECH_MENTOR_LOG_BATCH_SIZE", "200")),
+    flush_interval=float(os.getenv("TECH_MENTOR_LOG_FLUSH_SECONDS", "1"))
+)
+
+def log_tech_mentor_entry(qa_entry):
+    if TECH_MENTOR_LOG_WRITE_BEHIND:
+        tech_mentor_log.append(qa_entry)
+    else:
+        mongo.db.tech_mentoring.insert_one(qa_entry)
+
 def allowed_file(filename, allowed_extensions):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in allowed_extensions
 
@@ -140,6 +220,11 @@ def update_profile(student_id):
             
             if '_id' in student:
                 student['_id'] = str(student['_id'])
+
+            if 'interests' in data:
+                # Re-rank this student's precomputed mentor matches
+                from app.routes.matching import match_table
+                match_table.mark_stale(student['_id'])
             return jsonify(student), 200
         else:
             return jsonify({'error': 'Profile not found'}), 404
@@ -190,6 +275,9 @@ def submit_application(student_id):
             {'_id': ObjectId(data['opportunityId'])},
             {'$inc': {'applicants': 1}}
         )
+        # Cached opportunity responses carry the count; the search and recommendation
+        # indexes don't, so this skips opportunity_hooks
+        response_cache.invalidate("opportunities")
         
         return jsonify(application), 201
     except Exception as e:
@@ -373,89 +461,520 @@ def tech_mentor_alt():
     # Alternative URL format for flexibility
     return handle_tech_mentor_request()
 
-def handle_tech_mentor_request():
+@student_bp.route("/api/tech-mentor/cache", methods=["GET"])
+def tech_mentor_cache_stats():
+    return jsonify(dict(
+        tech_mentor_cache.stats(),
+        enabled=TECH_MENTOR_CACHE_ENABLED,
+        coalescing=dict(tech_mentor_flights.stats(), enabled=TECH_MENTOR_COALESCE)
+    )), 200
+
+def cache_bypassed(data):
+    """no_cache=true in the body/query, or a Cache-Control: no-cache request header"""
+    if "no-cache" in request.headers.get("Cache-Control", "").lower():
+        return True
+    return str(data.get("no_cache", "")).lower() in ("true", "1", "t")
+
+# Prompt and model shared by the JSON and streaming tech-mentor endpoints
+TECH_MENTOR_SYSTEM_PROMPT = "I'd like you to act as my tech mentor. You're an expert with deep knowledge of software engineering, system design, web development, and industry best practices. You have access to a vast amount of up-to-date information and resources across programming languages, frameworks, design principles, deployment strategies, and career roadmapping. I will ask you questions about software engineering, and you will provide me with detailed explanations, code examples, and resources to help me understand the concepts better. You will also guide me in my career development by suggesting learning paths, resources, and best practices."
+TECH_MENTOR_MODEL = "deepseek-r1-distill-llama-70b"
+# Session summaries don't need reasoning; a reasoning model spends its token budget on <think> first
+TECH_MENTOR_SUMMARY_MODEL = os.getenv("TECH_MENTOR_SUMMARY_MODEL", "llama-3.1-8b-instant")
+# Completion cap for the summary call, kept well above the summary length for any preamble
+TECH_MENTOR_SUMMARY_MAX_TOKENS = int(os.getenv("TECH_MENTOR_SUMMARY_MAX_TOKENS", "1500"))
+TECH_MENTOR_ERROR_MESSAGE = "Sorry, I encountered an error while processing your request. Please try again later."
+
+def tech_mentor_request_data():
     # Support JSON, form data, and query parameters
     if request.is_json:
-        data = request.get_json()
+        return request.get_json()
     elif request.form:
-        data = request.form.to_dict()  # Convert to dict for easier handling
-    else:
-        data = request.args  # fallback to query params
-    
-    user_query = data.get("query")
-    
-    if not user_query:
-        return jsonify(success=False, message="Query parameter is required"), 400
-    
-    # Create the entry first so we can record the query even if the API fails
-    qa_entry = {
-        "query": user_query,
-        "createdAt": datetime.now()
-    }
-    
+        return request.form.to_dict()  # Convert to dict for easier handling
+    return request.args  # fallback to query params
+
+def tech_mentor_messages(user_query, session=None):
+    """Chat messages for one question, with the session's summary and recent turns trimmed to the prompt budget"""
+    if session is None:
+        return [
+            {"role": "system", "content": TECH_MENTOR_SYSTEM_PROMPT},
+            {"role": "user", "content": user_query}
+        ]
+    messages, _ = tech_mentor_sessions.build_messages(session, TECH_MENTOR_SYSTEM_PROMPT, user_query)
+    return messages
+
+def summarize_tech_mentor_turns(previous_summary, turns, max_tokens):
+    """
+    Fold older turns into the session summary with one upstream call. The
+    summary is asked to stay within max_tokens, but the completion is capped
+    at TECH_MENTOR_SUMMARY_MAX_TOKENS so a reasoning preamble can't cut it off;
+    the session store strips any <think> block and trims the result.
+    """
+    if tech_mentor_unavailable():
+        raise RuntimeError("AI service unavailable")
+    transcript = "\n\n".join(f"Student: {turn['query']}\nMentor: {turn['answer']}" for turn in turns)
+    prompt = (
+        "Update the summary of this mentoring conversation. Keep the student's goals, their stack and level, "
+        "decisions made and open questions; drop code and pleasantries. Reply with the summary only, "
+        f"in at most {max_tokens * 3 // 4} words.\n\n"
+        f"Current summary:\n{previous_summary or '(none)'}\n\nNew exchanges:\n{transcript}"
+    )
+    chat_completion = groq_guard.call(lambda: groq_client.chat.completions.create(
+        messages=[{"role": "user", "content": prompt}],
+        model=TECH_MENTOR_SUMMARY_MODEL,
+        temperature=0.2,
+        max_tokens=max(max_tokens, TECH_MENTOR_SUMMARY_MAX_TOKENS)
+    ))
+    return chat_completion.choices[0].message.content
+
+# Multi-turn sessions: recent turns verbatim plus a rolling summary, kept under a prompt token budget
+tech_mentor_sessions = ConversationStore(
+    lambda: mongo.db.tech_mentor_sessions,
+    summarize_tech_mentor_turns,
+    prompt_budget=int(os.getenv("TECH_MENTOR_PROMPT_TOKEN_BUDGET", "3000")),
+    history_budget=int(os.getenv("TECH_MENTOR_SESSION_HISTORY_TOKENS", "1500")),
+    summary_budget=int(os.getenv("TECH_MENTOR_SESSION_SUMMARY_TOKENS", "400")),
+    max_turns=int(os.getenv("TECH_MENTOR_SESSION_MAX_TURNS", "12")),
+    ttl=int(os.getenv("TECH_MENTOR_SESSION_TTL", str(30 * 86400)))
+)
+
+def has_context(session):
+    return bool(session and (session.get("turns") or session.get("summary")))
+
+def tech_mentor_session_for(data):
+    """The session named by session_id (None if not given); raises LookupError if it does not exist"""
+    session_id = data.get("session_id")
+    if not session_id:
+        return None
+    session = tech_mentor_sessions.get(session_id)
+    if session is None:
+        raise LookupError(session_id)
+    return session
+
+def remember_turn(qa_entry, session, ai_response):
+    if session is None:
+        return
+    try:
+        tech_mentor_sessions.append_turn(session["_id"], qa_entry["query"], ai_response)
+    except Exception as e:
+        logging.error(f"Failed to record turn in tech mentor session {session['_id']}: {e}")
+
+def tech_mentor_unavailable():
+    """(message, fallback_message) when the AI service cannot be called, else None"""
     # Check if AI services are available
     if not GROQ_AVAILABLE:
-        fallback_message = "AI services are not available at the moment. Please try again later."
-        qa_entry["response"] = fallback_message
-        qa_entry["using_fallback"] = True
-        mongo.db.tech_mentoring.insert_one(qa_entry)
-        return jsonify(success=False, message="AI service unavailable", data={"response": fallback_message}), 503
-    
+        return "AI service unavailable", "AI services are not available at the moment. Please try again later."
     # Check if API key is configured
     if not GROQ_API_KEY:
-        fallback_message = "AI services are not properly configured. Please contact the administrator."
-        qa_entry["response"] = fallback_message
-        qa_entry["using_fallback"] = True
-        mongo.db.tech_mentoring.insert_one(qa_entry)
-        return jsonify(success=False, message="AI service misconfigured", data={"response": fallback_message}), 503
-    
+        return "AI service misconfigured", "AI services are not properly configured. Please contact the administrator."
     # Check if Groq client was initialized
     if not groq_client:
-        fallback_message = "AI services initialization failed. Please try again later."
+        return "AI client unavailable", "AI services initialization failed. Please try again later."
+    return None
+
+def cache_wanted(data):
+    """Whether this request may be answered from the semantic cache"""
+    if not TECH_MENTOR_CACHE_ENABLED:
+        return False
+    if cache_bypassed(data):
+        tech_mentor_cache.record_bypass()
+        return False
+    return True
+
+def lookup_cached_answer(user_query, use_cache):
+    if not use_cache:
+        return None
+    tech_mentor_cache.warm(mongo.db.tech_mentoring)
+    return tech_mentor_cache.lookup(user_query)
+
+def call_tech_mentor_upstream(messages):
+    chat_completion = groq_guard.call(lambda: groq_client.chat.completions.create(
+        messages=messages,
+        model=TECH_MENTOR_MODEL,
+        temperature=0.7,
+        max_tokens=2000
+    ))
+    return chat_completion.choices[0].message.content
+
+def record_rejection(qa_entry, reason):
+    qa_entry["response"] = GROQ_BUSY_MESSAGE
+    qa_entry["using_fallback"] = True
+    qa_entry["success"] = False
+    qa_entry["rejected"] = reason
+    log_tech_mentor_entry(qa_entry)
+
+def record_cache_hit(qa_entry, cached):
+    qa_entry["response"] = cached["response"]
+    qa_entry["using_fallback"] = False
+    qa_entry["success"] = True
+    qa_entry["cache_hit"] = True
+    qa_entry["cache_match"] = cached["match"]
+    qa_entry["cache_similarity"] = cached["similarity"]
+    log_tech_mentor_entry(qa_entry)
+
+def answer_tech_mentor_query(user_query, use_cache=True, session=None):
+    """
+    Answer one tech-mentor question and log it to tech_mentoring.
+    Returns (status_code, body, cache) where cache is HIT, MISS or BYPASS.
+    Needs no request context, so job workers call it directly.
+    """
+    # Create the entry first so we can record the query even if the API fails
+    qa_entry = {
+        "query": user_query,
+        "createdAt": datetime.now()
+    }
+    if session is not None:
+        qa_entry["session_id"] = session["_id"]
+    # A follow-up depends on the conversation, so neither cached nor shared answers apply
+    contextual = has_context(session)
+    use_cache = use_cache and not contextual
+
+    cached = lookup_cached_answer(user_query, use_cache)
+    if cached:
+        record_cache_hit(qa_entry, cached)
+        remember_turn(qa_entry, session, cached["response"])
+        return 200, {
+            "success": True,
+            "data": {
+                "response": cached["response"],
+                "cached": True,
+                "cached_query": cached["query"],
+                "similarity": cached["similarity"]
+            }
+        }, "HIT"
+    cache = "MISS" if use_cache else "BYPASS"
+
+    unavailable = tech_mentor_unavailable()
+    if unavailable:
+        message, fallback_message = unavailable
         qa_entry["response"] = fallback_message
         qa_entry["using_fallback"] = True
-        mongo.db.tech_mentoring.insert_one(qa_entry)
-        return jsonify(success=False, message="AI client unavailable", data={"response": fallback_message}), 503
+        log_tech_mentor_entry(qa_entry)
+        return 503, {"success": False, "message": message, "data": {"response": fallback_message}}, cache
             
     try:
+        messages = tech_mentor_messages(user_query, session)
+        qa_entry["prompt_tokens"] = message_tokens(messages)
         # Call the Groq API with proper error handling
-        chat_completion = groq_client.chat.completions.create(
-            messages=[
-                {
-                    "role": "system",
-                    "content": "I'd like you to act as my tech mentor. You're an expert with deep knowledge of software engineering, system design, web development, and industry best practices. You have access to a vast amount of up-to-date information and resources across programming languages, frameworks, design principles, deployment strategies, and career roadmapping. I will ask you questions about software engineering, and you will provide me with detailed explanations, code examples, and resources to help me understand the concepts better. You will also guide me in my career development by suggesting learning paths, resources, and best practices."
-                },
-                {
-                    "role": "user",
-                    "content": user_query
-                }
-            ],
-            model="deepseek-r1-distill-llama-70b",
-            temperature=0.7,
-            max_tokens=2000
-        )
-        
-        # Get the response
-        ai_response = chat_completion.choices[0].message.content
+        if TECH_MENTOR_COALESCE and not contextual:
+            ai_response, coalesced = tech_mentor_flights.do(
+                normalize_query(user_query), lambda: call_tech_mentor_upstream(messages)
+            )
+        else:
+            ai_response, coalesced = call_tech_mentor_upstream(messages), False
         
         # Update and save the Q&A to MongoDB
         qa_entry["response"] = ai_response
         qa_entry["using_fallback"] = False
         qa_entry["success"] = True
-        mongo.db.tech_mentoring.insert_one(qa_entry)
+        if coalesced:
+            qa_entry["coalesced"] = True
+        log_tech_mentor_entry(qa_entry)
+        remember_turn(qa_entry, session, ai_response)
+        # The leading request already cached a shared answer; follow-ups only make sense in their session
+        if TECH_MENTOR_CACHE_ENABLED and ai_response and not coalesced and not contextual:
+            tech_mentor_cache.store(user_query, ai_response, created_at=qa_entry["createdAt"])
         
-        return jsonify(success=True, data={"response": ai_response}), 200
+        return 200, {"success": True, "data": {"response": ai_response}}, cache
+
+    except UpstreamRejected as e:
+        # Breaker open or concurrency limit reached: answer now instead of queueing behind a struggling upstream
+        record_rejection(qa_entry, e.reason)
+        return 503, {
+            "success": False,
+            "message": "AI service temporarily unavailable",
+            "reason": e.reason,
+            "data": {"response": GROQ_BUSY_MESSAGE}
+        }, cache
         
     except Exception as e:
         error_msg = str(e)
         logging.error(f"Error calling Groq API: {error_msg}")
         
         # Create a detailed fallback response
-        fallback_message = "Sorry, I encountered an error while processing your request. Please try again later."
+        fallback_message = TECH_MENTOR_ERROR_MESSAGE
         qa_entry["response"] = fallback_message
         qa_entry["error"] = error_msg
         qa_entry["using_fallback"] = True
         qa_entry["success"] = False
-        mongo.db.tech_mentoring.insert_one(qa_entry)
+        log_tech_mentor_entry(qa_entry)
         
-        return jsonify(success=False, message="Error calling AI API", error=error_msg, data={"response": fallback_message}), 500
+        return 500, {
+            "success": False,
+            "message": "Error calling AI API",
+            "error": error_msg,
+            "data": {"response": fallback_message}
+        }, cache
+
+def handle_tech_mentor_request():
+    data = tech_mentor_request_data()
+    user_query = data.get("query")
+    
+    if not user_query:
+        return jsonify(success=False, message="Query parameter is required"), 400
+
+    try:
+        session = tech_mentor_session_for(data)
+    except LookupError:
+        return jsonify(success=False, message="Session not found"), 404
+
+    if str(data.get("async", "")).lower() in ("true", "1", "t"):
+        return enqueue_tech_mentor_job(data, user_query)
+
+    status_code, body, cache = answer_tech_mentor_query(user_query, cache_wanted(data), session)
+    response = jsonify(body)
+    response.headers["X-Cache"] = cache
+    return response, status_code
+
+def run_tech_mentor_job(payload):
+    # Loaded when the job runs, so it sees turns added while the job was queued
+    session = tech_mentor_session_for(payload)
+    status_code, body, cache = answer_tech_mentor_query(payload["query"], payload.get("use_cache", True), session)
+    return dict(body, status_code=status_code, cache=cache)
+
+# Comma-separated hosts webhooks may be sent to. Empty (the default) disables
+# callbacks; "*" allows any host that resolves only to public addresses
+TECH_MENTOR_CALLBACK_HOSTS = {
+    host.strip().lower() for host in os.getenv("TECH_MENTOR_CALLBACK_HOSTS", "").split(",") if host.strip()
+}
+
+# Async mode: questions queue here and run on a bounded pool; job records live in Mongo
+tech_mentor_jobs = JobQueue(
+    lambda: mongo.db.tech_mentor_jobs,
+    run_tech_mentor_job,
+    name="tech-mentor",
+    workers=int(os.getenv("TECH_MENTOR_JOB_WORKERS", "4")),
+    max_pending=int(os.getenv("TECH_MENTOR_JOB_MAX_PENDING", "200")),
+    lease_seconds=int(os.getenv("TECH_MENTOR_JOB_LEASE_SECONDS", "300")),
+    result_ttl=int(os.getenv("TECH_MENTOR_JOB_TTL", str(7 * 86400))),
+    callback_hosts=TECH_MENTOR_CALLBACK_HOSTS
+)
+TECH_MENTOR_JOB_MAX_WAIT = float(os.getenv("TECH_MENTOR_JOB_MAX_WAIT", "30"))
+
+def job_view(job):
+    return {
+        "job_id": job["_id"],
+        "status": job["status"],
+        "query": job.get("payload", {}).get("query"),
+        "attempts": job.get("attempts", 0),
+        "created_at": job.get("created_at"),
+        "started_at": job.get("started_at"),
+        "finished_at": job.get("finished_at"),
+        "result": job.get("result"),
+        "error": job.get("error"),
+        "callback": job.get("callback")
+    }
+
+def enqueue_tech_mentor_job(data, user_query):
+    callback_url = data.get("callback_url")
+    if callback_url:
+        try:
+            validate_callback_url(callback_url, TECH_MENTOR_CALLBACK_HOSTS)
+        except ValueError as e:
+            return jsonify(success=False, message=str(e)), 400
+    try:
+        payload = {"query": user_query, "use_cache": cache_wanted(data)}
+        if data.get("session_id"):
+            payload["session_id"] = data.get("session_id")
+        job_id = tech_mentor_jobs.submit(payload, callback_url=callback_url)
+    except QueueFull:
+        response = jsonify(success=False, message="Too many pending tech mentor requests, please retry shortly")
+        response.headers["Retry-After"] = "5"
+        return response, 429
+    except Exception as e:
+        logging.error(f"Failed to enqueue tech mentor job: {e}")
+        return jsonify(success=False, message="Could not queue the request", error=str(e)), 500
+
+    status_url = f"{request.script_root}/student/api/tech-mentor/jobs/{job_id}"
+    response = jsonify(success=True, data={"job_id": job_id, "status": "queued", "status_url": status_url})
+    response.headers["Location"] = status_url
+    return response, 202
+
+@student_bp.route("/api/tech-mentor/jobs", methods=["POST"])
+def create_tech_mentor_job():
+    data = tech_mentor_request_data()
+    user_query = data.get("query")
+    if not user_query:
+        return jsonify(success=False, message="Query parameter is required"), 400
+    try:
+        tech_mentor_session_for(data)
+    except LookupError:
+        return jsonify(success=False, message="Session not found"), 404
+    return enqueue_tech_mentor_job(data, user_query)
+
+@student_bp.route("/api/tech-mentor/jobs/<job_id>", methods=["GET"])
+def get_tech_mentor_job(job_id):
+    """Job status and result; ?wait=N long-polls up to N seconds for the job to finish"""
+    try:
+        wait = min(max(float(request.args.get("wait", 0)), 0.0), TECH_MENTOR_JOB_MAX_WAIT)
+    except ValueError:
+        return jsonify(success=False, message="wait must be a number of seconds"), 400
+
+    job = tech_mentor_jobs.wait(job_id, wait) if wait else tech_mentor_jobs.get(job_id)
+    if not job:
+        return jsonify(success=False, message="Job not found"), 404
+    return jsonify(success=True, data=job_view(job)), 200
+
+@student_bp.route("/api/tech-mentor/jobs/stats", methods=["GET"])
+def tech_mentor_job_stats():
+    return jsonify(tech_mentor_jobs.stats()), 200
+
+def session_view(session):
+    return {
+        "session_id": session["_id"],
+        "owner_id": session.get("owner_id"),
+        "summary": session.get("summary", ""),
+        "turns": [{"query": turn["query"], "response": turn["answer"], "at": turn.get("at")}
+                  for turn in session.get("turns", [])],
+        "turn_count": session.get("turn_count", 0),
+        "created_at": session.get("created_at"),
+        "updated_at": session.get("updated_at")
+    }
+
+@student_bp.route("/api/tech-mentor/sessions", methods=["POST"])
+def create_tech_mentor_session():
+    data = request.get_json(silent=True) or {}
+    try:
+        session = tech_mentor_sessions.create(data.get("student_id"))
+    except Exception as e:
+        logging.error(f"Failed to create tech mentor session: {e}")
+        return jsonify(success=False, message="Could not create session", error=str(e)), 500
+    return jsonify(success=True, data=session_view(session)), 201
+
+@student_bp.route("/api/tech-mentor/sessions/<session_id>", methods=["GET"])
+def get_tech_mentor_session(session_id):
+    session = tech_mentor_sessions.get(session_id)
+    if not session:
+        return jsonify(success=False, message="Session not found"), 404
+    return jsonify(success=True, data=session_view(session)), 200
+
+@student_bp.route("/api/tech-mentor/sessions/<session_id>", methods=["DELETE"])
+def delete_tech_mentor_session(session_id):
+    if not tech_mentor_sessions.delete(session_id):
+        return jsonify(success=False, message="Session not found"), 404
+    return jsonify(success=True, message="Session deleted"), 200
+
+@student_bp.route("/api/tech-mentor/sessions/stats", methods=["GET"])
+def tech_mentor_session_stats():
+    return jsonify(tech_mentor_sessions.stats()), 200
+
+def sse_event(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+@student_bp.route("/api/tech-mentor/stream", methods=["GET", "POST"])
+def tech_mentor_stream():
+    """
+    Server-sent events variant of the tech mentor: 'token' events carry answer
+    fragments as they are generated, then one 'done' (or 'error') event. The
+    assembled answer is saved to tech_mentoring when the stream ends.
+    """
+    data = tech_mentor_request_data()
+    user_query = data.get("query")
+
+    if not user_query:
+        return jsonify(success=False, message="Query parameter is required"), 400
+
+    try:
+        session = tech_mentor_session_for(data)
+    except LookupError:
+        return jsonify(success=False, message="Session not found"), 404
+
+    qa_entry = {
+        "query": user_query,
+        "createdAt": datetime.now(),
+        "streamed": True
+    }
+    if session is not None:
+        qa_entry["session_id"] = session["_id"]
+
+    contextual = has_context(session)
+    use_cache = cache_wanted(data) and not contextual
+    cached = lookup_cached_answer(user_query, use_cache)
+    unavailable = None if cached else tech_mentor_unavailable()
+
+    def generate():
+        if cached:
+            record_cache_hit(qa_entry, cached)
+            remember_turn(qa_entry, session, cached["response"])
+            yield sse_event("token", {"content": cached["response"]})
+            yield sse_event("done", {"cached": True, "cached_query": cached["query"], "similarity": cached["similarity"]})
+            return
+
+        if unavailable:
+            message, fallback_message = unavailable
+            qa_entry["response"] = fallback_message
+            qa_entry["using_fallback"] = True
+            log_tech_mentor_entry(qa_entry)
+            yield sse_event("error", {"message": message, "response": fallback_message})
+            return
+
+        # Headers and this comment go out before the upstream call, so the client sees the first byte at once
+        yield ": connected\n\n"
+        try:
+            started = groq_guard.acquire()
+        except UpstreamRejected as e:
+            record_rejection(qa_entry, e.reason)
+            yield sse_event("error", {"message": "AI service temporarily unavailable", "reason": e.reason,
+                                      "response": GROQ_BUSY_MESSAGE})
+            return
+
+        parts = []
+        finished = False
+        first_token = None
+        try:
+            messages = tech_mentor_messages(user_query, session)
+            qa_entry["prompt_tokens"] = message_tokens(messages)
+            stream = groq_client.chat.completions.create(
+                messages=messages,
+                model=TECH_MENTOR_MODEL,
+                temperature=0.7,
+                max_tokens=2000,
+                stream=True
+            )
+            for chunk in stream:
+                content = chunk.choices[0].delta.content if chunk.choices else None
+                if content:
+                    if first_token is None:
+                        first_token = time.monotonic() - started
+                    parts.append(content)
+                    yield sse_event("token", {"content": content})
+            finished = True
+            yield sse_event("done", {"cached": False})
+        except Exception as e:
+            error_msg = str(e)
+            logging.error(f"Error streaming from Groq API: {error_msg}")
+            qa_entry["error"] = error_msg
+            yield sse_event("error", {"message": "Error calling AI API", "response": TECH_MENTOR_ERROR_MESSAGE})
+        finally:
+            # Time to first token is what the breaker judges; a client disconnect is not an upstream failure
+            groq_guard.release(started, "error" not in qa_entry, latency=first_token)
+            # Also runs when the client disconnects mid-stream (GeneratorExit)
+            ai_response = "".join(parts)
+            if finished:
+                qa_entry["response"] = ai_response
+                qa_entry["using_fallback"] = False
+                qa_entry["success"] = True
+            elif "error" in qa_entry:
+                qa_entry["response"] = TECH_MENTOR_ERROR_MESSAGE
+                qa_entry["partial_response"] = ai_response
+                qa_entry["using_fallback"] = True
+                qa_entry["success"] = False
+            else:
+                qa_entry["response"] = ai_response
+                qa_entry["using_fallback"] = False
+                qa_entry["success"] = False
+                qa_entry["aborted"] = True
+            try:
+                log_tech_mentor_entry(qa_entry)
+            except Exception as e:
+                logging.error(f"Failed to save streamed tech mentor answer: {e}")
+            if finished:
+                remember_turn(qa_entry, session, ai_response)
+            if finished and TECH_MENTOR_CACHE_ENABLED and ai_response and not contextual:
+                tech_mentor_cache.store(user_query, ai_response, created_at=qa_entry["createdAt"])
+
+    response = Response(stream_with_context(generate()), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    # Keep nginx and similar proxies from buffering the stream
+    response.headers["X-Accel-Buffering"] = "no"
+    response.headers["X-Cache"] = "HIT" if cached else ("MISS" if use_cache else "BYPASS")
+    return response
@@ -0,0 +1,204 @@
+"""
+Approximate Nearest Neighbour Index
+Inverted-file (IVF) index over normalized mentor embeddings, built in NumPy.
+A k-means coarse quantizer splits mentors into lists; queries probe the few
+closest lists and the caller reranks those candidates with exact scores.
+"""
+import logging
+import threading
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def top_k_indices(scores, k):
+    """Indices of the k highest scores, best first, without a full sort"""
+    n = scores.shape[0]
+    if k >= n:
+        return np.argsort(-scores, kind='stable')
+    part = np.argpartition(-scores, k - 1)[:k]
+    return part[np.argsort(-scores[part], kind='stable')]
+
+
+def top_k_per_row(scores, k):
+    """Row-wise top-k column indices of a 2-D score matrix, best first"""
+    n = scores.shape[1]
+    if k >= n:
+        return np.argsort(-scores, axis=1, kind='stable')
+    part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(scores, part, axis=1), axis=1, kind='stable')
+    return np.take_along_axis(part, order, axis=1)
+
+
+class IVFIndex:
+    """Spherical k-means coarse quantizer with per-list row postings"""
+
+    def __init__(self, n_lists, iters=10, max_train=50000, seed=0):
+        self.n_lists = n_lists
+        self.iters = iters
+        self.max_train = max_train
+        self.seed = seed
+        self.centroids = None
+        self.assignments = None
+        self.list_rows = None
+        self.list_offsets = None
+
+    def train(self, vectors):
+        """Fit centroids on a sample of the vectors"""
+        rng = np.random.default_rng(self.seed)
+        n = vectors.shape[0]
+        # Index rows explicitly: a VectorStore dequantizes in one vectorised step, whereas
+        # np.asarray on it would fall back to building the array row by row
+        if n > self.max_train:
+            rows = np.sort(rng.choice(n, self.max_train, replace=False))
+        else:
+            rows = np.arange(n)
+        sample = np.asarray(vectors[rows], dtype=np.float32)
+
+        n_lists = min(self.n_lists, sample.shape[0])
+        centroids = sample[rng.choice(sample.shape[0], n_lists, replace=False)].copy()
+        for _ in range(self.iters):
+            labels = self._nearest(sample, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            empty = norms[:, 0] == 0
+            # Re-seed empty lists from random points so every list stays useful
+            if empty.any():
+                sums[empty] = sample[rng.choice(sample.shape[0], int(empty.sum()), replace=False)]
+                norms[empty] = 1.0
+            centroids = sums / norms
+        self.centroids = centroids.astype(np.float32)
+        self.n_lists = n_lists
+
+    @staticmethod
+    def _nearest(vectors, centroids, chunk=65536):
+        labels = np.empty(vectors.shape[0], dtype=np.int32)
+        for start in range(0, vectors.shape[0], chunk):
+            block = np.asarray(vectors[start:start + chunk], dtype=np.float32)
+            labels[start:start + chunk] = np.argmax(block @ centroids.T, axis=1)
+        return labels
+
+    def assign(self, vectors):
+        return self._nearest(vectors, self.centroids)
+
+    def build(self, assignments):
+        """Group rows by list as a CSR-style (offsets, rows) pair"""
+        self.assignments = assignments
+        self.list_rows = np.argsort(assignments, kind='stable').astype(np.int64)
+        counts = np.bincount(assignments, minlength=self.n_lists)
+        self.list_offsets = np.concatenate(([0], np.cumsum(counts)))
+
+    def search(self, query, n_probe):
+        """Candidate rows from the n_probe lists closest to the query"""
+        centroid_scores = self.centroids @ query
+        probe = top_k_indices(centroid_scores, min(n_probe, self.n_lists))
+        chunks = [self.list_rows[self.list_offsets[c]:self.list_offsets[c + 1]] for c in probe]
+        return np.concatenate(chunks) if chunks else np.empty(0, dtype=np.int64)
+
+
+class AnnMentorIndex:
+    """
+    Keeps an IVF index in step with the mentor embedding index snapshots.
+    Small corpora are left to exact scoring, where brute force is faster anyway.
+    """
+
+    def __init__(self, min_size=5000, n_probe=8, retrain_growth=2.0):
+        self.min_size = min_size
+        self.n_probe = n_probe
+        self.retrain_growth = retrain_growth
+
+        self._lock = threading.Lock()
+        # (snapshot, ivf) swapped as one tuple so readers never pair an index with the wrong rows
+        self._state = (None, None)
+        self._trained_size = 0
+        self._retraining = False
+
+    @staticmethod
+    def lists_for(n):
+        return max(1, int(np.sqrt(n)))
+
+    def sync(self, snapshot):
+        """Reassign rows for a new snapshot, reusing centroids while the corpus is similar"""
+        if snapshot is self._state[0]:
+            return
+        with self._lock:
+            if snapshot is self._state[0]:
+                return
+            n = len(snapshot.ids)
+            if n < self.min_size:
+                self._state = (snapshot, None)
+                return
+
+            previous, ivf = self._state
+            if ivf is not None and previous.ids is snapshot.ids and previous.vectors is snapshot.vectors:
+                # Same rows and vectors (e.g. only facets changed): the index still applies
+                self._state = (snapshot, ivf)
+                return
+            if ivf is None:
+                start = time.time()
+                ivf = IVFIndex(self.lists_for(n))
+                ivf.train(snapshot.vectors)
+                ivf.build(ivf.assign(snapshot.vectors))
+                self._trained_size = n
+                logger.info(f"Built IVF index: {n} mentors, {ivf.n_lists} lists in {time.time() - start:.2f}s")
+            else:
+                # Carry assignments over for unchanged rows, only assign the new ones
+                old_rows = {mentor_id: row for row, mentor_id in enumerate(previous.ids)}
+                assignments = np.full(n, -1, dtype=np.int32)
+                fresh = []
+                for row, mentor_id in enumerate(snapshot.ids):
+                    old_row = old_rows.get(mentor_id)
+                    if old_row is not None and previous.texts[old_row] == snapshot.texts[row]:
+                        assignments[row] = ivf.assignments[old_row]
+                    else:
+                        fresh.append(row)
+                if fresh:
+                    assignments[fresh] = ivf.assign(snapshot.vectors[fresh])
+                updated = IVFIndex(ivf.n_lists)
+                updated.centroids = ivf.centroids
+                updated.build(assignments)
+                ivf = updated
+
+                if n > self.retrain_growth * self._trained_size and not self._retraining:
+                    self._retraining = True
+                    threading.Thread(target=self._retrain, args=(snapshot,), name='ivf-retrain', daemon=True).start()
+
+            self._state = (snapshot, ivf)
+
+    def _retrain(self, snapshot):
+        try:
+            ivf = IVFIndex(self.lists_for(len(snapshot.ids)))
+            ivf.train(snapshot.vectors)
+            ivf.build(ivf.assign(snapshot.vectors))
+            with self._lock:
+                current = self._state[0]
+                if current is not None and current.vectors is snapshot.vectors:
+                    self._state = (current, ivf)
+                    self._trained_size = len(snapshot.ids)
+                    logger.info(f"Retrained IVF index with {ivf.n_lists} lists")
+        except Exception as e:
+            logger.error(f"IVF retrain failed: {e}")
+        finally:
+            self._retraining = False
+
+    def candidates(self, snapshot, query, n_candidates, n_probe=None, mask=None):
+        """
+        Candidate rows for exact reranking, or None when the caller should score everything
+        (every eligible row when a mask is given). Probes more lists until at least
+        n_candidates rows that pass the mask are collected.
+        """
+        indexed, ivf = self._state
+        eligible = len(snapshot.ids) if mask is None else int(np.count_nonzero(mask))
+        if ivf is None or indexed is not snapshot or n_candidates >= eligible:
+            return None
+        n_probe = n_probe or self.n_probe
+        while True:
+            rows = ivf.search(query, n_probe)
+            if mask is not None:
+                rows = rows[mask[rows]]
+            if rows.shape[0] >= n_candidates or n_probe >= ivf.n_lists:
+                return rows
+            n_probe *= 2
@@ -0,0 +1,262 @@
+"""
+Conversation Sessions
+Server-side multi-turn state for the tech mentor. Each session keeps its most
+recent turns verbatim plus a rolling summary of everything older. Prompts are
+assembled newest-turn-first under a token budget. Once the verbatim turns
+outgrow their allowance, the oldest are folded into the summary on a
+background thread, so a long conversation costs about the same per call as
+a short one.
+"""
+import logging
+import re
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from pymongo import ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+# Try to use a real tokenizer, with a character-based estimate if it is not installed
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("cl100k_base")
+except Exception:
+    _ENCODING = None
+
+# Per-message framing tokens added by chat templates
+MESSAGE_OVERHEAD = 4
+# $slice count meaning "everything after the position" (it must be a positive 32-bit int)
+_SLICE_REST = 2 ** 31 - 1
+# A reply cut off by max_tokens can end inside its reasoning block, so an unclosed one runs to the end
+_THINK = re.compile(r"<think>.*?(?:</think>|\Z)", re.DOTALL | re.IGNORECASE)
+
+
+def estimate_tokens(text):
+    if not text:
+        return 0
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text))
+    # About four characters per token for English prose and code
+    return len(text) // 4 + 1
+
+
+def message_tokens(messages):
+    return sum(estimate_tokens(message["content"]) + MESSAGE_OVERHEAD for message in messages)
+
+
+def strip_reasoning(text):
+    """Drop <think>...</think> blocks, closed or not; the reasoning is not worth re-sending as history"""
+    return _THINK.sub("", text or "").strip()
+
+
+def truncate_tokens(text, budget):
+    """Cut text to roughly budget tokens, keeping the start"""
+    if estimate_tokens(text) <= budget:
+        return text
+    if _ENCODING is not None:
+        return _ENCODING.decode(_ENCODING.encode(text)[:budget])
+    return text[:budget * 4]
+
+
+class ConversationStore:
+    """Sessions in a Mongo collection, with budgeted prompt assembly and background summarisation"""
+
+    def __init__(self, collection_fn, summarize_fn, prompt_budget=3000, history_budget=1500,
+                 summary_budget=400, max_turns=12, ttl=30 * 86400):
+        # Called on use, so the collection can come from an extension initialised after import
+        self.collection_fn = collection_fn
+        # summarize_fn(previous_summary, turns, max_tokens) -> new summary text of about max_tokens
+        self.summarize_fn = summarize_fn
+        self.prompt_budget = prompt_budget
+        # Verbatim turns kept in the session before the oldest are folded into the summary
+        self.history_budget = history_budget
+        self.summary_budget = summary_budget
+        self.max_turns = max_turns
+        self.ttl = ttl
+
+        self._executor = None
+        self._lock = threading.Lock()
+        self._folding = set()
+        self._indexes_ready = False
+
+        self.created = 0
+        self.folds = 0
+        self.fold_failures = 0
+        self.prompt_tokens = 0
+        self.prompts = 0
+        self.turns_dropped_from_prompt = 0
+
+    @property
+    def collection(self):
+        collection = self.collection_fn()
+        if not self._indexes_ready:
+            collection.create_index("updated_at", expireAfterSeconds=int(self.ttl))
+            collection.create_index("owner_id")
+            self._indexes_ready = True
+        return collection
+
+    def create(self, owner_id=None):
+        now = datetime.utcnow()
+        session = {
+            "_id": uuid.uuid4().hex,
+            "owner_id": owner_id,
+            "summary": "",
+            "turns": [],
+            "turn_count": 0,
+            "folded_turns": 0,
+            "version": 0,
+            "created_at": now,
+            "updated_at": now
+        }
+        self.collection.insert_one(session)
+        self.created += 1
+        return session
+
+    def get(self, session_id):
+        return self.collection.find_one({"_id": session_id})
+
+    def delete(self, session_id):
+        return self.collection.delete_one({"_id": session_id}).deleted_count > 0
+
+    def build_messages(self, session, system_prompt, query):
+        """
+        Chat messages for the next call: system prompt, summary, as many recent
+        turns as fit the budget, then the new question. Returns (messages, tokens).
+        """
+        head = [{"role": "system", "content": system_prompt}]
+        summary = (session or {}).get("summary")
+        if summary:
+            head.append({
+                "role": "system",
+                "content": "Summary of the conversation so far: " + truncate_tokens(summary, self.summary_budget)
+            })
+        tail = [{"role": "user", "content": query}]
+        used = message_tokens(head) + message_tokens(tail)
+
+        history = []
+        turns = (session or {}).get("turns", [])
+        # Newest first, whole turns only, so the prompt never starts mid-exchange
+        for index in range(len(turns) - 1, -1, -1):
+            turn = turns[index]
+            pair = [{"role": "user", "content": turn["query"]}, {"role": "assistant", "content": turn["answer"]}]
+            cost = message_tokens(pair)
+            if used + cost > self.prompt_budget:
+                self.turns_dropped_from_prompt += index + 1
+                break
+            history[:0] = pair
+            used += cost
+
+        self.prompts += 1
+        self.prompt_tokens += used
+        return head + history + tail, used
+
+    def append_turn(self, session_id, query, answer):
+        """Record one question/answer exchange and fold old turns if the session has grown too long"""
+        turn = {
+            "query": query,
+            "answer": strip_reasoning(answer),
+            "tokens": estimate_tokens(query) + estimate_tokens(strip_reasoning(answer)) + 2 * MESSAGE_OVERHEAD,
+            "at": datetime.utcnow()
+        }
+        session = self.collection.find_one_and_update(
+            {"_id": session_id},
+            {
+                "$push": {"turns": turn},
+                "$inc": {"turn_count": 1, "version": 1},
+                "$set": {"updated_at": turn["at"]}
+            },
+            return_document=ReturnDocument.AFTER
+        )
+        if session is not None and self._needs_fold(session):
+            self._schedule_fold(session_id)
+        return session
+
+    def _needs_fold(self, session):
+        turns = session.get("turns", [])
+        return len(turns) > self.max_turns or sum(turn.get("tokens", 0) for turn in turns) > self.history_budget
+
+    def _schedule_fold(self, session_id):
+        with self._lock:
+            if session_id in self._folding:
+                return
+            self._folding.add(session_id)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="session-summary")
+        self._executor.submit(self._fold, session_id)
+
+    def _fold(self, session_id):
+        try:
+            session = self.get(session_id)
+            if session is None or not self._needs_fold(session):
+                return
+            turns = session["turns"]
+            # Keep the newest turns within half the history allowance; fold the rest
+            keep, kept_tokens = 0, 0
+            for turn in reversed(turns):
+                if keep >= self.max_turns // 2 or kept_tokens + turn.get("tokens", 0) > self.history_budget // 2:
+                    break
+                keep += 1
+                kept_tokens += turn.get("tokens", 0)
+            folded = turns[:len(turns) - keep]
+            if not folded:
+                return
+
+            try:
+                summary = self.summarize_fn(session.get("summary", ""), folded, self.summary_budget)
+            except Exception as e:
+                self.fold_failures += 1
+                logger.warning(f"Session summary failed, keeping an extract instead: {e}")
+                summary = self._extract(session.get("summary", ""), folded)
+            summary = strip_reasoning(summary)
+            if not summary:
+                # Nothing but (unfinished) reasoning came back
+                self.fold_failures += 1
+                logger.warning(f"Session {session_id} summary was empty, keeping an extract instead")
+                summary = self._extract(session.get("summary", ""), folded)
+            summary = truncate_tokens(summary, self.summary_budget)
+
+            # Drop exactly the folded prefix server-side, so turns appended while summarising survive.
+            # Appends only push, so the prefix is intact unless another fold landed first.
+            folded_before = session.get("folded_turns", 0)
+            result = self.collection.update_one(
+                {"_id": session_id, "folded_turns": folded_before if folded_before else {"$in": [None, 0]}},
+                [{"$set": {
+                    "summary": summary,
+                    "turns": {"$slice": ["$turns", len(folded), _SLICE_REST]},
+                    "folded_turns": folded_before + len(folded),
+                    "version": {"$add": ["$version", 1]}
+                }}]
+            )
+            if result.modified_count:
+                self.folds += 1
+        except Exception as e:
+            self.fold_failures += 1
+            logger.error(f"Folding session {session_id} failed: {e}")
+        finally:
+            with self._lock:
+                self._folding.discard(session_id)
+
+    def _extract(self, previous, turns):
+        """Summary without the LLM: the previous summary plus the start of each folded exchange"""
+        lines = [previous] if previous else []
+        for turn in turns:
+            lines.append(f"Q: {truncate_tokens(turn['query'], 40)} A: {truncate_tokens(turn['answer'], 60)}")
+        text = "\n".join(lines)
+        # Keep the most recent part when over budget
+        while estimate_tokens(text) > self.summary_budget and "\n" in text:
+            text = text.split("\n", 1)[1]
+        return text
+
+    def stats(self):
+        return {
+            "created": self.created,
+            "prompts": self.prompts,
+            "avg_prompt_tokens": round(self.prompt_tokens / self.prompts, 1) if self.prompts else 0.0,
+            "prompt_budget": self.prompt_budget,
+            "turns_dropped_from_prompt": self.turns_dropped_from_prompt,
+            "folds": self.folds,
+            "fold_failures": self.fold_failures,
+            "tokenizer": "tiktoken" if _ENCODING is not None else "estimate"
+        }
@@ -0,0 +1,127 @@
+"""
+Text Embedding Cache
+Caches embeddings keyed by a hash of the normalised text and the model name,
+so repeat lookups for unchanged text skip inference. The first tier is an
+in-process LRU with TTL; an optional Mongo collection acts as a shared
+second tier across workers and restarts.
+"""
+import hashlib
+import logging
+import threading
+from datetime import datetime
+
+import numpy as np
+from bson.binary import Binary
+from pymongo import UpdateOne
+
+from app.utils.ttl_cache import LRUTTLCache
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_text(text):
+    return " ".join(text.lower().split())
+
+
+class EmbeddingCache:
+    """Two-tier embedding cache in front of an encode function"""
+
+    def __init__(self, model_name, max_size=10000, ttl=3600, collection=None):
+        self.model_name = model_name
+        self.memory = LRUTTLCache(max_size=max_size, ttl=ttl)
+        self.collection = collection
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._indexes_ready = False
+        self.mongo_hits = 0
+        self.mongo_misses = 0
+        self.mongo_errors = 0
+        self.encoded = 0
+
+    def key(self, text):
+        digest = hashlib.sha256(f"{self.model_name}\0{normalize_text(text)}".encode("utf-8"))
+        return digest.hexdigest()
+
+    def _ensure_indexes(self):
+        if self._indexes_ready:
+            return
+        with self._lock:
+            if self._indexes_ready:
+                return
+            if self.ttl:
+                self.collection.create_index("created_at", expireAfterSeconds=int(self.ttl))
+            self._indexes_ready = True
+
+    def get_many(self, texts, encode):
+        """Embeddings for texts, calling encode() once for whatever neither tier has"""
+        keys = [self.key(text) for text in texts]
+        vectors = [self.memory.get(key) for key in keys]
+
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing and self.collection is not None:
+            try:
+                self._ensure_indexes()
+                wanted = list({keys[i] for i in missing})
+                found = {
+                    doc["_id"]: np.frombuffer(doc["vector"], dtype=np.float32)
+                    for doc in self.collection.find({"_id": {"$in": wanted}}, {"vector": 1})
+                }
+                for i in missing:
+                    vector = found.get(keys[i])
+                    if vector is not None:
+                        vectors[i] = vector
+                        self.memory.set(keys[i], vector)
+                self.mongo_hits += len(found)
+                self.mongo_misses += len(wanted) - len(found)
+            except Exception as e:
+                self.mongo_errors += 1
+                logger.warning(f"Embedding cache lookup failed: {e}")
+            missing = [i for i, vector in enumerate(vectors) if vector is None]
+
+        if missing:
+            # Encode each distinct text once even if it appears several times
+            first = {}
+            for i in missing:
+                first.setdefault(keys[i], i)
+            order = list(first.values())
+            encoded = np.asarray(encode([texts[i] for i in order]), dtype=np.float32)
+            self.encoded += len(order)
+            fresh = {keys[i]: encoded[row] for row, i in enumerate(order)}
+            for key, vector in fresh.items():
+                self.memory.set(key, vector)
+            for i in missing:
+                vectors[i] = fresh[keys[i]]
+
+            if self.collection is not None:
+                try:
+                    now = datetime.utcnow()
+                    self.collection.bulk_write([
+                        UpdateOne(
+                            {"_id": key},
+                            {"$set": {
+                                "model": self.model_name,
+                                "vector": Binary(vector.astype(np.float32).tobytes()),
+                                "created_at": now
+                            }},
+                            upsert=True
+                        )
+                        for key, vector in fresh.items()
+                    ], ordered=False)
+                except Exception as e:
+                    self.mongo_errors += 1
+                    logger.warning(f"Embedding cache write failed: {e}")
+
+        return np.vstack(vectors) if vectors else np.zeros((0, 0), dtype=np.float32)
+
+    def stats(self):
+        return {
+            "model": self.model_name,
+            "memory": self.memory.stats(),
+            "mongo": {
+                "enabled": self.collection is not None,
+                "hits": self.mongo_hits,
+                "misses": self.mongo_misses,
+                "errors": self.mongo_errors
+            } if self.collection is not None else {"enabled": False},
+            "encoded": self.encoded
+        }
@@ -0,0 +1,84 @@
+"""
+Sentence Embedding Model Loader
+Loads the SentenceTransformer on first use (or from a warmup thread) instead
+of at import time, and tracks its readiness for the /health endpoint.
+"""
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+EMBED_MODEL_NAME = os.getenv("EMBED_MODEL_NAME", "intfloat/e5-small-v2")
+
+_model = None
+_lock = threading.Lock()
+_state = {
+    "model": EMBED_MODEL_NAME,
+    "status": "not_loaded",
+    "load_seconds": None,
+    "error": None
+}
+
+
+def load_model():
+    """Load the model in the calling thread; safe to call more than once"""
+    global _model
+    if _model is not None:
+        return _model
+
+    with _lock:
+        if _model is not None:
+            return _model
+        _state["status"] = "loading"
+        _state["error"] = None
+        start = time.time()
+        try:
+            # Imported here so that importing the blueprints does not pull in torch
+            from sentence_transformers import SentenceTransformer
+            _model = SentenceTransformer(EMBED_MODEL_NAME)
+        except Exception as e:
+            _state["status"] = "error"
+            _state["error"] = str(e)
+            logger.error(f"Failed to load embedding model {EMBED_MODEL_NAME}: {e}")
+            raise
+        _state["load_seconds"] = round(time.time() - start, 2)
+        _state["status"] = "ready"
+        logger.info(f"Loaded embedding model {EMBED_MODEL_NAME} in {_state['load_seconds']}s")
+        return _model
+
+
+def get_model():
+    """Return the loaded model, loading it now if nobody has yet"""
+    return _model if _model is not None else load_model()
+
+
+def warmup():
+    """Start loading the model on a background thread"""
+    if _model is not None or _state["status"] == "loading":
+        return None
+
+    def _load():
+        try:
+            load_model()
+        except Exception:
+            pass  # already logged and reflected in status()
+
+    thread = threading.Thread(target=_load, name='embedding-model-warmup', daemon=True)
+    thread.start()
+    return thread
+
+
+def is_ready():
+    return _model is not None
+
+
+def status():
+    """Readiness details for /health"""
+    return dict(_state, ready=is_ready())
+
+
+def encode(texts):
+    """Normalized embeddings for a list of texts"""
+    return get_model().encode(texts, normalize_embeddings=True)
@@ -0,0 +1,283 @@
+"""
+Embedding Service
+Takes encode jobs from every caller and micro-batches concurrent requests into
+one forward pass. Inference runs inline on a dispatcher thread, in a process
+pool (so it never holds the Flask process's GIL), or in a local sidecar (see
+embedding_server.py).
+
+Choosing EMBED_SERVICE_MODE is a memory vs GIL trade-off:
+    inline   (default) the model lives in the serving process. Under gunicorn
+             with preload_app the master loads it once and every worker
+             shares those pages copy-on-write, so N workers hold one copy.
+             Inference competes with request threads for the GIL.
+    process  each process starts its own pool with its own model copy, so N
+             gunicorn workers hold N copies. Best for a single process
+             (python run.py) that must stay responsive while encoding.
+    sidecar  one embedding_server.py per host, shared by all workers over
+             HTTP: one copy and no GIL contention, at one local hop per
+             batch. The better choice for multi-worker deployments that
+             encode a lot.
+"""
+import base64
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import urllib.request
+from concurrent.futures import Future, ProcessPoolExecutor
+
+import numpy as np
+
+from app.utils import embedding_model
+
+logger = logging.getLogger(__name__)
+
+MODES = ("process", "inline", "sidecar")
+
+
+def _init_worker():
+    embedding_model.load_model()
+
+
+def _encode_in_worker(texts):
+    return np.asarray(embedding_model.encode(texts), dtype=np.float32)
+
+
+def _worker_ready():
+    return embedding_model.is_ready()
+
+
+def pack_vectors(vectors):
+    """float32 matrix -> JSON-safe payload (base64 keeps it compact and exact)"""
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    return {"shape": list(vectors.shape), "data": base64.b64encode(vectors.tobytes()).decode("ascii")}
+
+
+def unpack_vectors(payload):
+    return np.frombuffer(base64.b64decode(payload["data"]), dtype=np.float32).reshape(payload["shape"])
+
+
+class EmbeddingService:
+    """Micro-batching front end for sentence embedding inference"""
+
+    def __init__(self, mode="inline", workers=1, max_batch=64, max_wait_ms=5,
+                 sidecar_url=None, timeout=60):
+        if mode not in MODES:
+            raise ValueError(f"Unknown embedding service mode '{mode}', expected one of {MODES}")
+        self.mode = mode
+        self.workers = workers
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.sidecar_url = sidecar_url
+        self.timeout = timeout
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._started = False
+        self._pool = None
+        self._pool_ready = False
+        # Limits batches in flight to the number of workers, so the queue builds up into bigger batches
+        self._slots = threading.Semaphore(max(1, workers))
+
+        self._queued_texts = 0
+        self._inflight_batches = 0
+        self.batches = 0
+        self.batched_texts = 0
+        self.batched_jobs = 0
+        self.max_batch_seen = 0
+        self.last_batch_size = 0
+        self.errors = 0
+
+    def start(self):
+        """Start the dispatcher (and process pool); called lazily by encode()"""
+        if self._started or self.mode == "sidecar":
+            return
+        with self._lock:
+            if self._started:
+                return
+            if self.mode == "process":
+                # spawn, not fork: the parent has threads and possibly an open MongoClient
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker
+                )
+                self._pool.submit(_worker_ready).add_done_callback(self._on_pool_ready)
+            threading.Thread(target=self._dispatch, name="embedding-dispatcher", daemon=True).start()
+            self._started = True
+
+    def _on_pool_ready(self, future):
+        try:
+            self._pool_ready = bool(future.result())
+        except Exception as e:
+            logger.error(f"Embedding worker failed to start: {e}")
+
+    def encode(self, texts, timeout=None):
+        """Normalized embeddings for texts; blocks until the batch containing them is done"""
+        texts = list(texts)
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        timeout = timeout or self.timeout
+        if self.mode == "sidecar":
+            return self._encode_remote(texts, timeout)
+
+        self.start()
+        # Large jobs are split so they interleave fairly with small interactive ones
+        futures = []
+        for start in range(0, len(texts), self.max_batch):
+            chunk = texts[start:start + self.max_batch]
+            future = Future()
+            with self._lock:
+                self._queued_texts += len(chunk)
+            self._queue.put((chunk, future))
+            futures.append(future)
+        parts = [future.result(timeout=timeout) for future in futures]
+        return parts[0] if len(parts) == 1 else np.vstack(parts)
+
+    def _dispatch(self):
+        while True:
+            jobs = [self._queue.get()]
+            size = len(jobs[0][0])
+            deadline = time.monotonic() + self.max_wait
+            while size < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    job = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                jobs.append(job)
+                size += len(job[0])
+
+            texts = [text for chunk, _ in jobs for text in chunk]
+            with self._lock:
+                self._queued_texts -= len(texts)
+                self.batches += 1
+                self.batched_jobs += len(jobs)
+                self.batched_texts += len(texts)
+                self.last_batch_size = len(texts)
+                self.max_batch_seen = max(self.max_batch_seen, len(texts))
+
+            self._slots.acquire()
+            with self._lock:
+                self._inflight_batches += 1
+            if self.mode == "process":
+                try:
+                    future = self._pool.submit(_encode_in_worker, texts)
+                except Exception as e:
+                    # e.g. a broken pool; fail these jobs rather than the dispatcher thread
+                    future = Future()
+                    future.set_exception(e)
+                future.add_done_callback(lambda f, jobs=jobs: self._complete(jobs, f))
+            else:
+                result = Future()
+                try:
+                    result.set_result(_encode_in_worker(texts))
+                except Exception as e:
+                    result.set_exception(e)
+                self._complete(jobs, result)
+
+    def _complete(self, jobs, future):
+        with self._lock:
+            self._inflight_batches -= 1
+        self._slots.release()
+        try:
+            vectors = future.result()
+        except Exception as e:
+            with self._lock:
+                self.errors += 1
+            logger.error(f"Embedding batch of {len(jobs)} jobs failed: {e}")
+            for _, job_future in jobs:
+                job_future.set_exception(e)
+            return
+        offset = 0
+        for chunk, job_future in jobs:
+            job_future.set_result(vectors[offset:offset + len(chunk)])
+            offset += len(chunk)
+
+    def _encode_remote(self, texts, timeout):
+        body = json.dumps({"texts": texts}).encode("utf-8")
+        req = urllib.request.Request(
+            self.sidecar_url.rstrip("/") + "/encode",
+            data=body,
+            headers={"Content-Type": "application/json"},
+            method="POST"
+        )
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            return unpack_vectors(json.loads(resp.read()))
+
+    def is_ready(self):
+        if self.mode == "process":
+            return self._pool_ready
+        return embedding_model.is_ready()
+
+    def stats(self):
+        """Queue depth and batching metrics"""
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "workers": self.workers if self.mode == "process" else None,
+                "ready": self.is_ready(),
+                "queue_depth": self._queue.qsize(),
+                "queued_texts": self._queued_texts,
+                "inflight_batches": self._inflight_batches,
+                "batches": self.batches,
+                "batched_jobs": self.batched_jobs,
+                "batched_texts": self.batched_texts,
+                "avg_batch_size": round(self.batched_texts / self.batches, 2) if self.batches else 0,
+                "max_batch_size": self.max_batch_seen,
+                "last_batch_size": self.last_batch_size,
+                "errors": self.errors
+            }
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_service():
+    """Process-wide service configured from the environment"""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = EmbeddingService(
+                    # Inline by default so pre-forked workers share the master's model (see above)
+                    mode=os.getenv("EMBED_SERVICE_MODE", "inline"),
+                    workers=int(os.getenv("EMBED_SERVICE_WORKERS", "1")),
+                    max_batch=int(os.getenv("EMBED_SERVICE_MAX_BATCH", "64")),
+                    max_wait_ms=float(os.getenv("EMBED_SERVICE_MAX_WAIT_MS", "5")),
+                    sidecar_url=os.getenv("EMBED_SERVICE_URL", "http://127.0.0.1:5055")
+                )
+    return _service
+
+
+def encode(texts):
+    return get_service().encode(texts)
+
+
+def warmup():
+    """Get inference ready without blocking: load the model or spin up the worker pool"""
+    service = get_service()
+    if service.mode == "inline":
+        embedding_model.warmup()
+    service.start()
+
+
+def status():
+    """Model readiness for /health, wherever inference actually runs"""
+    service = get_service()
+    if service.mode == "inline":
+        return dict(embedding_model.status(), service=service.stats())
+    if service.mode == "sidecar":
+        try:
+            with urllib.request.urlopen(service.sidecar_url.rstrip("/") + "/metrics", timeout=1) as resp:
+                remote = json.loads(resp.read())
+            return {"model": embedding_model.EMBED_MODEL_NAME, "ready": remote.get("ready", False), "service": remote}
+        except Exception as e:
+            return {"model": embedding_model.EMBED_MODEL_NAME, "ready": False, "error": f"Sidecar unreachable: {e}"}
+    return {"model": embedding_model.EMBED_MODEL_NAME, "ready": service.is_ready(), "service": service.stats()}
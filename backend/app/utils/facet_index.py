@@ -0,0 +1,112 @@
+"""
+Mentor Facet Index
+Row masks over the mentor index for structured filters. Availability and
+expertise keep a posting list of rows per value, and rating is a dense
+column. A filter becomes a boolean bitmap after a few vectorized ORs and
+ANDs, so only eligible mentors are scored.
+"""
+import numpy as np
+
+TOKEN_FACETS = ("availability", "expertise")
+FACET_FIELDS = TOKEN_FACETS + ("rating",)
+
+
+def _tokens(value):
+    if value is None:
+        return []
+    if isinstance(value, str):
+        # seed_mentors.py stores availability as a single string, auth.register as a list
+        value = [value]
+    return sorted({str(item).strip().lower() for item in value if str(item).strip()})
+
+
+def facet_values(doc):
+    """Normalized facet values of one mentor document"""
+    try:
+        rating = float(doc.get("rating"))
+    except (TypeError, ValueError):
+        rating = None
+    return {
+        "availability": _tokens(doc.get("availability")),
+        "expertise": _tokens(doc.get("expertise")),
+        "rating": rating
+    }
+
+
+def parse_filters(raw):
+    """
+    Validate a request's "filters" object into {facet: [values], "min_rating": float}.
+    Raises ValueError with a message meant for the client.
+    """
+    if raw is None:
+        return {}
+    if not isinstance(raw, dict):
+        raise ValueError("filters must be an object")
+    unknown = set(raw) - set(TOKEN_FACETS) - {"min_rating"}
+    if unknown:
+        raise ValueError(f"Unknown filters: {', '.join(sorted(unknown))}")
+
+    filters = {}
+    for facet in TOKEN_FACETS:
+        if raw.get(facet) is None:
+            continue
+        value = raw[facet]
+        if not isinstance(value, (str, list)):
+            raise ValueError(f"filters.{facet} must be a string or a list of strings")
+        tokens = _tokens(value)
+        if tokens:
+            filters[facet] = tokens
+    if raw.get("min_rating") is not None:
+        try:
+            filters["min_rating"] = float(raw["min_rating"])
+        except (TypeError, ValueError):
+            raise ValueError("filters.min_rating must be a number")
+    return filters
+
+
+class FacetIndex:
+    """Facet postings and rating column aligned to an index snapshot's rows"""
+
+    def __init__(self, ids, values):
+        self.size = len(ids)
+        self.ids = ids
+        self.values = values
+        self._rows = None
+
+        postings = {facet: {} for facet in TOKEN_FACETS}
+        for row, doc in enumerate(values):
+            for facet in TOKEN_FACETS:
+                for token in doc[facet]:
+                    postings[facet].setdefault(token, []).append(row)
+        self.postings = {
+            facet: {token: np.asarray(rows, dtype=np.int32) for token, rows in tokens.items()}
+            for facet, tokens in postings.items()
+        }
+        # Unrated mentors are NaN, which fails every min_rating comparison
+        self.rating = np.array(
+            [np.nan if doc["rating"] is None else doc["rating"] for doc in values], dtype=np.float32
+        )
+
+    def mask(self, filters):
+        """Boolean row mask for parsed filters (any value within a facet, all facets), or None if unfiltered"""
+        mask = None
+        for facet in TOKEN_FACETS:
+            wanted = filters.get(facet)
+            if not wanted:
+                continue
+            bitmap = np.zeros(self.size, dtype=bool)
+            for token in wanted:
+                rows = self.postings[facet].get(token)
+                if rows is not None:
+                    bitmap[rows] = True
+            mask = bitmap if mask is None else mask & bitmap
+        if filters.get("min_rating") is not None:
+            bitmap = self.rating >= filters["min_rating"]
+            mask = bitmap if mask is None else mask & bitmap
+        return mask
+
+    def row_of(self, mentor_id):
+        """Row of a mentor id in this snapshot, or None"""
+        if self._rows is None:
+            self._rows = {mentor_id: row for row, mentor_id in enumerate(self.ids)}
+        return self._rows.get(mentor_id)
@@ -0,0 +1,62 @@
+"""
+Opportunity Facets
+Counts per type, location, category and skill for the browse filters,
+computed in one $facet aggregation. Each facet applies every active filter
+except its own, so ticking "Internship" still shows how many part-time roles
+there are instead of collapsing the other options to zero.
+
+Filters are given as query parameters, repeated or comma-separated:
+    type=Internship,Part-time&location=Remote&skills=Python&skills=React
+Values within one field are ORed; different fields are ANDed.
+"""
+
+# (query parameter, document field); skills is an array, the others are strings
+FACET_FIELDS = (("type", "type"), ("location", "location"), ("category", "category"), ("skills", "skills"))
+
+
+def parse_facet_filters(args):
+    """{field: sorted values} from request args, ignoring empty and "all" values"""
+    filters = {}
+    for param, field in FACET_FIELDS:
+        values = set()
+        for raw in args.getlist(param):
+            values.update(value.strip() for value in raw.split(",") if value.strip())
+        values.discard("all")
+        if values:
+            filters[field] = sorted(values)
+    return filters
+
+
+def _match(filters, skip=None):
+    # $in matches an array field when any element is listed, which is what the skills filter wants
+    return {field: {"$in": values} for field, values in filters.items() if field != skip}
+
+
+def facet_pipeline(filters, limit):
+    """Aggregation returning one document: {"total": [{"count": n}], <field>: [{"_id": value, "count": n}]}"""
+    facets = {"total": [{"$match": _match(filters)}, {"$count": "count"}]}
+    for _, field in FACET_FIELDS:
+        stages = [{"$match": _match(filters, skip=field)}, {"$project": {field: 1}}]
+        if field == "skills":
+            stages.append({"$unwind": "$skills"})
+        stages += [
+            {"$match": {field: {"$nin": [None, ""]}}},
+            {"$group": {"_id": f"${field}", "count": {"$sum": 1}}},
+            {"$sort": {"count": -1, "_id": 1}},
+            {"$limit": limit}
+        ]
+        facets[field] = stages
+    return [{"$facet": facets}]
+
+
+def facet_counts(collection, filters, limit):
+    """{"total": n, "facets": {field: [{"value": v, "count": n}, ...]}} for the given filters"""
+    result = next(collection.aggregate(facet_pipeline(filters, limit)), {})
+    total = result.get("total") or [{"count": 0}]
+    return {
+        "total": total[0]["count"],
+        "facets": {
+            field: [{"value": bucket["_id"], "count": bucket["count"]} for bucket in result.get(field, [])]
+            for _, field in FACET_FIELDS
+        }
+    }
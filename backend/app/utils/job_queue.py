@@ -0,0 +1,380 @@
+"""
+Background Job Queue
+Runs slow work (LLM calls) off the request thread. Each job is a document in
+Mongo, so any worker can answer a status poll. Jobs run on a bounded thread
+pool in the process that accepted them, under a lease that a heartbeat
+renews while the handler runs; if that process dies, another worker's sweeper
+picks the job up once the lease expires. A run that lost its lease anyway
+(e.g. a stalled process) drops its result rather than overwrite or announce
+the newer run's. Finished jobs can be pushed to a callback URL.
+
+Callbacks are off unless hosts are allowlisted. Listed hosts are trusted as
+given (they may be internal); "*" admits any host whose every address is
+public, checked again before each delivery so a DNS change can't point a
+callback at loopback, private or link-local addresses. Redirects are never
+followed.
+"""
+import ipaddress
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from urllib.parse import urlparse
+
+from pymongo import ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+FINISHED = ("done", "failed")
+
+
+class QueueFull(Exception):
+    """Raised by submit() when max_pending jobs are already waiting in this process"""
+
+
+def check_public_host(hostname, port):
+    """Raise ValueError unless every address hostname resolves to is publicly routable"""
+    try:
+        infos = socket.getaddrinfo(hostname, port, proto=socket.IPPROTO_TCP)
+    except socket.gaierror:
+        raise ValueError(f"callback_url host '{hostname}' does not resolve")
+    for info in infos:
+        address = ipaddress.ip_address(info[4][0].split("%")[0])
+        if not address.is_global or address.is_multicast:
+            raise ValueError(f"callback_url host '{hostname}' resolves to a non-public address")
+
+
+def validate_callback_url(url, allowed_hosts=None):
+    """
+    Raise ValueError unless url is an http(s) URL on an allowed host. With no
+    allowed hosts callbacks are refused; "*" allows any host with only public addresses.
+    """
+    parsed = urlparse(url)
+    if parsed.scheme not in ("http", "https") or not parsed.hostname:
+        raise ValueError("callback_url must be an http or https URL")
+    if not allowed_hosts:
+        raise ValueError("callback_url is not enabled on this server")
+    hostname = parsed.hostname.lower()
+    if hostname in allowed_hosts:
+        return url
+    if "*" not in allowed_hosts:
+        raise ValueError(f"callback_url host '{parsed.hostname}' is not allowed")
+    check_public_host(hostname, parsed.port or (443 if parsed.scheme == "https" else 80))
+    return url
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    # A redirect could send the callback somewhere validate_callback_url never saw
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+_callback_opener = urllib.request.build_opener(_NoRedirect)
+
+
+class JobQueue:
+    """Mongo-backed job records executed on a local bounded pool"""
+
+    def __init__(self, collection_fn, handler, name="jobs", workers=4, max_pending=100,
+                 lease_seconds=300, max_attempts=3, sweep_interval=30, result_ttl=7 * 86400,
+                 poll_interval=0.5, callback_timeout=10, callback_retries=3, callback_hosts=(),
+                 heartbeat_interval=None):
+        # Called on use, so the collection can come from an extension initialised after import
+        self.collection_fn = collection_fn
+        self.handler = handler
+        self.name = name
+        self.workers = workers
+        self.max_pending = max_pending
+        self.lease_seconds = lease_seconds
+        # How often a running job's lease is pushed forward; a few renewals fit in one lease
+        self.heartbeat_interval = heartbeat_interval or lease_seconds / 3
+        self.max_attempts = max_attempts
+        self.sweep_interval = sweep_interval
+        self.result_ttl = result_ttl
+        self.poll_interval = poll_interval
+        self.callback_timeout = callback_timeout
+        self.callback_retries = callback_retries
+        # Hosts callbacks may go to (see validate_callback_url); empty disables callbacks
+        self.callback_hosts = set(callback_hosts or ())
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+        self._lock = threading.Lock()
+        self._executor = None
+        self._sweeper = None
+        self._indexes_ready = False
+        self._pending = 0
+        # job_id -> Event set when a job run by this process finishes (for long-polls)
+        self._events = {}
+
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.recovered = 0
+        self.leases_lost = 0
+        self.callbacks_sent = 0
+        self.callbacks_failed = 0
+
+    @property
+    def collection(self):
+        return self.collection_fn()
+
+    def _ensure_indexes(self):
+        if self._indexes_ready:
+            return
+        self.collection.create_index([("status", 1), ("lease_until", 1)])
+        if self.result_ttl:
+            self.collection.create_index("created_at", expireAfterSeconds=int(self.result_ttl))
+        self._indexes_ready = True
+
+    def _pool(self):
+        # Created on first use so a pre-fork import never hands threads to a child
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=self.name)
+        return self._executor
+
+    def _reserve(self):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                return False
+            self._pending += 1
+            return True
+
+    def _release(self):
+        with self._lock:
+            self._pending -= 1
+
+    def submit(self, payload, callback_url=None):
+        """Record and enqueue a job; returns its id. Raises QueueFull when this process is saturated."""
+        if not self._reserve():
+            self.rejected += 1
+            raise QueueFull(f"{self.max_pending} {self.name} jobs already pending")
+        self.start()
+        job_id = uuid.uuid4().hex
+        now = datetime.utcnow()
+        try:
+            self._ensure_indexes()
+            self.collection.insert_one({
+                "_id": job_id,
+                "status": "queued",
+                "payload": payload,
+                "callback_url": callback_url,
+                "attempts": 0,
+                "lease_owner": self.owner,
+                "lease_until": now + timedelta(seconds=self.lease_seconds),
+                "created_at": now,
+                "updated_at": now
+            })
+        except Exception:
+            self._release()
+            raise
+        self._events[job_id] = threading.Event()
+        self.submitted += 1
+        self._pool().submit(self._execute, job_id)
+        return job_id
+
+    def _execute(self, job_id):
+        try:
+            now = datetime.utcnow()
+            job = self.collection.find_one_and_update(
+                {"_id": job_id, "lease_owner": self.owner, "status": "queued"},
+                {
+                    "$set": {
+                        "status": "running",
+                        "started_at": now,
+                        "updated_at": now,
+                        "lease_until": now + timedelta(seconds=self.lease_seconds)
+                    },
+                    "$inc": {"attempts": 1}
+                },
+                return_document=ReturnDocument.AFTER
+            )
+            if job is None:
+                # Lease expired and another worker took it over
+                return
+
+            # This run's lease; the attempt count tells it apart from a later run by the same process
+            lease = {"_id": job_id, "lease_owner": self.owner, "attempts": job["attempts"], "status": "running"}
+            stop = threading.Event()
+            heartbeat = threading.Thread(
+                target=self._heartbeat, args=(lease, stop), name=f"{self.name}-heartbeat", daemon=True
+            )
+            heartbeat.start()
+            update = {"updated_at": datetime.utcnow()}
+            try:
+                update["result"] = self.handler(job["payload"])
+                update["status"] = "done"
+            except Exception as e:
+                logger.error(f"{self.name} job {job_id} failed: {e}")
+                update["error"] = str(e)
+                update["status"] = "failed"
+            finally:
+                stop.set()
+            update["finished_at"] = datetime.utcnow()
+            written = self.collection.update_one(lease, {"$set": update, "$unset": {"lease_until": ""}})
+            if written.modified_count == 0:
+                # The sweeper handed the job to another run, whose result and callback win
+                self.leases_lost += 1
+                logger.warning(f"{self.name} job {job_id} lost its lease; result dropped, no callback sent")
+                return
+            if update["status"] == "done":
+                self.completed += 1
+            else:
+                self.failed += 1
+            # Wake long-polls before spending time on the callback
+            self._notify(job_id)
+            if job.get("callback_url"):
+                self._deliver(job_id, job["callback_url"], update)
+        except Exception as e:
+            logger.error(f"{self.name} job {job_id} could not be processed: {e}")
+        finally:
+            self._notify(job_id)
+            self._release()
+
+    def _heartbeat(self, lease, stop):
+        """Keep pushing a running job's lease forward until stop is set or the lease is gone"""
+        while not stop.wait(self.heartbeat_interval):
+            try:
+                renewed = self.collection.update_one(
+                    lease, {"$set": {"lease_until": datetime.utcnow() + timedelta(seconds=self.lease_seconds)}}
+                )
+            except Exception as e:
+                logger.warning(f"{self.name} job {lease['_id']} lease renewal failed: {e}")
+                continue
+            if renewed.matched_count == 0:
+                return
+
+    def _notify(self, job_id):
+        event = self._events.pop(job_id, None)
+        if event is not None:
+            event.set()
+
+    def _deliver(self, job_id, url, body):
+        """POST the finished job to its callback URL, retrying with backoff"""
+        data = json.dumps({
+            "job_id": job_id,
+            "status": body["status"],
+            "result": body.get("result"),
+            "error": body.get("error")
+        }, default=str).encode("utf-8")
+        error = None
+        attempts = 0
+        for attempt in range(self.callback_retries):
+            attempts = attempt + 1
+            try:
+                # Checked again at send time: the host may resolve differently than at submit
+                validate_callback_url(url, self.callback_hosts)
+            except ValueError as e:
+                error = str(e)
+                break
+            try:
+                request = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"}, method="POST")
+                with _callback_opener.open(request, timeout=self.callback_timeout) as resp:
+                    status_code = resp.status
+                self.callbacks_sent += 1
+                self.collection.update_one({"_id": job_id}, {"$set": {"callback": {
+                    "status": "delivered", "status_code": status_code,
+                    "attempts": attempt + 1, "delivered_at": datetime.utcnow()
+                }}})
+                return True
+            except Exception as e:
+                error = str(e)
+                time.sleep(min(2 ** attempt, 10))
+        self.callbacks_failed += 1
+        logger.warning(f"{self.name} job {job_id} callback to {url} failed: {error}")
+        self.collection.update_one({"_id": job_id}, {"$set": {"callback": {
+            "status": "failed", "attempts": attempts, "error": error
+        }}})
+        return False
+
+    def get(self, job_id):
+        return self.collection.find_one({"_id": job_id})
+
+    def wait(self, job_id, timeout):
+        """The job document once finished, or as it stands after timeout seconds (None if unknown)"""
+        event = self._events.get(job_id)
+        if event is not None:
+            event.wait(timeout)
+            return self.get(job_id)
+
+        # Running elsewhere (or already finished): poll the shared record
+        deadline = time.monotonic() + timeout
+        while True:
+            job = self.get(job_id)
+            if job is None or job["status"] in FINISHED or time.monotonic() >= deadline:
+                return job
+            time.sleep(min(self.poll_interval, max(0.0, deadline - time.monotonic())))
+
+    def start(self):
+        """Start the sweeper that recovers jobs whose worker died (idempotent)"""
+        if self._sweeper is not None or not self.sweep_interval:
+            return
+        with self._lock:
+            if self._sweeper is not None:
+                return
+            self._sweeper = threading.Thread(target=self._sweep_loop, name=f"{self.name}-sweeper", daemon=True)
+            self._sweeper.start()
+
+    def _sweep_loop(self):
+        while True:
+            time.sleep(self.sweep_interval)
+            try:
+                self.sweep()
+            except Exception as e:
+                logger.error(f"{self.name} sweep failed: {e}")
+
+    def sweep(self):
+        """Fail jobs out of attempts and re-run other jobs whose lease expired; returns the number re-run"""
+        now = datetime.utcnow()
+        expired = {"status": {"$in": ["queued", "running"]}, "lease_until": {"$lt": now}}
+        self.collection.update_many(
+            dict(expired, attempts={"$gte": self.max_attempts}),
+            {
+                "$set": {"status": "failed", "error": "Worker lost too many times", "finished_at": now, "updated_at": now},
+                "$unset": {"lease_until": ""}
+            }
+        )
+        recovered = 0
+        while self._reserve():
+            job = self.collection.find_one_and_update(
+                dict(expired, attempts={"$lt": self.max_attempts}),
+                {"$set": {
+                    "status": "queued",
+                    "lease_owner": self.owner,
+                    "lease_until": now + timedelta(seconds=self.lease_seconds),
+                    "updated_at": now
+                }}
+            )
+            if job is None:
+                self._release()
+                break
+            self._events[job["_id"]] = threading.Event()
+            self._pool().submit(self._execute, job["_id"])
+            recovered += 1
+        if recovered:
+            self.recovered += recovered
+            logger.info(f"Recovered {recovered} abandoned {self.name} jobs")
+        return recovered
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "pending": self._pending,
+            "max_pending": self.max_pending,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "recovered": self.recovered,
+            "leases_lost": self.leases_lost,
+            "callbacks_sent": self.callbacks_sent,
+            "callbacks_failed": self.callbacks_failed
+        }
@@ -0,0 +1,83 @@
+"""
+Embedding Match Service
+Ranks a list of candidates (students, applicants) against one query profile,
+such as a mentor's expertise or an opportunity's skills and description.
+Uses the same 0.6 embedding / 0.4 TF-IDF blend as /match. Candidate
+texts go through the shared embedding cache, so unchanged profiles are not
+re-encoded; ranking N candidates is then one matrix-vector product plus one
+sparse product.
+"""
+import logging
+
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+logger = logging.getLogger(__name__)
+
+
+def list_text(value):
+    """Lower-cased text of a list field (or a plain string)"""
+    if not value:
+        return ""
+    if isinstance(value, str):
+        return value.lower()
+    return " ".join(str(item) for item in value).lower()
+
+
+def student_text(doc):
+    """Student profile text, same as /match uses; falls back to skills when no interests are set"""
+    return list_text(doc.get("interests")) or list_text(doc.get("skills"))
+
+
+def mentor_text(doc):
+    return list_text(doc.get("expertise"))
+
+
+def opportunity_text(doc):
+    return " ".join(part for part in (list_text(doc.get("skills")), list_text(doc.get("description"))) if part)
+
+
+class MatchService:
+    """Hybrid embedding + TF-IDF scoring of candidate texts against a query text"""
+
+    def __init__(self, encode, embed_weight=0.6, tfidf_weight=0.4):
+        self.encode = encode
+        self.embed_weight = embed_weight
+        self.tfidf_weight = tfidf_weight
+
+    def _tfidf_scores(self, query_text, texts):
+        try:
+            matrix = TfidfVectorizer().fit_transform(texts + [query_text])
+        except ValueError:
+            # Nothing but stop words / empty strings
+            return np.zeros(len(texts), dtype=np.float32)
+        return np.asarray((matrix[:-1] @ matrix[-1].T).todense()).ravel()
+
+    def score(self, query_text, texts):
+        """Similarity of each text to the query, in input order"""
+        if not texts:
+            return np.zeros(0, dtype=np.float32)
+        vectors = np.asarray(self.encode([query_text] + list(texts)), dtype=np.float32)
+        embed_scores = vectors[1:] @ vectors[0]
+        return self.embed_weight * embed_scores + self.tfidf_weight * self._tfidf_scores(query_text, list(texts))
+
+    def rank(self, query_text, items, text_fn, key="match_score"):
+        """
+        Return items (dicts) best match first with item[key] set. Items without any
+        profile text get None and keep their relative order at the end.
+        """
+        if not query_text:
+            for item in items:
+                item[key] = None
+            return items
+
+        texts = [text_fn(item) for item in items]
+        scored = [i for i, text in enumerate(texts) if text]
+        scores = self.score(query_text, [texts[i] for i in scored])
+        for item in items:
+            item[key] = None
+        for i, score in zip(scored, scores):
+            items[i][key] = round(float(score), 4)
+
+        order = sorted(scored, key=lambda i: -items[i][key]) + [i for i in range(len(items)) if not texts[i]]
+        return [items[i] for i in order]
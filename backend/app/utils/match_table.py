@@ -0,0 +1,375 @@
+"""
+Materialized Match Table
+Stores each student's top-N mentors in a Mongo collection, so /match can
+answer with one indexed read. A background worker keeps the table current:
+- Students whose interests changed are re-ranked.
+- When mentors change, only the students whose lists could move are touched.
+- One worker per deployment does the work, coordinated by a lease in Mongo.
+"""
+import hashlib
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import numpy as np
+from bson import ObjectId
+from pymongo import DeleteOne, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+STATE_ID = "mentor_matches"
+
+# Past this share of changed mentors a full rebuild is cheaper than merging deltas
+FULL_REBUILD_RATIO = 0.25
+
+
+def profile_hash(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def student_keys(doc):
+    """Every id a student can be looked up by (ObjectId string plus legacy ids)"""
+    keys = [str(doc["_id"])]
+    for field in ("id", "student_id"):
+        if doc.get(field):
+            keys.append(str(doc[field]))
+    return list(dict.fromkeys(keys))
+
+
+class MatchTable:
+    """Top-N mentors per student, precomputed into the mentor_matches collection"""
+
+    def __init__(self, collection, students, state_collection, profile_fn, encode,
+                 load_snapshot, rank_many, score_rows, model_name, generation_fn=None,
+                 top_n=50, interval=5, scan_interval=600, chunk_size=512, lease_seconds=60,
+                 enabled=True):
+        self.collection = collection
+        self.students = students
+        self.state_collection = state_collection
+        self.profile_fn = profile_fn
+        self.encode = encode
+        self.load_snapshot = load_snapshot
+        self.rank_many = rank_many
+        self.score_rows = score_rows
+        self.model_name = model_name
+        self.generation_fn = generation_fn
+        self.top_n = top_n
+        self.interval = interval
+        self.scan_interval = scan_interval
+        self.chunk_size = chunk_size
+        self.lease_seconds = lease_seconds
+        self.enabled = enabled
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+        self._lock = threading.Lock()
+        self._thread = None
+        self._indexes_ready = False
+        # Mentor texts and digest the table currently reflects (None until known)
+        self._mentor_texts = None
+        self._digest = None
+        self._generation = None
+        self._last_scan = 0.0
+
+        self.hits = 0
+        self.misses = 0
+        self.reranked = 0
+        self.merged = 0
+        self.cycles = 0
+        self.errors = 0
+        self.last_cycle_seconds = None
+
+    def ensure_indexes(self):
+        if self._indexes_ready:
+            return
+        self.collection.create_index("keys")
+        self.collection.create_index("matches.mentor_id")
+        self.collection.create_index("stale", partialFilterExpression={"stale": True})
+        self._indexes_ready = True
+
+    def lookup(self, student_id, k, keep=None):
+        """
+        Stored top-k for a student, or None when it has to be computed live.
+        keep(mentor_id) restricts the stored list to eligible mentors; that is still
+        exact as long as at least k of the stored top-N pass.
+        """
+        if not self.enabled:
+            return None
+        try:
+            doc = self.collection.find_one(
+                {"keys": str(student_id)},
+                {"matches": 1 if keep else {"$slice": k}, "count": 1, "top_n": 1, "stale": 1}
+            )
+        except Exception as e:
+            logger.warning(f"Match table lookup failed: {e}")
+            doc = None
+        if doc and not doc.get("stale") and "matches" in doc:
+            # A shorter list than top_n means every mentor is already in it
+            complete = doc.get("count", 0) < doc.get("top_n", 0)
+            matches = doc["matches"]
+            if keep is not None:
+                matches = [match for match in matches if keep(match["mentor_id"])]
+                enough = len(matches) >= k
+            else:
+                enough = k <= doc.get("top_n", 0)
+            if enough or complete:
+                self.hits += 1
+                return matches[:k]
+        self.misses += 1
+        return None
+
+    def mark_stale(self, student_id):
+        """Queue a student for re-ranking (call after their interests change)"""
+        if not self.enabled:
+            return
+        try:
+            self.collection.update_one(
+                {"_id": str(student_id)},
+                {"$set": {"stale": True, "marked_at": datetime.utcnow()}},
+                upsert=True
+            )
+        except Exception as e:
+            logger.warning(f"Failed to mark match table entry for {student_id} stale: {e}")
+
+    def store(self, student, text, matches, started):
+        """Write a live-computed ranking back so the next read is served from the table"""
+        if not self.enabled:
+            return
+        try:
+            self._write([self._upsert(student, text, matches, started)])
+        except Exception as e:
+            logger.warning(f"Failed to store matches for {student['_id']}: {e}")
+
+    def _upsert(self, student, text, matches, started):
+        matches = matches[:self.top_n]
+        # Skipped (duplicate key) if the student was marked stale after we read their profile
+        return UpdateOne(
+            {"_id": str(student["_id"]),
+             "$or": [{"marked_at": {"$exists": False}}, {"marked_at": {"$lte": started}}]},
+            {"$set": {
+                "keys": student_keys(student),
+                "profile_hash": profile_hash(text),
+                "matches": matches,
+                "count": len(matches),
+                "top_n": self.top_n,
+                "stale": False,
+                "updated_at": datetime.utcnow()
+            }},
+            upsert=True
+        )
+
+    def _write(self, ops):
+        if not ops:
+            return
+        try:
+            self.collection.bulk_write(ops, ordered=False)
+        except BulkWriteError as e:
+            real = [err for err in e.details.get("writeErrors", []) if err.get("code") != 11000]
+            if real:
+                raise
+
+    def start(self):
+        """Start the background worker thread (idempotent)"""
+        if not self.enabled or self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="match-table", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                if self._acquire_lease():
+                    self.run_once()
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Match table update failed: {e}")
+            time.sleep(self.interval)
+
+    def _acquire_lease(self):
+        """Take or renew the worker lease; False if another process holds it"""
+        now = datetime.utcnow()
+        try:
+            self.state_collection.update_one(
+                {"_id": STATE_ID, "$or": [
+                    {"lease_owner": self.owner},
+                    {"lease_until": {"$lt": now}},
+                    {"lease_until": {"$exists": False}}
+                ]},
+                {"$set": {"lease_owner": self.owner, "lease_until": now + timedelta(seconds=self.lease_seconds)}},
+                upsert=True
+            )
+            return True
+        except DuplicateKeyError:
+            return False
+
+    def _mentors_digest(self, snapshot):
+        digest = hashlib.sha1(f"{self.model_name}\0{self.top_n}\0".encode("utf-8"))
+        for mentor_id, text in zip(snapshot.ids, snapshot.texts):
+            digest.update(f"{mentor_id}\0{text}\0".encode("utf-8"))
+        return digest.hexdigest()
+
+    def _mentor_changes(self, snapshot, digest, generation):
+        """
+        Rows of new or changed mentors plus ids of removed ones since the table was
+        last brought up to date, or (None, None) when everything must be re-ranked.
+        """
+        state = self.state_collection.find_one({"_id": STATE_ID}, {"mentors_digest": 1}) or {}
+        if self._mentor_texts is None or state.get("mentors_digest") != self._digest:
+            # Unknown baseline (fresh process, or another worker moved the table on)
+            if state.get("mentors_digest") == digest:
+                return [], []
+            return None, None
+        if generation != self._generation:
+            # TF-IDF vocabulary was refit, which moves every score
+            return None, None
+
+        changed = [
+            row for row, (mentor_id, text) in enumerate(zip(snapshot.ids, snapshot.texts))
+            if self._mentor_texts.get(mentor_id) != text
+        ]
+        current = set(snapshot.ids)
+        dropped = [mentor_id for mentor_id in self._mentor_texts if mentor_id not in current]
+        if len(changed) + len(dropped) > FULL_REBUILD_RATIO * len(snapshot.ids):
+            return None, None
+        return changed, dropped
+
+    def run_once(self):
+        """One maintenance pass: mentor deltas or a full scan, then stale students"""
+        started = time.time()
+        self.ensure_indexes()
+        snapshot = self.load_snapshot()
+        if not snapshot.ids:
+            return
+
+        digest = self._mentors_digest(snapshot)
+        generation = self.generation_fn() if self.generation_fn else None
+        changed, dropped = self._mentor_changes(snapshot, digest, generation)
+        if changed is None or changed or dropped or time.time() - self._last_scan >= self.scan_interval:
+            if not self._scan(snapshot, changed, dropped):
+                return
+            self._last_scan = time.time()
+            self.state_collection.update_one(
+                {"_id": STATE_ID},
+                {"$set": {"mentors_digest": digest, "mentors": len(snapshot.ids), "updated_at": datetime.utcnow()}},
+                upsert=True
+            )
+            self._mentor_texts = dict(zip(snapshot.ids, snapshot.texts))
+            self._digest = digest
+            self._generation = generation
+        self._refresh_stale(snapshot)
+
+        self.cycles += 1
+        self.last_cycle_seconds = round(time.time() - started, 3)
+
+    def _scan(self, snapshot, changed, dropped):
+        """Walk every student; False if the lease was lost part way through"""
+        full = changed is None
+        rows = np.asarray(changed or [], dtype=np.int64)
+        touched = set(dropped or []) | {snapshot.ids[row] for row in rows}
+        if full:
+            logger.info(f"Rebuilding match table against {len(snapshot.ids)} mentors")
+        elif touched:
+            logger.info(f"Updating match table for {len(rows)} changed and {len(dropped)} removed mentors")
+
+        # Students marked stale after this point stay stale and are picked up right after
+        started = datetime.utcnow()
+        chunk = []
+        cursor = self.students.find({}, {"interests": 1, "id": 1, "student_id": 1}).sort("_id", 1)
+        for doc in cursor:
+            chunk.append(doc)
+            if len(chunk) >= self.chunk_size:
+                if not self._acquire_lease():
+                    return False
+                self._process(chunk, snapshot, rows, touched, full, started)
+                chunk = []
+        if chunk:
+            self._process(chunk, snapshot, rows, touched, full, started)
+        return True
+
+    def _refresh_stale(self, snapshot):
+        """Re-rank students queued by mark_stale()"""
+        while True:
+            started = datetime.utcnow()
+            ids = [doc["_id"] for doc in self.collection.find({"stale": True}, {"_id": 1}).limit(self.chunk_size)]
+            if not ids:
+                return
+            oids = [ObjectId(sid) for sid in ids if ObjectId.is_valid(sid)]
+            students = list(self.students.find({"_id": {"$in": oids}}, {"interests": 1, "id": 1, "student_id": 1}))
+            found = {str(doc["_id"]) for doc in students}
+            self._write([DeleteOne({"_id": sid, "stale": True}) for sid in ids if sid not in found])
+            self._process(students, snapshot, np.zeros(0, dtype=np.int64), set(), False, started)
+
+    def _process(self, students, snapshot, rows, touched, full, started):
+        ids = [str(doc["_id"]) for doc in students]
+        texts = [self.profile_fn(doc) for doc in students]
+        stored = {
+            doc["_id"]: doc
+            for doc in self.collection.find(
+                {"_id": {"$in": ids}},
+                {"profile_hash": 1, "matches": 1, "top_n": 1, "stale": 1}
+            )
+        }
+
+        rerank, merge, ops = [], [], []
+        for i, (sid, text) in enumerate(zip(ids, texts)):
+            entry = stored.get(sid)
+            if not text:
+                # /match reports no profile for these; don't keep serving an old list
+                if entry is not None:
+                    ops.append(DeleteOne({"_id": sid}))
+                continue
+            if (full or entry is None or entry.get("stale") or "matches" not in entry
+                    or entry.get("top_n") != self.top_n
+                    or entry.get("profile_hash") != profile_hash(text)
+                    or any(match["mentor_id"] in touched for match in entry["matches"])):
+                rerank.append(i)
+            elif len(rows):
+                merge.append(i)
+
+        wanted = rerank + merge
+        if wanted:
+            embeddings = self.encode([texts[i] for i in wanted])
+            if rerank:
+                ranked = self.rank_many([texts[i] for i in rerank], embeddings[:len(rerank)], snapshot, self.top_n)
+                for i, matches in zip(rerank, ranked):
+                    ops.append(self._upsert(students[i], texts[i], matches, started))
+                self.reranked += len(rerank)
+            if merge:
+                # Scores against unchanged mentors still hold; only the changed columns are new
+                scores = self.score_rows([texts[i] for i in merge], embeddings[len(rerank):], snapshot, rows)
+                for j, i in enumerate(merge):
+                    current = stored[ids[i]]["matches"]
+                    floor = current[-1]["similarity_score"] if len(current) >= self.top_n else -np.inf
+                    better = np.nonzero(scores[j] > floor)[0]
+                    if not len(better):
+                        continue
+                    candidates = current + [
+                        {"mentor_id": snapshot.ids[rows[col]], "similarity_score": float(scores[j, col])}
+                        for col in better
+                    ]
+                    candidates.sort(key=lambda match: match["similarity_score"], reverse=True)
+                    ops.append(self._upsert(students[i], texts[i], candidates, started))
+                    self.merged += 1
+        self._write(ops)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "top_n": self.top_n,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "reranked": self.reranked,
+            "merged": self.merged,
+            "cycles": self.cycles,
+            "errors": self.errors,
+            "last_cycle_seconds": self.last_cycle_seconds
+        }
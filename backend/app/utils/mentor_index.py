@@ -0,0 +1,303 @@
+"""
+Mentor Embedding Index
+Keeps mentor expertise embeddings as a precomputed matrix so that matching
+only has to embed the student and run one matrix-vector product. Vectors can
+be stored as float32, float16 or int8 and are memory-mapped from disk so all
+workers on a host share one page-cache copy. Facet values (availability,
+rating, ...) ride along so filters can be applied inside the index.
+
+Once start() has been called, rescans run on a background thread (every
+refresh_interval, or right away after mark_stale()) and refresh() on the
+request path only waits for the very first build.
+"""
+import glob
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import namedtuple
+
+import numpy as np
+
+from app.utils.facet_index import FacetIndex
+from app.utils.vector_store import VectorStore
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INDEX_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data')
+
+# Consistent view of the index; readers keep using it while a refresh swaps in a new one.
+# vectors is a VectorStore (or any array-like with the same indexing/dot interface),
+# facets a FacetIndex over the same rows (None when the index has no facet_fn).
+IndexSnapshot = namedtuple('IndexSnapshot', ['ids', 'texts', 'vectors', 'facets'], defaults=(None,))
+
+
+def text_hash(text):
+    """Stable fingerprint of a mentor's profile text"""
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+class MentorEmbeddingIndex:
+    """Disk-backed mentor embedding matrix with an id map, updated incrementally"""
+
+    def __init__(self, collection, encode, text_fn, model_name,
+                 index_dir=DEFAULT_INDEX_DIR, name='mentor_embeddings', refresh_interval=60,
+                 dtype='float32', mmap=True, fields=('expertise',), facet_fn=None):
+        self.collection = collection
+        self.encode = encode
+        self.text_fn = text_fn
+        self.fields = fields
+        self.facet_fn = facet_fn
+        self.model_name = model_name
+        self.index_dir = index_dir
+        self.name = name
+        self.refresh_interval = refresh_interval
+        self.dtype = dtype
+        self.mmap = mmap
+
+        self._lock = threading.Lock()
+        self._hashes = []
+        self._facet_values = []
+        self._snapshot = IndexSnapshot([], [], VectorStore.empty(dtype), self._facets([], []))
+        self._last_refresh = 0.0
+        self._stale = True
+        self._disk_version = None
+        self._disk_mtime = None
+        self._built = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+        self._on_refresh = None
+
+    @property
+    def meta_path(self):
+        return os.path.join(self.index_dir, f"{self.name}.json")
+
+    def _vectors_prefix(self, version):
+        return os.path.join(self.index_dir, f"{self.name}-{version}")
+
+    def _facets(self, ids, values):
+        return FacetIndex(ids, values) if self.facet_fn else None
+
+    def snapshot(self):
+        """Return the current ids, texts, vectors and facets as one consistent tuple"""
+        return self._snapshot
+
+    def mark_stale(self):
+        """Rescan mentors soon (call after a profile edit); wakes the background refresher if running"""
+        self._stale = True
+        self._wake.set()
+
+    def _background(self):
+        # With a refresher running, requests leave rescans to it once the first build exists
+        return self._thread is not None and self._built.is_set()
+
+    def start(self, on_refresh=None):
+        """
+        Rescan on a background thread (idempotent). on_refresh(snapshot) runs
+        after each rescan, e.g. to bring derived indexes in line off the request path.
+        """
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._on_refresh = on_refresh
+            self._thread = threading.Thread(target=self._run, name="mentor-index", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.clear()
+            try:
+                self.refresh(force=True)
+                if self._on_refresh is not None:
+                    self._on_refresh(self._snapshot)
+            except Exception as e:
+                logger.error(f"Mentor index refresh failed: {e}")
+            self._wake.wait(self.refresh_interval)
+
+    def load(self):
+        """
+        Load the index saved on disk (possibly by another worker) if it is newer
+        than what this process holds and was built with the current model.
+        """
+        try:
+            mtime = os.stat(self.meta_path).st_mtime_ns
+        except OSError:
+            return False
+        if mtime == self._disk_mtime:
+            return False
+        self._disk_mtime = mtime
+        try:
+            with open(self.meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta.get('model') != self.model_name:
+                logger.info(f"Ignoring saved mentor index built with {meta.get('model')}")
+                return False
+            facet_values = (meta.get('facets') or []) if self.facet_fn else []
+            if meta.get('version') == self._disk_version:
+                # Same vectors, but facet values may have been updated by another worker
+                if facet_values and facet_values != self._facet_values and len(facet_values) == len(self._snapshot.ids):
+                    current = self._snapshot
+                    self._facet_values = facet_values
+                    self._snapshot = IndexSnapshot(current.ids, current.texts, current.vectors,
+                                                   self._facets(current.ids, facet_values))
+                    return True
+                return False
+            vectors = VectorStore.load(self._vectors_prefix(meta['version']), mmap=self.mmap)
+            if len(meta['ids']) != len(vectors):
+                logger.warning("Saved mentor index is inconsistent, rebuilding")
+                return False
+            if vectors.dtype != self.dtype:
+                vectors = vectors.astype(self.dtype)
+            if self.facet_fn and len(facet_values) != len(meta['ids']):
+                # Saved before facets were tracked; the refresh that follows fills them in
+                facet_values = [self.facet_fn({}) for _ in meta['ids']]
+            self._hashes = meta['hashes']
+            self._facet_values = facet_values
+            self._snapshot = IndexSnapshot(meta['ids'], meta['texts'], vectors,
+                                           self._facets(meta['ids'], facet_values))
+            self._disk_version = meta['version']
+            logger.info(f"Loaded mentor index with {len(meta['ids'])} mentors ({vectors.dtype}) from {self.index_dir}")
+            return True
+        except Exception as e:
+            logger.warning(f"Failed to load mentor index: {e}")
+            return False
+
+    def save(self, vectors=True):
+        """
+        Persist the matrix under a new version and atomically point the id map at it,
+        then switch this process over to the memory-mapped copy.
+        With vectors=False only the metadata (e.g. facet values) is rewritten.
+        """
+        snapshot = self._snapshot
+        os.makedirs(self.index_dir, exist_ok=True)
+        if not vectors and self._disk_version is not None:
+            version = self._disk_version
+        else:
+            vectors = True
+            version = uuid.uuid4().hex
+            snapshot.vectors.save(self._vectors_prefix(version))
+        tmp_meta = f"{self.meta_path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_meta, 'w', encoding='utf-8') as f:
+            json.dump({
+                'model': self.model_name,
+                'version': version,
+                'dtype': snapshot.vectors.dtype,
+                'ids': snapshot.ids,
+                'texts': snapshot.texts,
+                'hashes': self._hashes,
+                'facets': self._facet_values if self.facet_fn else None
+            }, f)
+        os.replace(tmp_meta, self.meta_path)
+        self._disk_version = version
+        self._disk_mtime = os.stat(self.meta_path).st_mtime_ns
+        if not vectors:
+            return
+
+        if self.mmap:
+            self._snapshot = IndexSnapshot(
+                snapshot.ids, snapshot.texts,
+                VectorStore.load(self._vectors_prefix(version), mmap=True),
+                snapshot.facets
+            )
+
+        # Older versions can go; processes still mapping them keep their open pages
+        for path in glob.glob(os.path.join(self.index_dir, f"{self.name}-*.npy")):
+            if version not in os.path.basename(path):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def refresh(self, force=False):
+        """
+        Sync the index with the mentors collection.
+        Only mentors whose profile text changed (or that are new) are re-embedded.
+        """
+        if not force and (self._background() or
+                          (not self._stale and time.time() - self._last_refresh < self.refresh_interval)):
+            return False
+
+        with self._lock:
+            if not force and self._background():
+                # The refresher finished the first build while this call waited for the lock
+                return False
+            # Pick up a newer index written by another worker before diffing against Mongo
+            self.load()
+
+            current = self._snapshot
+            old_rows = {mentor_id: row for row, mentor_id in enumerate(current.ids)}
+
+            projection = dict.fromkeys(self.fields, 1)
+            projection["_id"] = 1
+            ids, texts, hashes, facet_values = [], [], [], []
+            for doc in self.collection.find({}, projection):
+                text = self.text_fn(doc)
+                ids.append(str(doc["_id"]))
+                texts.append(text)
+                hashes.append(text_hash(text))
+                if self.facet_fn:
+                    facet_values.append(self.facet_fn(doc))
+
+            # Reuse vectors for unchanged mentors, collect the rest for one batched encode
+            reuse_rows, reuse_from, to_encode = [], [], []
+            for row, (mentor_id, digest) in enumerate(zip(ids, hashes)):
+                old_row = old_rows.get(mentor_id)
+                if old_row is not None and self._hashes[old_row] == digest:
+                    reuse_rows.append(row)
+                    reuse_from.append(old_row)
+                else:
+                    to_encode.append(row)
+
+            changed = bool(to_encode) or len(ids) != len(current.ids) or reuse_rows != reuse_from
+            if changed:
+                dim = current.vectors.shape[1] if len(current.vectors) else 0
+                encoded = None
+                if to_encode:
+                    encoded = np.asarray(self.encode([texts[row] for row in to_encode]), dtype=np.float32)
+                    dim = encoded.shape[1]
+                vectors = VectorStore.allocate(len(ids), dim, self.dtype)
+                if encoded is not None:
+                    vectors.put(to_encode, encoded)
+                if reuse_rows:
+                    # Unchanged mentors keep their stored (already quantized) rows
+                    vectors.copy_rows(reuse_rows, current.vectors, reuse_from)
+
+                self._hashes = hashes
+                self._facet_values = facet_values
+                self._snapshot = IndexSnapshot(ids, texts, vectors, self._facets(ids, facet_values))
+                logger.info(
+                    f"Mentor index refreshed: {len(ids)} mentors, {len(to_encode)} re-embedded, "
+                    f"{len(current.ids) - len(reuse_rows)} dropped or changed"
+                )
+                try:
+                    self.save()
+                except Exception as e:
+                    logger.warning(f"Failed to save mentor index: {e}")
+            elif facet_values != self._facet_values:
+                # Only filterable attributes changed: keep the vectors, swap the facets
+                self._facet_values = facet_values
+                self._snapshot = IndexSnapshot(current.ids, current.texts, current.vectors,
+                                               self._facets(current.ids, facet_values))
+                changed = True
+                try:
+                    self.save(vectors=False)
+                except Exception as e:
+                    logger.warning(f"Failed to save mentor index: {e}")
+
+            self._last_refresh = time.time()
+            self._stale = False
+            self._built.set()
+            return changed
+
+    def score(self, query_vector, rows=None, snapshot=None):
+        """Cosine scores of a normalized query against all (or the given) mentor rows"""
+        return (snapshot or self._snapshot).vectors.dot(query_vector, rows=rows)
+
+    def score_many(self, query_vectors, snapshot=None):
+        """Score matrix (queries x mentors) from a single matrix multiply"""
+        return (snapshot or self._snapshot).vectors.matmul(query_vectors)
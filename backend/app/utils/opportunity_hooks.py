@@ -0,0 +1,26 @@
+"""
+Opportunity Change Hooks
+Routes that create, update or delete opportunities call notify(), so derived
+data (the recommendation index, caches) can update incrementally instead of
+rescanning the collection.
+"""
+import logging
+
+logger = logging.getLogger(__name__)
+
+_listeners = []
+
+
+def subscribe(listener):
+    """Register listener(opportunity_id, action); action is 'created', 'updated' or 'deleted'"""
+    _listeners.append(listener)
+    return listener
+
+
+def notify(opportunity_id, action):
+    for listener in list(_listeners):
+        try:
+            listener(str(opportunity_id), action)
+        except Exception as e:
+            # A broken listener must never fail the write that triggered it
+            logger.warning(f"Opportunity hook {getattr(listener, '__name__', listener)} failed: {e}")
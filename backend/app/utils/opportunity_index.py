@@ -0,0 +1,236 @@
+"""
+Opportunity Recommendation Index
+In-memory inverted index from normalised skill tokens to opportunity rows,
+next to a matrix of opportunity embeddings. A student's skills and interests
+are scored against every open opportunity as a blend of skill overlap and
+embedding similarity. Created, edited and deleted opportunities are applied
+incrementally on the request path; the initial build and the periodic rescan
+that picks up changes made by other workers run on a background thread.
+"""
+import hashlib
+import logging
+import re
+import threading
+import time
+
+import numpy as np
+from bson import ObjectId
+
+from app.utils.ann_index import top_k_indices
+
+logger = logging.getLogger(__name__)
+
+_PROJECTION = {"skills": 1, "description": 1}
+_SPACES = re.compile(r"\s+")
+_EDGE_PUNCT = re.compile(r"^[^\w+#]+|[^\w+#]+$")
+
+
+def normalize_skill(skill):
+    """'  Machine   Learning.' -> 'machine learning' (keeps c++ / c# intact)"""
+    return _EDGE_PUNCT.sub("", _SPACES.sub(" ", str(skill).strip().lower()))
+
+
+def skill_tokens(skills):
+    """Normalised skill phrases plus their individual words"""
+    if isinstance(skills, str):
+        skills = skills.split(",")
+    tokens = set()
+    for skill in skills or []:
+        phrase = normalize_skill(skill)
+        if not phrase:
+            continue
+        tokens.add(phrase)
+        words = [normalize_skill(word) for word in phrase.split(" ")]
+        if len(words) > 1:
+            tokens.update(word for word in words if len(word) > 1)
+    return tokens
+
+
+def matched_skills(skills, tokens):
+    """The opportunity's own skill strings that the student's tokens hit"""
+    if isinstance(skills, str):
+        skills = skills.split(",")
+    return [skill for skill in skills or [] if skill_tokens([skill]) & tokens]
+
+
+class OpportunityIndex:
+    """Skill postings + embedding matrix over opportunities, updated in place"""
+
+    def __init__(self, collection, encode, text_fn, overlap_weight=0.5, refresh_interval=60):
+        self.collection = collection
+        self.encode = encode
+        self.text_fn = text_fn
+        self.overlap_weight = overlap_weight
+        self.refresh_interval = refresh_interval
+
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._rows = {}
+        self._ids = []
+        self._hashes = []
+        self._tokens = []
+        self._token_counts = np.zeros(0, dtype=np.float32)
+        self._active = np.zeros(0, dtype=bool)
+        self._vectors = None
+        self._postings = {}
+        self._free = []
+        self._pending = set()
+        self._ready = threading.Event()
+        self._thread = None
+        self._last_refresh = 0.0
+        self.updates = 0
+
+    def __len__(self):
+        return len(self._rows)
+
+    @property
+    def ready(self):
+        """True once the first full scan has been applied"""
+        return self._ready.is_set()
+
+    def mark_changed(self, opportunity_id):
+        """Re-read this opportunity on the next apply_pending() (call after create/update/delete)"""
+        self._pending.add(str(opportunity_id))
+
+    def start(self):
+        """Build the index and rescan it every refresh_interval on a background thread (idempotent)"""
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="opportunity-index", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                self.rescan()
+            except Exception as e:
+                logger.error(f"Opportunity index rescan failed: {e}")
+            time.sleep(self.refresh_interval)
+
+    def _grow(self, dim):
+        capacity = max(64, 2 * len(self._ids))
+        vectors = np.zeros((capacity, dim), dtype=np.float32)
+        if self._vectors is not None:
+            vectors[:self._vectors.shape[0]] = self._vectors
+        self._vectors = vectors
+        counts = np.zeros(capacity, dtype=np.float32)
+        counts[:self._token_counts.shape[0]] = self._token_counts
+        self._token_counts = counts
+        active = np.zeros(capacity, dtype=bool)
+        active[:self._active.shape[0]] = self._active
+        self._active = active
+
+    def _upsert(self, opportunity_id, digest, tokens, vector):
+        row = self._rows.get(opportunity_id)
+        if row is None:
+            if self._free:
+                row = self._free.pop()
+            else:
+                row = len(self._ids)
+                self._ids.append(None)
+                self._hashes.append(None)
+                self._tokens.append(frozenset())
+                if self._vectors is None or row >= self._vectors.shape[0]:
+                    self._grow(vector.shape[0])
+            self._rows[opportunity_id] = row
+            self._ids[row] = opportunity_id
+        for token in self._tokens[row] - tokens:
+            self._postings[token].discard(row)
+        for token in tokens - self._tokens[row]:
+            self._postings.setdefault(token, set()).add(row)
+        self._tokens[row] = frozenset(tokens)
+        self._hashes[row] = digest
+        self._token_counts[row] = len(tokens)
+        self._vectors[row] = vector
+        self._active[row] = True
+
+    def _remove(self, opportunity_id):
+        row = self._rows.pop(opportunity_id, None)
+        if row is None:
+            return
+        for token in self._tokens[row]:
+            self._postings[token].discard(row)
+        self._ids[row] = None
+        self._hashes[row] = None
+        self._tokens[row] = frozenset()
+        self._active[row] = False
+        self._free.append(row)
+
+    def _apply(self, docs, removed):
+        """Index the given documents (re-embedding only changed text) and drop removed ids"""
+        changed = []
+        for doc in docs:
+            opportunity_id = str(doc["_id"])
+            text = self.text_fn(doc)
+            tokens = skill_tokens(doc.get("skills"))
+            digest = hashlib.sha1(f"{text}\0{sorted(tokens)}".encode("utf-8")).hexdigest()
+            row = self._rows.get(opportunity_id)
+            if row is None or self._hashes[row] != digest:
+                changed.append((opportunity_id, digest, tokens, text))
+
+        vectors = None
+        if changed:
+            vectors = np.asarray(self.encode([text or " " for _, _, _, text in changed]), dtype=np.float32)
+        with self._lock:
+            for (opportunity_id, digest, tokens, _), vector in zip(changed, vectors if vectors is not None else []):
+                self._upsert(opportunity_id, digest, tokens, vector)
+            for opportunity_id in removed:
+                self._remove(opportunity_id)
+        self.updates += len(changed) + len(removed)
+        return len(changed) + len(removed)
+
+    def rescan(self):
+        """Re-read every opportunity, re-embedding only changed ones (the background thread's job)"""
+        with self._refresh_lock:
+            self._pending.clear()
+            docs = list(self.collection.find({}, _PROJECTION))
+            seen = {str(doc["_id"]) for doc in docs}
+            updated = self._apply(docs, [oid for oid in list(self._rows) if oid not in seen])
+            self._last_refresh = time.time()
+            self._ready.set()
+        if updated:
+            logger.info(f"Opportunity index rescanned: {len(self._rows)} opportunities, {updated} updated")
+        return updated
+
+    def apply_pending(self):
+        """Apply hook notifications from this process; cheap enough for the request path"""
+        if not self._pending:
+            return 0
+        # A running rescan will leave later notifications pending; don't make the request wait for it
+        if not self._refresh_lock.acquire(blocking=False):
+            return 0
+        try:
+            pending, self._pending = self._pending, set()
+            oids = [ObjectId(oid) for oid in pending if ObjectId.is_valid(oid)]
+            docs = list(self.collection.find({"_id": {"$in": oids + list(pending)}}, _PROJECTION))
+            seen = {str(doc["_id"]) for doc in docs}
+            return self._apply(docs, [oid for oid in pending if oid not in seen])
+        finally:
+            self._refresh_lock.release()
+
+    def recommend(self, tokens, query_vector, limit, offset=0):
+        """
+        (total, [(opportunity_id, score, overlap), ...]) for one page, best first.
+        overlap is the share of the opportunity's skill tokens the student covers.
+        """
+        with self._lock:
+            n = len(self._ids)
+            total = len(self._rows)
+            if not total or offset >= total:
+                return total, []
+            overlap = np.zeros(n, dtype=np.float32)
+            for token in tokens:
+                rows = self._postings.get(token)
+                if rows:
+                    # Rows within one posting are unique, so a fancy-indexed add is safe
+                    overlap[np.fromiter(rows, dtype=np.int64, count=len(rows))] += 1.0
+            overlap /= np.maximum(self._token_counts[:n], 1.0)
+            embed = self._vectors[:n] @ np.asarray(query_vector, dtype=np.float32)
+            scores = self.overlap_weight * overlap + (1.0 - self.overlap_weight) * embed
+            scores[~self._active[:n]] = -np.inf
+
+            top = top_k_indices(scores, min(offset + limit, total))[offset:offset + limit]
+            return total, [(self._ids[row], float(scores[row]), float(overlap[row])) for row in top]
@@ -0,0 +1,193 @@
+"""
+Keyset Pagination
+Cursor-based paging for list endpoints. Each page is located by scanning only
+the sort key and _id from where the previous page ended, so page 100 costs
+the same as page 1 however large the collection grows. The page's documents
+are then read with one $in query and streamed out as a JSON array instead of
+being collected into a list first. The cursor for the next page travels in
+the X-Next-Cursor (and Link) response header, so the body stays a plain array.
+
+Query parameters understood by keyset_response():
+    limit   page size, capped at the endpoint's maximum
+    cursor  opaque token from a previous page's X-Next-Cursor header
+    fields  comma-separated projection, e.g. "title,company" or "-description"
+    sort    one of the endpoint's sort keys; order=asc|desc (default desc)
+"""
+import base64
+import json
+import logging
+import re
+from datetime import datetime
+from urllib.parse import urlencode
+
+from bson.objectid import ObjectId
+from flask import Response, current_app, request
+
+logger = logging.getLogger(__name__)
+
+_FIELD = re.compile(r"^[A-Za-z_][\w.]*$")
+_indexed = set()
+
+
+class PaginationError(ValueError):
+    """A bad limit, cursor, fields or sort parameter; routes answer it with 400"""
+
+
+def parse_limit(raw, default, maximum):
+    if raw in (None, ""):
+        return default
+    try:
+        limit = int(raw)
+    except (TypeError, ValueError):
+        raise PaginationError("limit must be an integer")
+    if limit < 1:
+        raise PaginationError("limit must be at least 1")
+    return min(limit, maximum)
+
+
+def parse_fields(raw):
+    """Mongo projection for "a,b" (only these) or "-a,-b" (all but these); None for everything"""
+    if not raw:
+        return None
+    names = [name.strip() for name in raw.split(",") if name.strip()]
+    excluded = [name.startswith("-") for name in names]
+    if any(excluded) and not all(excluded):
+        raise PaginationError("fields must either all be included or all be excluded (-field)")
+    names = [name.lstrip("-") for name in names]
+    if not names or not all(_FIELD.match(name) for name in names):
+        raise PaginationError("fields must be a comma-separated list of field names")
+    if all(excluded):
+        if "_id" in names:
+            raise PaginationError("_id is always returned")
+        return {name: 0 for name in names}
+    return {name: 1 for name in names}
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {"$date": value.isoformat()}
+    if isinstance(value, ObjectId):
+        return {"$oid": str(value)}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict) and "$date" in value:
+        return datetime.fromisoformat(value["$date"])
+    if isinstance(value, dict) and "$oid" in value:
+        return ObjectId(value["$oid"])
+    return value
+
+
+def encode_cursor(sort_value, doc_id):
+    raw = json.dumps([_encode_value(sort_value), _encode_value(doc_id)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token):
+    """(sort_value, _id) from encode_cursor's token"""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        sort_value, doc_id = json.loads(raw)
+        return _decode_value(sort_value), _decode_value(doc_id)
+    except Exception:
+        raise PaginationError("cursor is not valid")
+
+
+def after_filter(field, value, doc_id, descending):
+    """
+    Documents strictly after (value, doc_id) in (field, _id) order. Missing or
+    null values sort lowest in Mongo, so they come last in descending order.
+    """
+    op = "$lt" if descending else "$gt"
+    if field == "_id":
+        return {"_id": {op: doc_id}}
+    if value is None:
+        tail = {field: None, "_id": {op: doc_id}}
+        return tail if descending else {"$or": [tail, {field: {"$ne": None}}]}
+    clauses = [{field: {op: value}}, {field: value, "_id": {op: doc_id}}]
+    if descending:
+        clauses.append({field: None})
+    return {"$or": clauses}
+
+
+def ensure_sort_index(collection, field):
+    # One compound index serves both directions of the (field, _id) keyset scan
+    key = (collection.full_name, field)
+    if field == "_id" or key in _indexed:
+        return
+    try:
+        collection.create_index([(field, -1), ("_id", -1)])
+    except Exception as e:
+        logger.warning(f"Could not create pagination index on {key}: {e}")
+    _indexed.add(key)
+
+
+def keyset_page(collection, base_filter, sort_field, descending, limit, cursor=None, projection=None):
+    """
+    (documents, next_cursor) for one page. documents is a live Mongo cursor in
+    page order; next_cursor is None on the last page.
+    """
+    ensure_sort_index(collection, sort_field)
+    query = dict(base_filter or {})
+    if cursor:
+        value, doc_id = decode_cursor(cursor)
+        query = {"$and": [query, after_filter(sort_field, value, doc_id, descending)]}
+    direction = -1 if descending else 1
+    order = [("_id", direction)] if sort_field == "_id" else [(sort_field, direction), ("_id", direction)]
+
+    # Only the keys are read here: at most limit + 1 small documents off the index
+    keys = list(collection.find(query, {sort_field: 1}).sort(order).limit(limit + 1))
+    next_cursor = None
+    if len(keys) > limit:
+        keys = keys[:limit]
+        last = keys[-1]
+        next_cursor = encode_cursor(last.get(sort_field) if sort_field != "_id" else None, last["_id"])
+
+    documents = collection.find({"_id": {"$in": [key["_id"] for key in keys]}}, projection).sort(order)
+    return documents, next_cursor
+
+
+def stream_json_array(documents, dumps, errors=None):
+    """Yield a JSON array one document at a time, with _id as a string; failures go into errors"""
+    yield "["
+    first = True
+    try:
+        for document in documents:
+            document["_id"] = str(document["_id"])
+            yield ("" if first else ",") + dumps(document)
+            first = False
+    except Exception as e:
+        # Headers are already sent; close the array so the client sees a short page, not broken JSON
+        logger.error(f"Streaming page failed: {e}")
+        if errors is not None:
+            errors.append(e)
+    yield "]"
+
+
+def keyset_response(collection, base_filter=None, sort_fields=("_id",), default_limit=50, max_limit=200):
+    """Streamed JSON array for the current request's paging parameters; raises PaginationError"""
+    args = request.args
+    limit = parse_limit(args.get("limit"), default_limit, max_limit)
+    projection = parse_fields(args.get("fields"))
+    sort_field = args.get("sort") or sort_fields[0]
+    if sort_field not in sort_fields:
+        raise PaginationError(f"sort must be one of: {', '.join(sort_fields)}")
+    order = (args.get("order") or "desc").lower()
+    if order not in ("asc", "desc"):
+        raise PaginationError("order must be asc or desc")
+
+    documents, next_cursor = keyset_page(
+        collection, base_filter, sort_field, order == "desc", limit, args.get("cursor"), projection
+    )
+    # Same serialisation as jsonify (datetimes, key order), one document at a time
+    dumps = current_app.json.dumps
+    errors = []
+    response = Response(stream_json_array(documents, dumps, errors), mimetype="application/json")
+    # Lets a response cache tell a complete page from one cut short
+    response.stream_errors = errors
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+        next_args = dict(args.items(), cursor=next_cursor)
+        response.headers["Link"] = f'<{request.base_url}?{urlencode(next_args)}>; rel="next"'
+    return response
@@ -0,0 +1,268 @@
+"""
+Response Cache
+Read-through cache of serialised GET responses (status, headers and body
+bytes) for hot, rarely-changing endpoints, so a hit skips both Mongo and
+JSON encoding. Entries live in an in-process LRU per group, with an optional
+shared redis or memcached tier behind it for other workers and restarts.
+
+Entries are grouped ("opportunities", "mentors"). Writes call invalidate(),
+which bumps the group's generation; the generation is part of every key, so
+older entries become unreachable everywhere at once. Without a shared tier
+other workers see the change when their entries expire.
+
+Settings:
+    RESPONSE_CACHE_ENABLED      "false" turns caching off
+    RESPONSE_CACHE_SIZE         entries kept in memory per group
+    RESPONSE_CACHE_TTL          seconds an entry lives (both tiers)
+    RESPONSE_CACHE_REDIS_URL    e.g. redis://127.0.0.1:6379/0 (needs the redis package)
+    RESPONSE_CACHE_MEMCACHED    e.g. 127.0.0.1:11211 (needs pymemcache)
+"""
+import functools
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from urllib.parse import urlencode
+
+from flask import Response, current_app, request
+
+from app.utils.ttl_cache import LRUTTLCache
+
+logger = logging.getLogger(__name__)
+
+# Recomputed per response, or tied to one client
+_SKIP_HEADERS = {"content-length", "set-cookie", "x-cache"}
+
+
+class RedisTier:
+    def __init__(self, url):
+        import redis
+        self.client = redis.Redis.from_url(url, socket_timeout=0.2, socket_connect_timeout=0.2)
+
+    def get(self, key):
+        return self.client.get(key)
+
+    def set(self, key, value, ttl):
+        self.client.set(key, value, ex=max(1, int(ttl)))
+
+    def incr(self, key):
+        return int(self.client.incr(key))
+
+
+class MemcachedTier:
+    def __init__(self, server):
+        from pymemcache.client.base import Client
+        host, _, port = server.partition(":")
+        self.client = Client((host, int(port or 11211)), connect_timeout=0.2, timeout=0.2)
+
+    def get(self, key):
+        return self.client.get(key)
+
+    def set(self, key, value, ttl):
+        self.client.set(key, value, expire=max(1, int(ttl)))
+
+    def incr(self, key):
+        # memcached's incr fails on a missing key, so create it first
+        value = self.client.incr(key, 1)
+        if value is None:
+            self.client.add(key, b"1", noreply=False)
+            value = self.client.incr(key, 1)
+        return int(value)
+
+
+def encode_entry(status, headers, body):
+    meta = json.dumps({"status": status, "headers": headers}).encode("utf-8")
+    return meta + b"\n" + body
+
+
+def decode_entry(raw):
+    meta, _, body = raw.partition(b"\n")
+    meta = json.loads(meta)
+    return meta["status"], [tuple(header) for header in meta["headers"]], body
+
+
+class ResponseCache:
+    """Two-tier cache of response bytes, invalidated a group at a time"""
+
+    def __init__(self, max_size=512, ttl=60, shared=None, prefix="eduspark:response", generation_ttl=1.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.shared = shared
+        self.prefix = prefix
+        # How long a generation read from the shared tier is trusted before asking again
+        self.generation_ttl = generation_ttl
+        self._memory = {}
+        self._generations = {}
+        self._lock = threading.Lock()
+        self.shared_hits = 0
+        self.shared_misses = 0
+        self.shared_errors = 0
+        self.invalidations = 0
+
+    def _group(self, group):
+        memory = self._memory.get(group)
+        if memory is None:
+            with self._lock:
+                memory = self._memory.setdefault(group, LRUTTLCache(max_size=self.max_size, ttl=self.ttl))
+        return memory
+
+    def generation(self, group):
+        value, checked_at = self._generations.get(group, (0, 0.0))
+        if self.shared is None or time.monotonic() - checked_at < self.generation_ttl:
+            return value
+        try:
+            raw = self.shared.get(f"{self.prefix}:gen:{group}")
+            value = int(raw) if raw is not None else 0
+        except Exception as e:
+            self.shared_errors += 1
+            logger.warning(f"Response cache generation read failed: {e}")
+        self._generations[group] = (value, time.monotonic())
+        return value
+
+    def invalidate(self, group):
+        """Forget every cached response in the group, in this process and (if shared) everywhere"""
+        self.invalidations += 1
+        self._group(group).clear()
+        value = self._generations.get(group, (0, 0.0))[0] + 1
+        if self.shared is not None:
+            try:
+                value = self.shared.incr(f"{self.prefix}:gen:{group}")
+            except Exception as e:
+                self.shared_errors += 1
+                logger.warning(f"Response cache invalidation of '{group}' failed: {e}")
+        self._generations[group] = (value, time.monotonic())
+
+    def key(self, group, path, args):
+        # Query parameters in a fixed order, so ?a=1&b=2 and ?b=2&a=1 share an entry
+        query = urlencode(sorted(args.items(multi=True)))
+        digest = hashlib.sha1(f"{path}?{query}".encode("utf-8")).hexdigest()
+        return f"{self.prefix}:{group}:{self.generation(group)}:{digest}"
+
+    def get(self, group, key):
+        entry = self._group(group).get(key)
+        if entry is not None or self.shared is None:
+            return entry
+        try:
+            raw = self.shared.get(key)
+        except Exception as e:
+            self.shared_errors += 1
+            logger.warning(f"Response cache read failed: {e}")
+            return None
+        if raw is None:
+            self.shared_misses += 1
+            return None
+        self.shared_hits += 1
+        entry = decode_entry(raw)
+        self._group(group).set(key, entry)
+        return entry
+
+    def put(self, group, key, status, headers, body):
+        entry = (status, headers, body)
+        self._group(group).set(key, entry)
+        if self.shared is not None:
+            try:
+                self.shared.set(key, encode_entry(status, headers, body), self.ttl)
+            except Exception as e:
+                self.shared_errors += 1
+                logger.warning(f"Response cache write failed: {e}")
+
+    def stats(self):
+        memory = {
+            group: {"entries": len(cache), "hits": cache.hits, "misses": cache.misses}
+            for group, cache in list(self._memory.items())
+        }
+        return {
+            "groups": memory,
+            "shared": type(self.shared).__name__ if self.shared is not None else None,
+            "shared_hits": self.shared_hits,
+            "shared_misses": self.shared_misses,
+            "shared_errors": self.shared_errors,
+            "invalidations": self.invalidations
+        }
+
+
+def shared_tier_from_env():
+    """The configured redis or memcached tier, or None (also when its client library is missing)"""
+    redis_url = os.getenv("RESPONSE_CACHE_REDIS_URL")
+    memcached = os.getenv("RESPONSE_CACHE_MEMCACHED")
+    try:
+        if redis_url:
+            return RedisTier(redis_url)
+        if memcached:
+            return MemcachedTier(memcached)
+    except Exception as e:
+        logger.warning(f"Response cache shared tier unavailable, using memory only: {e}")
+    return None
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Process-wide cache configured from the environment; None when disabled"""
+    global _cache
+    if _cache is None and os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() in ("true", "1", "t"):
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache(
+                    max_size=int(os.getenv("RESPONSE_CACHE_SIZE", "512")),
+                    ttl=float(os.getenv("RESPONSE_CACHE_TTL", "60")),
+                    shared=shared_tier_from_env()
+                )
+    return _cache
+
+
+def invalidate(group):
+    cache = get_cache()
+    if cache is not None:
+        cache.invalidate(group)
+
+
+def stats():
+    cache = get_cache()
+    return cache.stats() if cache is not None else {"enabled": False}
+
+
+def _tee(cache, group, key, response, chunks):
+    # Store a streamed body once it has gone out in full; a stream cut short by an error is not kept
+    body = []
+    for chunk in chunks:
+        body.append(chunk.encode("utf-8") if isinstance(chunk, str) else chunk)
+        yield chunk
+    if not getattr(response, "stream_errors", None):
+        cache.put(group, key, response.status_code, _headers(response), b"".join(body))
+
+
+def _headers(response):
+    return [(name, value) for name, value in response.headers.items() if name.lower() not in _SKIP_HEADERS]
+
+
+def cached(group):
+    """Serve a GET view's 200 responses from the cache; X-Cache says HIT or MISS"""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            cache = get_cache()
+            if cache is None or request.method != "GET":
+                return view(*args, **kwargs)
+            key = cache.key(group, request.path, request.args)
+            entry = cache.get(group, key)
+            if entry is not None:
+                status, headers, body = entry
+                response = Response(body, status=status, headers=headers)
+                response.headers["X-Cache"] = "HIT"
+                return response
+
+            response = current_app.make_response(view(*args, **kwargs))
+            if response.status_code == 200:
+                if response.is_streamed:
+                    response.response = _tee(cache, group, key, response, response.response)
+                else:
+                    cache.put(group, key, response.status_code, _headers(response), response.get_data())
+            response.headers["X-Cache"] = "MISS"
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,424 @@
+"""
+Opportunity Search Index
+In-process BM25 inverted index over opportunity text fields (title, skills,
+company, description, ...) with per-field weights, prefix matching on the
+last query word, filters on category/type/location and paged results.
+
+Postings are compact int32/float32 arrays per term, so scoring a query is a
+few vectorised numpy passes over the matching rows rather than a collection
+scan. Writes in this process arrive through opportunity_hooks and are applied
+before the next search; a background thread polls for documents created or
+updated by other workers, scans ids for deletions, and rebuilds the index off
+to the side once too many rows are dead.
+"""
+import bisect
+import logging
+import math
+import re
+import threading
+import time
+from array import array
+from collections import Counter
+
+import numpy as np
+from bson import ObjectId
+
+from app.utils.ann_index import top_k_indices
+
+logger = logging.getLogger(__name__)
+
+# (field, weight): a word in the title counts three times one in the description
+FIELDS = (
+    ("title", 3.0), ("skills", 2.0), ("company", 1.5), ("category", 1.5), ("type", 1.0),
+    ("location", 1.0), ("description", 1.0), ("requirements", 0.5), ("responsibilities", 0.5)
+)
+FILTER_FIELDS = ("category", "type", "location")
+_PROJECTION = {field: 1 for field, _ in FIELDS}
+_PROJECTION["updated_at"] = 1
+# np.add.at only got its fast path in numpy 1.25; before that it is far slower than fancy indexing
+_FAST_ADD_AT = tuple(int(part) for part in np.__version__.split(".")[:2]) >= (1, 25)
+
+_TOKEN = re.compile(r"[a-z0-9][a-z0-9+#]*")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or our that the this to was we will with you your".split()
+)
+
+
+def tokenize(text):
+    return [token for token in _TOKEN.findall(str(text).lower()) if token not in STOPWORDS]
+
+
+def field_text(value):
+    if isinstance(value, (list, tuple)):
+        return " ".join(str(item) for item in value)
+    return "" if value is None else str(value)
+
+
+def parse_query(query):
+    """(exact terms, prefix terms): the last word and words ending in * also match as prefixes"""
+    query = query or ""
+    words = query.lower().split()
+    exact, prefixes = [], []
+    for index, word in enumerate(words):
+        starred = word.endswith("*")
+        tokens = tokenize(word)
+        if not tokens:
+            continue
+        exact.extend(tokens[:-1])
+        # Still being typed (no trailing space) or explicitly starred
+        if starred or (index == len(words) - 1 and not query.endswith(" ")):
+            prefixes.append(tokens[-1])
+        else:
+            exact.append(tokens[-1])
+    return exact, prefixes
+
+
+def top_eligible(scores, eligible, k, sample_target=4096):
+    """
+    (total, rows): how many rows are eligible and the k best of them, best
+    first. With many matches, a strided sample of the scores gives a cut-off
+    that roughly sample_target rows clear, so only those get partitioned.
+    """
+    total = int(np.count_nonzero(eligible))
+    k = min(k, total)
+    if total > 4 * sample_target and k < sample_target // 4:
+        step = max(1, len(scores) // sample_target)
+        sample = scores[::step][eligible[::step]]
+        if len(sample) > 64:
+            position = len(sample) - 1 - int(len(sample) * sample_target / total)
+            cut = np.partition(sample, position)[position]
+            # Every row below the cut is beaten by at least k rows above it, so this stays exact
+            rows = np.flatnonzero((scores >= cut) & eligible)
+            # An unlucky sample can leave too few rows above the cut; rank everything then
+            if len(rows) >= k:
+                return total, rows[top_k_indices(scores[rows], k)]
+    rows = np.flatnonzero(eligible)
+    return total, rows[top_k_indices(scores[rows], k)]
+
+
+class _IndexState:
+    """Everything one build of the index holds; swapped wholesale on rebuild"""
+
+    def __init__(self, k1, b):
+        self.k1 = k1
+        self.b = b
+        # Average document length that posting impacts were computed against; None while building
+        self.avgdl = None
+        self.ids = []
+        self.rows = {}
+        self.lengths = np.zeros(1024, dtype=np.float32)
+        self.active = np.zeros(1024, dtype=bool)
+        self.codes = {field: np.full(1024, -1, dtype=np.int32) for field in FILTER_FIELDS}
+        self.values = {field: {} for field in FILTER_FIELDS}
+        self.postings = {}
+        self.vocab = []
+        self.live = 0
+        self.dead = 0
+        self.total_length = 0.0
+        self.max_oid = None
+        self.max_updated = None
+
+    def _grow(self):
+        capacity = 2 * self.lengths.shape[0]
+        lengths = np.zeros(capacity, dtype=np.float32)
+        lengths[:self.lengths.shape[0]] = self.lengths
+        active = np.zeros(capacity, dtype=bool)
+        active[:self.active.shape[0]] = self.active
+        for field, codes in self.codes.items():
+            grown = np.full(capacity, -1, dtype=np.int32)
+            grown[:codes.shape[0]] = codes
+            self.codes[field] = grown
+        self.lengths, self.active = lengths, active
+
+    def add(self, doc):
+        opportunity_id = str(doc["_id"])
+        self.remove(opportunity_id)
+        weighted = Counter()
+        for field, weight in FIELDS:
+            for token in tokenize(field_text(doc.get(field))):
+                weighted[token] += weight
+
+        row = len(self.ids)
+        if row >= self.lengths.shape[0]:
+            self._grow()
+        self.ids.append(opportunity_id)
+        self.rows[opportunity_id] = row
+        length = float(sum(weighted.values()))
+        self.lengths[row] = length
+        self.active[row] = True
+        self.live += 1
+        self.total_length += length
+        for field in FILTER_FIELDS:
+            value = doc.get(field)
+            if isinstance(value, str) and value:
+                values = self.values[field]
+                self.codes[field][row] = values.setdefault(value.lower(), len(values))
+
+        for token, tf in weighted.items():
+            posting = self.postings.get(token)
+            if posting is None:
+                posting = self.postings[token] = (array("i"), array("f"))
+                if self.avgdl:
+                    bisect.insort(self.vocab, token)
+                else:
+                    # Sorted once in finalize(); inserting in order would be quadratic
+                    self.vocab.append(token)
+            posting[0].append(row)
+            posting[1].append(self.impact(tf, length) if self.avgdl else tf)
+
+        if isinstance(doc["_id"], ObjectId) and (self.max_oid is None or doc["_id"] > self.max_oid):
+            self.max_oid = doc["_id"]
+        updated = doc.get("updated_at")
+        if isinstance(updated, str) and (self.max_updated is None or updated > self.max_updated):
+            self.max_updated = updated
+
+    def impact(self, tf, length):
+        """The BM25 term-frequency component, everything in a term's score except its idf"""
+        return tf * (self.k1 + 1.0) / (tf + self.k1 * (1.0 - self.b + self.b * length / self.avgdl))
+
+    def finalize(self):
+        """Turn the raw term frequencies stored during a build into impacts"""
+        self.avgdl = max(self.total_length / self.live, 1.0) if self.live else 1.0
+        self.vocab.sort()
+        lengths = self.lengths
+        for rows, tfs in self.postings.values():
+            tf = np.frombuffer(tfs, dtype=np.float32)
+            tf[:] = self.impact(tf, lengths[np.frombuffer(rows, dtype=np.int32)])
+            del tf
+
+    def remove(self, opportunity_id):
+        row = self.rows.pop(opportunity_id, None)
+        if row is None:
+            return False
+        # Postings keep the dead row until the next rebuild; scoring masks it out
+        self.active[row] = False
+        self.live -= 1
+        self.dead += 1
+        self.total_length -= float(self.lengths[row])
+        return True
+
+
+class OpportunitySearchIndex:
+    """BM25 search over opportunities, kept in sync with the collection"""
+
+    def __init__(self, collection_fn, k1=1.2, b=0.75, max_expansions=50, refresh_interval=30,
+                 rescan_interval=600, rebuild_dead_ratio=0.25, batch_size=5000):
+        # Called on use, so the collection can come from an extension initialised after import
+        self.collection_fn = collection_fn
+        self.k1 = k1
+        self.b = b
+        self.max_expansions = max_expansions
+        self.refresh_interval = refresh_interval
+        self.rescan_interval = rescan_interval
+        self.rebuild_dead_ratio = rebuild_dead_ratio
+        self.batch_size = batch_size
+
+        self._lock = threading.Lock()
+        self._state = _IndexState(k1, b)
+        self._state.finalize()
+        self._pending = set()
+        self._ready = threading.Event()
+        self._thread = None
+        self._indexes_ready = False
+        self._building = False
+        self._last_rescan = 0.0
+
+        self.builds = 0
+        self.searches = 0
+        self.updates = 0
+        self.last_build_seconds = None
+
+    @property
+    def ready(self):
+        return self._ready.is_set()
+
+    def __len__(self):
+        return self._state.live
+
+    def mark_changed(self, opportunity_id):
+        """Re-read this opportunity before the next search (call after create/update/delete)"""
+        self._pending.add(str(opportunity_id))
+
+    def start(self):
+        """Build the index and keep it fresh on a background thread (idempotent)"""
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="opportunity-search", daemon=True)
+            self._thread.start()
+
+    def _collection(self):
+        collection = self.collection_fn()
+        if not self._indexes_ready:
+            # Lets the change poll find documents edited by other workers without a scan
+            collection.create_index("updated_at", sparse=True)
+            self._indexes_ready = True
+        return collection
+
+    def build(self):
+        """Index the whole collection into a fresh state and swap it in"""
+        started = time.perf_counter()
+        state = _IndexState(self.k1, self.b)
+        # Hook notifications wait in _pending meanwhile, so they land in the new state rather than the old
+        self._building = True
+        try:
+            for doc in self._collection().find({}, _PROJECTION).batch_size(self.batch_size):
+                state.add(doc)
+            state.finalize()
+            with self._lock:
+                self._state = state
+        finally:
+            self._building = False
+        self._last_rescan = time.time()
+        self.builds += 1
+        self.last_build_seconds = round(time.perf_counter() - started, 3)
+        self._ready.set()
+        logger.info(f"Opportunity search index built: {state.live} opportunities, "
+                    f"{len(state.postings)} terms in {self.last_build_seconds}s")
+
+    def _run(self):
+        while True:
+            try:
+                if not self.ready or self._needs_rebuild():
+                    self.build()
+                else:
+                    self.poll_changes()
+                    if time.time() - self._last_rescan >= self.rescan_interval:
+                        self.rescan_deletions()
+            except Exception as e:
+                logger.error(f"Opportunity search index refresh failed: {e}")
+            time.sleep(self.refresh_interval)
+
+    def _needs_rebuild(self):
+        state = self._state
+        return state.dead > 1000 and state.dead > self.rebuild_dead_ratio * len(state.ids)
+
+    def _apply(self, docs, removed=()):
+        with self._lock:
+            for doc in docs:
+                self._state.add(doc)
+            for opportunity_id in removed:
+                self._state.remove(opportunity_id)
+        self.updates += len(docs) + len(removed)
+
+    def apply_pending(self):
+        """Re-read opportunities changed through this process's routes"""
+        if not self._pending or self._building:
+            return 0
+        pending, self._pending = self._pending, set()
+        oids = [ObjectId(oid) for oid in pending if ObjectId.is_valid(oid)]
+        docs = list(self._collection().find({"_id": {"$in": oids + list(pending)}}, _PROJECTION))
+        seen = {str(doc["_id"]) for doc in docs}
+        self._apply(docs, [oid for oid in pending if oid not in seen])
+        return len(pending)
+
+    def poll_changes(self):
+        """Pick up documents other workers created (newer _id) or updated (newer updated_at)"""
+        state = self._state
+        clauses = []
+        if state.max_oid is not None:
+            clauses.append({"_id": {"$gt": state.max_oid}})
+        if state.max_updated is not None:
+            clauses.append({"updated_at": {"$gt": state.max_updated}})
+        if not clauses:
+            return 0
+        docs = list(self._collection().find({"$or": clauses}, _PROJECTION))
+        if docs:
+            self._apply(docs)
+        return len(docs)
+
+    def rescan_deletions(self):
+        """Drop opportunities deleted by other workers (an _id-only, index-covered scan)"""
+        present = {str(doc["_id"]) for doc in self._collection().find({}, {"_id": 1}).batch_size(50000)}
+        gone = [oid for oid in list(self._state.rows) if oid not in present]
+        if gone:
+            self._apply([], gone)
+        self._last_rescan = time.time()
+        return len(gone)
+
+    def _expand(self, state, prefix):
+        """Vocabulary terms starting with prefix, most common first, at most max_expansions"""
+        start = bisect.bisect_left(state.vocab, prefix)
+        matches = []
+        for term in state.vocab[start:start + 20 * self.max_expansions]:
+            if not term.startswith(prefix):
+                break
+            matches.append(term)
+        if len(matches) > self.max_expansions:
+            matches.sort(key=lambda term: len(state.postings[term][0]), reverse=True)
+            matches = matches[:self.max_expansions]
+        return matches
+
+    def _score(self, state, terms, n):
+        """BM25 scores for every row; the posting views die with this frame"""
+        scores = np.zeros(n, dtype=np.float32)
+        for term in terms:
+            posting = state.postings.get(term)
+            if posting is None:
+                continue
+            rows = np.frombuffer(posting[0], dtype=np.int32)
+            impacts = np.frombuffer(posting[1], dtype=np.float32)
+            # df counts dead rows until the next rebuild, which only dampens idf slightly
+            df = len(rows)
+            idf = math.log(1.0 + (state.live - df + 0.5) / (df + 0.5))
+            if _FAST_ADD_AT:
+                np.add.at(scores, rows, np.float32(idf) * impacts)
+            else:
+                # Rows within one posting are unique, so a fancy-indexed add is safe
+                scores[rows] += np.float32(idf) * impacts
+            del rows, impacts
+        return scores
+
+    def search(self, query, filters=None, limit=20, offset=0):
+        """
+        (total, [(opportunity_id, score), ...]) for one page, best first. An
+        empty query lists the filtered opportunities newest first.
+        """
+        self.apply_pending()
+        self.searches += 1
+        exact, prefixes = parse_query(query)
+        with self._lock:
+            state = self._state
+            n = len(state.ids)
+            terms = set(exact)
+            for prefix in prefixes:
+                terms.update(self._expand(state, prefix) or [prefix])
+
+            if terms:
+                scores = self._score(state, terms, n)
+                eligible = state.active[:n] & (scores > 0)
+            else:
+                # Later rows were indexed later; rank by recency
+                scores = None
+                eligible = state.active[:n].copy()
+            for field, value in (filters or {}).items():
+                code = state.values[field].get(str(value).lower())
+                if code is None:
+                    return 0, []
+                eligible &= state.codes[field][:n] == code
+
+            if terms:
+                total, top = top_eligible(scores, eligible, offset + limit)
+                top = top[offset:offset + limit]
+            else:
+                # Rows are in indexing order, so the newest are at the end
+                candidates = np.flatnonzero(eligible)
+                total = len(candidates)
+                top = candidates[::-1][offset:offset + limit]
+            ranked = [(state.ids[row], float(scores[row]) if terms else None) for row in top]
+        return total, ranked
+
+    def stats(self):
+        state = self._state
+        return {
+            "ready": self.ready,
+            "opportunities": state.live,
+            "dead_rows": state.dead,
+            "terms": len(state.postings),
+            "builds": self.builds,
+            "last_build_seconds": self.last_build_seconds,
+            "searches": self.searches,
+            "updates": self.updates
+        }
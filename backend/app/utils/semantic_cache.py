@@ -0,0 +1,266 @@
+"""
+Semantic Answer Cache
+Reuses earlier tech-mentor answers for near-duplicate questions ("how do I
+learn React" / "roadmap for React"). Questions are embedded and compared
+against the cached questions with one matrix-vector product; the best match
+above a similarity threshold is served instead of calling the LLM. Exact
+repeats are answered from a hash lookup without embedding at all. Entries
+expire after a TTL and the least recently used entry is evicted when full.
+The cache can be warmed from the tech_mentoring log.
+
+Embedding similarity alone can't tell "roadmap for React" from "roadmap for
+Vue": models like e5 score most on-topic questions in a narrow, high band.
+A semantic hit therefore also needs the questions' key terms (words left
+after dropping stopwords and generic asking words like "learn" or "roadmap")
+to overlap by at least min_term_overlap.
+"""
+import hashlib
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from app.utils.ann_index import top_k_indices
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r"[a-z0-9][a-z0-9+#.]*")
+# Words that say how something is asked rather than what it is about
+_GENERIC_WORDS = frozenset("""
+    a about an and any are as at be best can could do does for from get good guide help how i in into is it
+    its learn learning me my need of on or please roadmap should start started starting the to tutorial
+    use using versus vs want way ways what when where which who why will with would you your
+""".split())
+
+
+def normalize_query(text):
+    return " ".join(str(text).lower().split())
+
+
+def key_terms(text):
+    """The words that carry a question's subject: "roadmap for React?" -> {"react"}"""
+    words = (word.rstrip(".") for word in _WORD.findall(str(text).lower()))
+    return frozenset(word for word in words if word and word not in _GENERIC_WORDS)
+
+
+def term_overlap(a, b):
+    """Jaccard overlap of two key-term sets; two questions with no key terms count as matching"""
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def query_key(text):
+    return hashlib.sha256(normalize_query(text).encode("utf-8")).hexdigest()
+
+
+class SemanticCache:
+    """Bounded question -> answer cache with exact and nearest-neighbour lookup"""
+
+    def __init__(self, encode, threshold=0.93, max_size=5000, ttl=86400, warm_limit=None,
+                 query_prefix="", min_term_overlap=0.6, candidates=5):
+        self.encode = encode
+        self.threshold = threshold
+        # Prepended before embedding, e.g. "query: " which e5 models are trained with
+        self.query_prefix = query_prefix
+        self.min_term_overlap = min_term_overlap
+        # Nearest cached questions checked against the term guard before giving up
+        self.candidates = candidates
+        self.max_size = max_size
+        self.ttl = ttl
+        self.warm_limit = max_size if warm_limit is None else warm_limit
+
+        self._lock = threading.Lock()
+        # key -> row, in least-recently-used order
+        self._rows = OrderedDict()
+        self._entries = [None] * max_size
+        self._expires = np.full(max_size, -np.inf)
+        self._vectors = None
+        self._free = list(range(max_size - 1, -1, -1))
+        self._warmed = False
+
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.stored = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.encode_errors = 0
+        self.term_rejections = 0
+
+    def __len__(self):
+        return len(self._rows)
+
+    def _embed(self, text):
+        try:
+            vector = np.asarray(self.encode([self.query_prefix + normalize_query(text)]), dtype=np.float32)[0]
+        except Exception as e:
+            # Without embeddings the cache still answers exact repeats
+            self.encode_errors += 1
+            logger.warning(f"Semantic cache could not embed query: {e}")
+            return None
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+    def _drop(self, key):
+        row = self._rows.pop(key)
+        self._entries[row] = None
+        self._expires[row] = -np.inf
+        self._free.append(row)
+
+    def _put(self, key, vector, entry, expires_at):
+        if key in self._rows:
+            self._drop(key)
+        if not self._free:
+            self._drop(next(iter(self._rows)))
+            self.evictions += 1
+        row = self._free.pop()
+        if vector is not None:
+            if self._vectors is None:
+                self._vectors = np.zeros((self.max_size, vector.shape[0]), dtype=np.float32)
+            self._vectors[row] = vector
+        elif self._vectors is not None:
+            # Not embeddable: only reachable through the exact key
+            self._vectors[row] = 0.0
+        self._entries[row] = entry
+        self._expires[row] = expires_at
+        self._rows[key] = row
+
+    def lookup(self, query):
+        """
+        Cached entry for the query or None. Entries are dicts with the stored
+        query, response and created_at, plus match ('exact' or 'semantic') and similarity.
+        """
+        key = query_key(query)
+        now = time.time()
+        with self._lock:
+            row = self._rows.get(key)
+            if row is not None:
+                if self._expires[row] > now:
+                    self._rows.move_to_end(key)
+                    self.exact_hits += 1
+                    return dict(self._entries[row], match="exact", similarity=1.0)
+                self._drop(key)
+                self.expirations += 1
+            if not self._rows or self._vectors is None:
+                self.misses += 1
+                return None
+
+        vector = self._embed(query)
+        if vector is None:
+            self.misses += 1
+            return None
+
+        terms = key_terms(query)
+        with self._lock:
+            scores = self._vectors @ vector
+            scores[self._expires <= now] = -np.inf
+            rejected = False
+            for row in top_k_indices(scores, self.candidates):
+                if scores[row] < self.threshold:
+                    break
+                entry = self._entries[row]
+                if term_overlap(terms, entry["terms"]) < self.min_term_overlap:
+                    # Close in embedding space but about something else
+                    rejected = True
+                    continue
+                self._rows.move_to_end(query_key(entry["query"]))
+                self.semantic_hits += 1
+                return dict(entry, match="semantic", similarity=round(float(scores[row]), 4))
+            if rejected:
+                self.term_rejections += 1
+            self.misses += 1
+            return None
+
+    def store(self, query, response, created_at=None, vector=None):
+        """Cache a successful answer; created_at lets warm() keep the original age"""
+        created_at = created_at or datetime.now()
+        expires_at = time.time() - (datetime.now() - created_at).total_seconds() + self.ttl
+        if expires_at <= time.time():
+            return False
+        if vector is None:
+            vector = self._embed(query)
+        entry = {"query": query, "response": response, "created_at": created_at, "terms": key_terms(query)}
+        with self._lock:
+            self._put(query_key(query), vector, entry, expires_at)
+            self.stored += 1
+        return True
+
+    def record_bypass(self):
+        self.bypassed += 1
+
+    def warm(self, collection):
+        """Load the most recent successful answers from the tech_mentoring log, once"""
+        if self._warmed or not self.warm_limit:
+            return 0
+        with self._lock:
+            if self._warmed:
+                return 0
+            self._warmed = True
+        try:
+            since = datetime.now() - timedelta(seconds=self.ttl)
+            docs = list(collection.find(
+                {"success": True, "using_fallback": False, "cache_hit": {"$ne": True}, "createdAt": {"$gte": since}},
+                {"query": 1, "response": 1, "createdAt": 1}
+            ).sort("createdAt", -1).limit(self.warm_limit))
+        except Exception as e:
+            logger.warning(f"Semantic cache warmup failed: {e}")
+            return 0
+
+        # Oldest first, so the newest answer wins for repeated questions and ends up most recently used
+        docs.reverse()
+        latest = {}
+        for doc in docs:
+            if doc.get("query") and doc.get("response"):
+                latest[query_key(doc["query"])] = doc
+        docs = list(latest.values())
+        if not docs:
+            return 0
+        try:
+            vectors = np.asarray(
+                self.encode([self.query_prefix + normalize_query(doc["query"]) for doc in docs]), dtype=np.float32
+            )
+            vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        except Exception as e:
+            self.encode_errors += 1
+            logger.warning(f"Semantic cache could not embed warmup queries: {e}")
+            vectors = [None] * len(docs)
+        loaded = sum(
+            self.store(doc["query"], doc["response"], created_at=doc.get("createdAt"), vector=vector)
+            for doc, vector in zip(docs, vectors)
+        )
+        logger.info(f"Semantic cache warmed with {loaded} answers")
+        return loaded
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._rows):
+                self._drop(key)
+
+    def stats(self):
+        with self._lock:
+            hits = self.exact_hits + self.semantic_hits
+            lookups = hits + self.misses
+            return {
+                "size": len(self._rows),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+                "threshold": self.threshold,
+                "min_term_overlap": self.min_term_overlap,
+                "hits": hits,
+                "exact_hits": self.exact_hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "bypassed": self.bypassed,
+                "stored": self.stored,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "encode_errors": self.encode_errors,
+                "term_rejections": self.term_rejections
+            }
@@ -0,0 +1,154 @@
+"""
+Single-Flight Call Coalescing
+Concurrent calls with the same key share one execution: the first caller
+runs the function and the others wait for its result. Within a process the
+waiters block on a Future. With a Mongo collection, a lease document per key
+extends this across processes; followers in other processes poll the
+document until the leader writes the result (or its lease runs out, in which
+case one of them takes over).
+"""
+import hashlib
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """Deduplicates concurrent calls per key, in process and optionally through Mongo"""
+
+    def __init__(self, collection_fn=None, lease_seconds=60, result_ttl=10, poll_interval=0.25):
+        self.collection_fn = collection_fn
+        self.lease_seconds = lease_seconds
+        # How long a finished result stays readable for followers in other processes
+        self.result_ttl = result_ttl
+        self.poll_interval = poll_interval
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._indexes_ready = False
+
+        self.leaders = 0
+        self.coalesced = 0
+        self.remote_coalesced = 0
+        self.takeovers = 0
+        self.errors = 0
+
+    def do(self, key, fn):
+        """(value, shared): fn()'s result, and whether it came from another caller's execution"""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+        if not leader:
+            self.coalesced += 1
+            return future.result(), True
+
+        try:
+            value, shared = self._lead(key, fn)
+            future.set_result(value)
+            return value, shared
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+    def _collection(self):
+        if self.collection_fn is None:
+            return None
+        collection = self.collection_fn()
+        if not self._indexes_ready:
+            collection.create_index("expires_at", expireAfterSeconds=0)
+            self._indexes_ready = True
+        return collection
+
+    def _lead(self, key, fn):
+        try:
+            collection = self._collection()
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Single-flight lease store unavailable: {e}")
+            collection = None
+        if collection is None:
+            self.leaders += 1
+            return fn(), False
+
+        doc_id = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        deadline = time.monotonic() + self.lease_seconds * 2
+        while True:
+            now = datetime.utcnow()
+            try:
+                collection.insert_one({
+                    "_id": doc_id,
+                    "owner": self.owner,
+                    "status": "running",
+                    "lease_until": now + timedelta(seconds=self.lease_seconds),
+                    # Backstop for the TTL index if the leader dies without cleaning up
+                    "expires_at": now + timedelta(seconds=self.lease_seconds + self.result_ttl)
+                })
+                break
+            except DuplicateKeyError:
+                doc = collection.find_one({"_id": doc_id})
+            except Exception as e:
+                self.errors += 1
+                logger.warning(f"Single-flight lease failed, calling upstream directly: {e}")
+                self.leaders += 1
+                return fn(), False
+
+            if doc is None:
+                continue
+            if doc["status"] == "done" and doc["expires_at"] > now:
+                self.remote_coalesced += 1
+                return doc["value"], True
+            if doc["status"] != "done" and doc["lease_until"] > now and time.monotonic() < deadline:
+                time.sleep(self.poll_interval)
+                continue
+            # Leader gone (or result expired): clear its record and try to lead
+            if doc["status"] != "done":
+                self.takeovers += 1
+            collection.delete_one({"_id": doc_id, "owner": doc["owner"], "status": doc["status"]})
+
+        self.leaders += 1
+        try:
+            value = fn()
+        except BaseException:
+            # Let waiting processes take over instead of waiting out the lease
+            self._safe(collection.delete_one, {"_id": doc_id, "owner": self.owner})
+            raise
+        now = datetime.utcnow()
+        self._safe(
+            collection.update_one,
+            {"_id": doc_id, "owner": self.owner},
+            {"$set": {"status": "done", "value": value, "expires_at": now + timedelta(seconds=self.result_ttl)}}
+        )
+        return value, False
+
+    def _safe(self, method, *args):
+        try:
+            method(*args)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Single-flight lease update failed: {e}")
+
+    def stats(self):
+        return {
+            "in_flight": len(self._calls),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "remote_coalesced": self.remote_coalesced,
+            "takeovers": self.takeovers,
+            "errors": self.errors,
+            "shared_across_processes": self.collection_fn is not None
+        }
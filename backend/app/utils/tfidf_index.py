@@ -0,0 +1,159 @@
+"""
+Mentor TF-IDF Index
+Keeps a fitted TfidfVectorizer and the sparse CSR mentor matrix in memory so
+each match only transforms the student text. Changed mentors are transformed
+with the existing vocabulary and the model is refit in the background once
+enough of the corpus has drifted.
+"""
+import logging
+import threading
+from collections import namedtuple
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+logger = logging.getLogger(__name__)
+
+TfidfState = namedtuple('TfidfState', ['ids', 'texts', 'vectorizer', 'matrix'])
+
+
+class TfidfMentorIndex:
+    """Long-lived TF-IDF model over mentor profile texts"""
+
+    def __init__(self, refit_ratio=0.1, vectorizer_factory=TfidfVectorizer):
+        self.refit_ratio = refit_ratio
+        self.vectorizer_factory = vectorizer_factory
+
+        self._lock = threading.Lock()
+        self._state = None
+        self._synced_from = None
+        self._changed_since_fit = 0
+        self._refitting = False
+        self.refit_count = 0
+
+    def _fit(self, ids, texts):
+        vectorizer = self.vectorizer_factory()
+        matrix = vectorizer.fit_transform(texts).tocsr()
+        return TfidfState(ids, texts, vectorizer, matrix)
+
+    def sync(self, snapshot):
+        """
+        Align the index with a mentor index snapshot (ids and texts).
+        The first call fits synchronously; later calls only transform changed rows.
+        """
+        if snapshot is self._synced_from:
+            return
+
+        with self._lock:
+            if snapshot is self._synced_from:
+                return
+
+            state = self._state
+            previous = self._synced_from
+            if (state is not None and previous is not None and state.ids is previous.ids
+                    and snapshot.ids is previous.ids and snapshot.texts is previous.texts):
+                # Same rows and texts (e.g. only facets changed): nothing to transform
+                self._synced_from = snapshot
+                return
+
+            if state is None or state.matrix.shape[0] == 0 or not state.vectorizer.vocabulary_:
+                if any(text.strip() for text in snapshot.texts):
+                    self._state = self._fit(snapshot.ids, snapshot.texts)
+                else:
+                    self._state = None
+                self._synced_from = snapshot
+                self._changed_since_fit = 0
+                return
+
+            old_rows = {mentor_id: row for row, mentor_id in enumerate(state.ids)}
+            reuse_from, reuse_to, changed_rows = [], [], []
+            for row, (mentor_id, text) in enumerate(zip(snapshot.ids, snapshot.texts)):
+                old_row = old_rows.get(mentor_id)
+                if old_row is not None and state.texts[old_row] == text:
+                    reuse_from.append(old_row)
+                    reuse_to.append(row)
+                else:
+                    changed_rows.append(row)
+
+            # Stack reused and freshly transformed rows, then permute into snapshot order
+            blocks = [state.matrix[reuse_from]]
+            if changed_rows:
+                blocks.append(state.vectorizer.transform([snapshot.texts[row] for row in changed_rows]))
+            stacked = sp.vstack(blocks, format='csr')
+            order = np.empty(len(snapshot.ids), dtype=np.int64)
+            order[reuse_to + changed_rows] = np.arange(len(reuse_to) + len(changed_rows))
+            matrix = stacked[order]
+
+            self._state = TfidfState(snapshot.ids, snapshot.texts, state.vectorizer, matrix)
+            self._synced_from = snapshot
+            # Edited and added rows, plus mentors that are gone; an edit counts once
+            removed = len(old_rows.keys() - set(snapshot.ids))
+            self._changed_since_fit += len(changed_rows) + removed
+
+            if (not self._refitting and snapshot.ids
+                    and self._changed_since_fit >= self.refit_ratio * len(snapshot.ids)):
+                self._refitting = True
+                threading.Thread(target=self._refit, name='tfidf-refit', daemon=True).start()
+
+    def _refit(self):
+        """Fit a fresh vocabulary off the request path and swap it in"""
+        try:
+            while True:
+                state = self._state
+                fitted = self._fit(state.ids, state.texts)
+                with self._lock:
+                    # Only swap if no sync landed while we were fitting, otherwise fit again
+                    if self._state is state:
+                        self._state = fitted
+                        self._changed_since_fit = 0
+                        self.refit_count += 1
+                        logger.info(f"TF-IDF index refit on {len(state.ids)} mentors")
+                        return
+        except Exception as e:
+            logger.error(f"TF-IDF refit failed: {e}")
+        finally:
+            self._refitting = False
+
+    def score_many(self, texts, snapshot, rows=None):
+        """Score matrix (texts x mentors) aligned to all (or the given) snapshot rows"""
+        state = self._state
+        width = len(snapshot.ids) if rows is None else len(rows)
+        if state is None:
+            return np.zeros((len(texts), width), dtype=np.float32)
+
+        queries = state.vectorizer.transform(texts)
+        if state.ids is snapshot.ids:
+            matrix = state.matrix if rows is None else state.matrix[rows]
+            return np.asarray((queries @ matrix.T).todense())
+
+        scores = np.asarray((queries @ state.matrix.T).todense())
+        state_rows = {mentor_id: row for row, mentor_id in enumerate(state.ids)}
+        wanted = snapshot.ids if rows is None else [snapshot.ids[row] for row in rows]
+        columns = np.array([state_rows.get(mentor_id, -1) for mentor_id in wanted], dtype=np.int64)
+        aligned = np.zeros((len(texts), width), dtype=scores.dtype)
+        present = columns >= 0
+        aligned[:, present] = scores[:, columns[present]]
+        return aligned
+
+    def score(self, text, snapshot, rows=None):
+        """Cosine similarity of a text against every (or the given) mentor row of the snapshot"""
+        state = self._state
+        if state is None:
+            return np.zeros(len(snapshot.ids) if rows is None else len(rows), dtype=np.float32)
+
+        # Rows are L2-normalized by the vectorizer, so a sparse dot product is the cosine
+        query = state.vectorizer.transform([text])
+        if state.ids is snapshot.ids:
+            matrix = state.matrix if rows is None else state.matrix[rows]
+            return np.asarray((matrix @ query.T).todense()).ravel()
+
+        scores = np.asarray((state.matrix @ query.T).todense()).ravel()
+        state_rows = {mentor_id: row for row, mentor_id in enumerate(state.ids)}
+        wanted = range(len(snapshot.ids)) if rows is None else rows
+        aligned = np.zeros(len(wanted), dtype=scores.dtype)
+        for i, row in enumerate(wanted):
+            state_row = state_rows.get(snapshot.ids[row])
+            if state_row is not None:
+                aligned[i] = scores[state_row]
+        return aligned
@@ -0,0 +1,235 @@
+"""
+Upstream Guard
+Protects the app from a slow or failing upstream API (the Groq LLM).
+- A circuit breaker trips when too many recent calls failed or were slow.
+  While it is open, calls are rejected at once instead of waiting out the
+  client timeout; after a cool-down a few trial calls decide whether it closes.
+- An AIMD limiter caps concurrent upstream calls. The limit grows by about
+  one per limit's worth of fast successes and is cut multiplicatively on
+  errors or slow responses.
+Rejected calls raise UpstreamRejected so callers can return their fallback.
+"""
+import threading
+import time
+from collections import deque
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class UpstreamRejected(Exception):
+    """The guard refused the call; reason is 'circuit_open' or 'concurrency_limit'"""
+
+    def __init__(self, reason):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class CircuitBreaker:
+    """Count-based rolling window breaker with failure-rate and slow-call-rate thresholds"""
+
+    def __init__(self, window=20, min_calls=5, failure_rate=0.5, slow_call_seconds=30.0,
+                 slow_rate=0.5, open_seconds=30.0, half_open_calls=1):
+        self.window = window
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_rate = slow_rate
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+
+        self._lock = threading.Lock()
+        # (failed, slow) per recent call
+        self._calls = deque(maxlen=window)
+        self._state = CLOSED
+        self._opened_at = None
+        self._trials = 0
+
+        self.times_opened = 0
+        self.rejected = 0
+        self.last_trip_reason = None
+
+    def _refresh(self, now):
+        if self._state == OPEN and now - self._opened_at >= self.open_seconds:
+            self._state = HALF_OPEN
+            self._trials = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            self._refresh(time.monotonic())
+            return self._state
+
+    def allow(self):
+        with self._lock:
+            self._refresh(time.monotonic())
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and self._trials < self.half_open_calls:
+                self._trials += 1
+                return True
+            self.rejected += 1
+            return False
+
+    def _open(self, reason):
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self._calls.clear()
+        self.times_opened += 1
+        self.last_trip_reason = reason
+
+    def record(self, ok, latency):
+        slow = latency >= self.slow_call_seconds
+        with self._lock:
+            if self._state == HALF_OPEN:
+                if ok and not slow:
+                    self._state = CLOSED
+                    self._calls.clear()
+                else:
+                    self._open("trial call failed" if not ok else "trial call slow")
+                return
+            if self._state == OPEN:
+                # A call admitted before the trip finished late; it doesn't change anything
+                return
+
+            self._calls.append((not ok, slow))
+            if len(self._calls) < self.min_calls:
+                return
+            failures = sum(1 for failed, _ in self._calls if failed) / len(self._calls)
+            slows = sum(1 for _, is_slow in self._calls if is_slow) / len(self._calls)
+            if failures >= self.failure_rate:
+                self._open(f"failure rate {failures:.0%}")
+            elif slows >= self.slow_rate:
+                self._open(f"slow call rate {slows:.0%}")
+
+    def stats(self):
+        with self._lock:
+            now = time.monotonic()
+            self._refresh(now)
+            calls = len(self._calls)
+            return {
+                "state": self._state,
+                "window_calls": calls,
+                "failure_rate": round(sum(1 for failed, _ in self._calls if failed) / calls, 4) if calls else 0.0,
+                "slow_rate": round(sum(1 for _, slow in self._calls if slow) / calls, 4) if calls else 0.0,
+                "times_opened": self.times_opened,
+                "rejected": self.rejected,
+                "last_trip_reason": self.last_trip_reason,
+                "retry_in_seconds": round(max(0.0, self.open_seconds - (now - self._opened_at)), 1)
+                if self._state == OPEN else 0.0
+            }
+
+
+class AIMDLimiter:
+    """Adaptive concurrency limit: additive increase on fast successes, multiplicative decrease on trouble"""
+
+    def __init__(self, initial=8, min_limit=1, max_limit=64, latency_target=20.0, backoff=0.5, cooldown=1.0):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target = latency_target
+        self.backoff = backoff
+        # At most one decrease per cooldown, so a burst of failures from one overload counts once
+        self.cooldown = cooldown
+
+        self._lock = threading.Lock()
+        self._limit = float(initial)
+        self._inflight = 0
+        self._last_decrease = 0.0
+
+        self.rejected = 0
+        self.increases = 0
+        self.decreases = 0
+        self.peak_inflight = 0
+
+    @property
+    def limit(self):
+        return max(self.min_limit, int(self._limit))
+
+    def acquire(self):
+        with self._lock:
+            if self._inflight >= self.limit:
+                self.rejected += 1
+                return False
+            self._inflight += 1
+            self.peak_inflight = max(self.peak_inflight, self._inflight)
+            return True
+
+    def cancel(self):
+        """Give a slot back without a call having been made"""
+        with self._lock:
+            self._inflight -= 1
+
+    def release(self, ok, latency):
+        with self._lock:
+            self._inflight -= 1
+            now = time.monotonic()
+            if not ok or latency > self.latency_target:
+                if now - self._last_decrease >= self.cooldown:
+                    self._limit = max(float(self.min_limit), self._limit * self.backoff)
+                    self._last_decrease = now
+                    self.decreases += 1
+            elif self._limit < self.max_limit:
+                self._limit = min(float(self.max_limit), self._limit + 1.0 / self._limit)
+                self.increases += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "limit": self.limit,
+                "inflight": self._inflight,
+                "peak_inflight": self.peak_inflight,
+                "min_limit": self.min_limit,
+                "max_limit": self.max_limit,
+                "latency_target_seconds": self.latency_target,
+                "rejected": self.rejected,
+                "increases": self.increases,
+                "decreases": self.decreases
+            }
+
+
+class UpstreamGuard:
+    """Circuit breaker + concurrency limiter around calls to one upstream"""
+
+    def __init__(self, name, breaker, limiter):
+        self.name = name
+        self.breaker = breaker
+        self.limiter = limiter
+        self.calls = 0
+        self.failures = 0
+
+    def acquire(self):
+        """Take a slot for one call or raise UpstreamRejected; pair with release()"""
+        if not self.limiter.acquire():
+            raise UpstreamRejected("concurrency_limit")
+        if not self.breaker.allow():
+            self.limiter.cancel()
+            raise UpstreamRejected("circuit_open")
+        return time.monotonic()
+
+    def release(self, started, ok, latency=None):
+        latency = time.monotonic() - started if latency is None else latency
+        self.calls += 1
+        if not ok:
+            self.failures += 1
+        self.breaker.record(ok, latency)
+        self.limiter.release(ok, latency)
+
+    def call(self, fn):
+        started = self.acquire()
+        try:
+            result = fn()
+        except Exception:
+            self.release(started, False)
+            raise
+        self.release(started, True)
+        return result
+
+    def stats(self):
+        return {
+            "upstream": self.name,
+            "calls": self.calls,
+            "failures": self.failures,
+            "breaker": self.breaker.stats(),
+            "limiter": self.limiter.stats()
+        }
@@ -0,0 +1,138 @@
+"""
+Compact Vector Store
+Embedding matrix stored as float32, float16 or int8 (symmetric, one scale per
+row). Scores are computed block by block on the compact representation, so
+the full float32 matrix is never materialized, and stores can be
+memory-mapped from .npy files so every worker shares one page-cache copy.
+"""
+import os
+
+import numpy as np
+
+DTYPES = ("float32", "float16", "int8")
+
+# Rows upcast per block while scoring; bounds the float32 scratch space to a few MB
+BLOCK_ROWS = 16384
+
+
+class VectorStore:
+    """Row-major embedding matrix in float32, float16 or int8 + per-row scales"""
+
+    def __init__(self, data, scales=None):
+        self.data = data
+        self.scales = scales
+
+    @classmethod
+    def empty(cls, dtype="float32", dim=0):
+        return cls.allocate(0, dim, dtype)
+
+    @classmethod
+    def allocate(cls, n, dim, dtype):
+        if dtype not in DTYPES:
+            raise ValueError(f"Unsupported vector dtype '{dtype}', expected one of {DTYPES}")
+        data = np.empty((n, dim), dtype=np.dtype(dtype))
+        scales = np.empty(n, dtype=np.float32) if dtype == "int8" else None
+        return cls(data, scales)
+
+    @classmethod
+    def from_float32(cls, vectors, dtype="float32"):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        store = cls.allocate(vectors.shape[0], vectors.shape[1] if vectors.ndim == 2 else 0, dtype)
+        if vectors.shape[0]:
+            store.put(np.arange(vectors.shape[0]), vectors)
+        return store
+
+    @property
+    def dtype(self):
+        return self.data.dtype.name
+
+    @property
+    def shape(self):
+        return self.data.shape
+
+    @property
+    def nbytes(self):
+        return self.data.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    def __len__(self):
+        return self.data.shape[0]
+
+    def put(self, rows, vectors):
+        """Quantize float32 vectors into the given rows"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if self.scales is None:
+            self.data[rows] = vectors.astype(self.data.dtype)
+            return
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        self.data[rows] = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+        self.scales[rows] = scales
+
+    def copy_rows(self, rows, source, source_rows):
+        """Copy already-compact rows from another store of the same dtype (no requantization)"""
+        self.data[rows] = source.data[source_rows]
+        if self.scales is not None:
+            self.scales[rows] = source.scales[source_rows]
+
+    def __getitem__(self, rows):
+        """Dequantized float32 rows"""
+        block = np.asarray(self.data[rows], dtype=np.float32)
+        if self.scales is not None:
+            block *= np.asarray(self.scales[rows], dtype=np.float32)[..., None]
+        return block
+
+    def dot(self, query, rows=None):
+        """Scores of one float32 query against all (or the given) rows"""
+        query = np.asarray(query, dtype=np.float32)
+        if rows is not None:
+            return self[rows] @ query
+        n = self.data.shape[0]
+        scores = np.empty(n, dtype=np.float32)
+        for start in range(0, n, BLOCK_ROWS):
+            stop = min(start + BLOCK_ROWS, n)
+            scores[start:stop] = np.asarray(self.data[start:stop], dtype=np.float32) @ query
+            if self.scales is not None:
+                scores[start:stop] *= self.scales[start:stop]
+        return scores
+
+    def matmul(self, queries):
+        """Score matrix (queries x rows)"""
+        queries = np.asarray(queries, dtype=np.float32)
+        n = self.data.shape[0]
+        scores = np.empty((queries.shape[0], n), dtype=np.float32)
+        for start in range(0, n, BLOCK_ROWS):
+            stop = min(start + BLOCK_ROWS, n)
+            scores[:, start:stop] = queries @ np.asarray(self.data[start:stop], dtype=np.float32).T
+            if self.scales is not None:
+                scores[:, start:stop] *= self.scales[start:stop]
+        return scores
+
+    def astype(self, dtype):
+        if dtype == self.dtype:
+            return self
+        store = VectorStore.allocate(len(self), self.shape[1], dtype)
+        for start in range(0, len(self), BLOCK_ROWS):
+            rows = np.arange(start, min(start + BLOCK_ROWS, len(self)))
+            store.put(rows, self[rows])
+        return store
+
+    def save(self, prefix):
+        """Write <prefix>.npy (and <prefix>.scales.npy for int8)"""
+        np.save(f"{prefix}.npy", self.data)
+        if self.scales is not None:
+            np.save(f"{prefix}.scales.npy", self.scales)
+
+    @staticmethod
+    def remove(prefix):
+        for path in (f"{prefix}.npy", f"{prefix}.scales.npy"):
+            if os.path.exists(path):
+                os.remove(path)
+
+    @classmethod
+    def load(cls, prefix, mmap=True):
+        mode = "r" if mmap else None
+        data = np.load(f"{prefix}.npy", mmap_mode=mode)
+        scales = None
+        if data.dtype == np.int8:
+            scales = np.load(f"{prefix}.scales.npy", mmap_mode=mode)
+        return cls(data, scales)
@@ -0,0 +1,194 @@
+"""
+Write-Behind Buffer
+Batches inserts into append-only collections (Q&A logs, request logs) off the
+request path. append() only queues the document; a background thread writes
+queued documents with insert_many(ordered=False) every flush interval, or
+sooner once a batch fills up. The queue is bounded: when Mongo falls behind,
+the oldest documents are dropped and counted rather than growing memory.
+Failed batches are retried with backoff, and buffers are drained at exit.
+"""
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger(__name__)
+
+_buffers = {}
+_registry_lock = threading.Lock()
+
+
+class WriteBehindBuffer:
+    """Bounded in-memory queue of documents flushed to one collection in batches"""
+
+    def __init__(self, collection_fn, name, max_items=10000, batch_size=500, flush_interval=1.0, max_retries=5):
+        # Called on use, so the collection can come from an extension initialised after import
+        self.collection_fn = collection_fn
+        self.name = name
+        self.max_items = max_items
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+
+        self._reset()
+        self.appended = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+        self.retries = 0
+        self.last_error = None
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._queue = deque()
+        self._cond = threading.Condition()
+        # One writer at a time, whether the flusher thread or a synchronous flush()
+        self._write_lock = threading.Lock()
+        self._thread = None
+
+    def _ensure_thread(self):
+        if self._pid != os.getpid():
+            # Forked child: the parent's thread and locks did not come along
+            self._reset()
+        if self._thread is None:
+            with self._cond:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name=f"write-behind-{self.name}", daemon=True)
+                    self._thread.start()
+
+    def __len__(self):
+        return len(self._queue)
+
+    def append(self, doc):
+        """Queue a document for insertion; returns False if the oldest queued document had to be dropped"""
+        self._ensure_thread()
+        dropped = False
+        with self._cond:
+            if len(self._queue) >= self.max_items:
+                self._queue.popleft()
+                self.dropped += 1
+                dropped = True
+            self._queue.append(doc)
+            self.appended += 1
+            if len(self._queue) >= self.batch_size:
+                self._cond.notify()
+        if dropped and self.dropped % 1000 == 1:
+            logger.warning(f"Write-behind buffer {self.name} is full; dropped {self.dropped} documents so far")
+        return not dropped
+
+    def _take(self):
+        with self._cond:
+            count = min(self.batch_size, len(self._queue))
+            return [self._queue.popleft() for _ in range(count)]
+
+    def _requeue(self, batch):
+        """Put a failed batch back at the front, keeping within max_items"""
+        with self._cond:
+            room = self.max_items - len(self._queue)
+            if room < len(batch):
+                self.dropped += len(batch) - max(room, 0)
+                batch = batch[len(batch) - max(room, 0):]
+            self._queue.extendleft(reversed(batch))
+
+    def _write(self, batch):
+        """Insert one batch; True when done with it (written or permanently failed), False to retry"""
+        try:
+            self.collection_fn().insert_many(batch, ordered=False)
+            self.written += len(batch)
+        except BulkWriteError as e:
+            # Duplicate keys come from a retried batch that partly succeeded; anything else is not retryable
+            errors = [error for error in e.details.get("writeErrors", []) if error.get("code") != 11000]
+            self.written += len(batch) - len(errors)
+            if errors:
+                self.failed += len(errors)
+                self.last_error = errors[0].get("errmsg")
+                logger.error(f"Write-behind buffer {self.name}: {len(errors)} documents rejected: {self.last_error}")
+        except Exception as e:
+            self.last_error = str(e)
+            return False
+        self.batches += 1
+        return True
+
+    def _run(self):
+        failures = 0
+        while True:
+            with self._cond:
+                if len(self._queue) < self.batch_size:
+                    self._cond.wait(self.flush_interval)
+            with self._write_lock:
+                batch = self._take()
+                if not batch:
+                    continue
+                if self._write(batch):
+                    failures = 0
+                    continue
+                failures += 1
+                if failures > self.max_retries:
+                    self.failed += len(batch)
+                    logger.error(f"Write-behind buffer {self.name}: dropping {len(batch)} documents after "
+                                 f"{self.max_retries} retries: {self.last_error}")
+                    failures = 0
+                    continue
+                self.retries += 1
+                self._requeue(batch)
+            time.sleep(min(2 ** failures, 30))
+
+    def flush(self, timeout=10.0):
+        """Write everything queued now, in the calling thread; returns the number of documents written"""
+        deadline = time.monotonic() + timeout
+        before = self.written
+        with self._write_lock:
+            while self._queue and time.monotonic() < deadline:
+                batch = self._take()
+                if not self._write(batch):
+                    self._requeue(batch)
+                    logger.error(f"Write-behind buffer {self.name}: flush failed: {self.last_error}")
+                    break
+        return self.written - before
+
+    def stats(self):
+        return {
+            "queued": len(self._queue),
+            "max_items": self.max_items,
+            "batch_size": self.batch_size,
+            "flush_interval_seconds": self.flush_interval,
+            "appended": self.appended,
+            "written": self.written,
+            "batches": self.batches,
+            "retries": self.retries,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "last_error": self.last_error
+        }
+
+
+def get_buffer(name, collection_fn, **kwargs):
+    """The process-wide buffer for name, created on first use"""
+    buffer = _buffers.get(name)
+    if buffer is None:
+        with _registry_lock:
+            buffer = _buffers.get(name)
+            if buffer is None:
+                buffer = _buffers[name] = WriteBehindBuffer(collection_fn, name, **kwargs)
+    return buffer
+
+
+def flush_all(timeout=10.0):
+    for buffer in list(_buffers.values()):
+        try:
+            buffer.flush(timeout)
+        except Exception as e:
+            logger.error(f"Write-behind buffer {buffer.name} could not flush at shutdown: {e}")
+
+
+def stats():
+    return {name: buffer.stats() for name, buffer in _buffers.items()}
+
+
+# Drain on interpreter shutdown (including a gunicorn worker exiting normally)
+atexit.register(flush_all)
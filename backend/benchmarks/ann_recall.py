@@ -0,0 +1,128 @@
+"""
+ANN Recall vs Latency Report
+Compares the IVF candidate search used by /match against exact scoring on
+synthetic clustered embeddings, sweeping the number of probed lists.
+
+Usage (from the backend directory):
+    python benchmarks/ann_recall.py --sizes 1000 10000 100000 --json ann_report.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.ann_index import AnnMentorIndex, top_k_indices
+from app.utils.mentor_index import IndexSnapshot
+
+
+def topic_centres(n, dim, rng):
+    return rng.standard_normal((max(8, n // 250), dim)).astype(np.float32)
+
+
+def synthetic_embeddings(n, centres, spread, rng):
+    """Normalized vectors grouped around topic centres, like mentor expertise embeddings"""
+    labels = rng.integers(0, centres.shape[0], size=n)
+    vectors = centres[labels] + spread * rng.standard_normal((n, centres.shape[1])).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def percentile_ms(samples, q):
+    return float(np.percentile(samples, q) * 1000)
+
+
+def run(n, dim, k, n_queries, probes, rerank, spread, seed):
+    rng = np.random.default_rng(seed)
+    centres = topic_centres(n, dim, rng)
+    vectors = synthetic_embeddings(n, centres, spread, rng)
+    # Students are drawn from the same topics as the mentors
+    queries = synthetic_embeddings(n_queries, centres, spread, rng)
+
+    exact_results, exact_times = [], []
+    for q in queries:
+        start = time.perf_counter()
+        exact_results.append(set(top_k_indices(vectors @ q, k).tolist()))
+        exact_times.append(time.perf_counter() - start)
+
+    # Same index and candidate logic as /match, just without Mongo behind the snapshot
+    snapshot = IndexSnapshot([str(i) for i in range(n)], [str(i) for i in range(n)], vectors)
+    ann = AnnMentorIndex(min_size=1)
+    start = time.perf_counter()
+    ann.sync(snapshot)
+    build_s = time.perf_counter() - start
+    ivf = ann._state[1]
+
+    report = {
+        "mentors": n,
+        "dim": dim,
+        "k": k,
+        "lists": ivf.n_lists,
+        "build_s": round(build_s, 3),
+        "exact": {
+            "p50_ms": round(percentile_ms(exact_times, 50), 3),
+            "p95_ms": round(percentile_ms(exact_times, 95), 3)
+        },
+        "ivf": []
+    }
+
+    for n_probe in probes:
+        if n_probe > ivf.n_lists:
+            continue
+        times, recalls, sizes = [], [], []
+        for q, truth in zip(queries, exact_results):
+            start = time.perf_counter()
+            rows = ann.candidates(snapshot, q, max(rerank, k), n_probe=n_probe)
+            if rows is None:
+                rows = np.arange(n)
+            top = rows[top_k_indices(vectors[rows] @ q, k)]
+            times.append(time.perf_counter() - start)
+            recalls.append(len(truth.intersection(top.tolist())) / k)
+            sizes.append(rows.shape[0])
+        report["ivf"].append({
+            "n_probe": n_probe,
+            "recall": round(float(np.mean(recalls)), 4),
+            "candidates": int(np.mean(sizes)),
+            "p50_ms": round(percentile_ms(times, 50), 3),
+            "p95_ms": round(percentile_ms(times, 95), 3)
+        })
+    return report
+
+
+def print_report(report):
+    print(f"\n{report['mentors']} mentors, {report['lists']} lists, build {report['build_s']}s")
+    print(f"  exact          p50 {report['exact']['p50_ms']:8.3f}ms  p95 {report['exact']['p95_ms']:8.3f}ms  recall 1.0000")
+    for row in report["ivf"]:
+        print(
+            f"  n_probe={row['n_probe']:<4}  p50 {row['p50_ms']:8.3f}ms  p95 {row['p95_ms']:8.3f}ms  "
+            f"recall {row['recall']:.4f}  candidates {row['candidates']}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--probes", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--rerank", type=int, default=200, help="minimum candidates handed to the exact rerank")
+    parser.add_argument("--spread", type=float, default=1.5, help="noise around topic centres; higher is harder")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write the report to this file")
+    args = parser.parse_args()
+
+    reports = []
+    for n in args.sizes:
+        report = run(n, args.dim, args.k, args.queries, args.probes, args.rerank, args.spread, args.seed)
+        print_report(report)
+        reports.append(report)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(reports, f, indent=2)
+        print(f"\nReport written to {args.json}")
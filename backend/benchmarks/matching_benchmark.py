@@ -0,0 +1,313 @@
+"""
+Matching Benchmark
+Runs the /match ranking pipeline (ANN candidates, exact hybrid rerank, facet
+masks, batch scoring) against synthetic mentor and student corpora generated
+by seed_mentors.py, and reports p50/p95/p99 latency, index build time, peak
+RSS and top-k recall against exact scoring for each engine. Each corpus size
+runs in its own process so peak RSS is per size.
+
+Engines:
+    exact     every mentor scored (the small-corpus path of /match)
+    ivf       IVF candidates + exact rerank, float32 vectors
+    ivf_int8  IVF candidates + exact rerank, int8 vectors
+    filtered  IVF with a facet mask (availability + min_rating)
+    batch     /match/batch scoring, latency per student
+
+Embeddings come from a deterministic hashed bag-of-words encoder so runs are
+comparable across machines; --encoder model uses the real sentence model.
+
+Usage (from the backend directory):
+    python benchmarks/matching_benchmark.py --sizes 1000 10000 100000 --json match_report.json
+    python benchmarks/matching_benchmark.py --sizes 10000 --baseline match_report.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import re
+import resource
+import subprocess
+import sys
+import time
+import zlib
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+ENGINES = ("exact", "ivf", "ivf_int8", "filtered", "batch")
+FILTERS = {"availability": ["weekends", "evenings"], "min_rating": 4.0}
+_WORD = re.compile(r"[\w+#]+")
+
+
+class HashEncoder:
+    """Deterministic stand-in for the sentence model: normalized sum of per-word random vectors"""
+
+    def __init__(self, dim):
+        self.dim = dim
+        self._words = {}
+        self._texts = {}
+
+    def _word(self, word):
+        vector = self._words.get(word)
+        if vector is None:
+            rng = np.random.default_rng(zlib.crc32(word.encode("utf-8")))
+            vector = self._words[word] = rng.standard_normal(self.dim).astype(np.float32)
+        return vector
+
+    def _text(self, text):
+        vector = self._texts.get(text)
+        if vector is None:
+            vector = np.zeros(self.dim, dtype=np.float32)
+            for word in _WORD.findall(text):
+                vector += self._word(word)
+            norm = np.linalg.norm(vector)
+            vector = self._texts[text] = vector / norm if norm else vector
+        return vector
+
+    def __call__(self, texts):
+        return np.stack([self._text(text) for text in texts]) if texts else np.zeros((0, self.dim), np.float32)
+
+
+def percentile_ms(samples, q):
+    return round(float(np.percentile(samples, q) * 1000), 3)
+
+
+def latency(samples):
+    return {"p50_ms": percentile_ms(samples, 50), "p95_ms": percentile_ms(samples, 95), "p99_ms": percentile_ms(samples, 99)}
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+class GroundTruth:
+    """
+    Exact hybrid scores on float32 vectors. Synthetic mentors often share an
+    expertise list and therefore a score, so recall counts any returned mentor
+    scoring at least the exact k-th best score as a hit rather than comparing id sets.
+    """
+
+    def __init__(self, snapshot, query_texts, query_vectors, k, mask=None):
+        from app.utils.ann_index import top_k_indices
+        from app.utils.tfidf_index import TfidfMentorIndex
+
+        self.snapshot = snapshot
+        self.tfidf = TfidfMentorIndex(refit_ratio=1e9)
+        self.tfidf.sync(snapshot)
+        self.thresholds = []
+        for text, vector in zip(query_texts, query_vectors):
+            scores = self.scores(text, vector)
+            if mask is not None:
+                scores = np.where(mask, scores, -np.inf)
+            top = top_k_indices(scores, k)
+            self.thresholds.append(float(scores[top[-1]]) if len(top) else None)
+
+    def scores(self, text, vector, rows=None):
+        return (0.6 * self.snapshot.vectors.dot(vector, rows=rows)
+                + 0.4 * self.tfidf.score(text, self.snapshot, rows=rows))
+
+    def recall(self, results, query_texts, query_vectors, k):
+        hits = []
+        for got, text, vector, threshold in zip(results, query_texts, query_vectors, self.thresholds):
+            if threshold is None or not np.isfinite(threshold):
+                continue
+            rows = np.array([self.snapshot.facets.row_of(m["mentor_id"]) for m in got], dtype=np.int64)
+            exact = self.scores(text, vector, rows=rows) if len(rows) else np.zeros(0)
+            hits.append(float(np.sum(exact >= threshold - 1e-5)) / k)
+        return round(float(np.mean(hits)), 4) if hits else None
+
+
+def build_snapshot(ids, texts, facets, encode, dim, dtype, block=16384):
+    """Embed mentors block by block into a VectorStore of the given dtype and wrap it in a snapshot"""
+    from app.utils.mentor_index import IndexSnapshot
+    from app.utils.vector_store import VectorStore
+
+    store = VectorStore.allocate(len(ids), dim, dtype)
+    for start in range(0, len(ids), block):
+        stop = min(start + block, len(ids))
+        store.put(np.arange(start, stop), encode(texts[start:stop]))
+    return IndexSnapshot(ids, texts, store, facets)
+
+
+def run(n, args):
+    """Benchmark every engine on one corpus size; runs in a child process"""
+    import seed_mentors
+    from app.routes import matching
+    from app.utils.ann_index import AnnMentorIndex
+    from app.utils.facet_index import FacetIndex, facet_values
+    from app.utils.match_service import student_text
+    from app.utils.tfidf_index import TfidfMentorIndex
+
+    if args.encoder == "model":
+        encode, dim = matching.encode_texts, None
+    else:
+        encode, dim = HashEncoder(args.dim), args.dim
+
+    start = time.perf_counter()
+    mentors = list(seed_mentors.synthetic_mentors(n, args.seed))
+    students = list(seed_mentors.synthetic_students(args.queries, args.seed))
+    ids = [str(doc["_id"]) for doc in mentors]
+    texts = [matching.list_to_text(doc.get("expertise", [])) for doc in mentors]
+    facets = FacetIndex(ids, [facet_values(doc) for doc in mentors])
+    del mentors
+    generate_s = time.perf_counter() - start
+
+    query_texts = [student_text(doc) for doc in students]
+    encode_times, query_vectors = [], []
+    for text in query_texts:
+        start = time.perf_counter()
+        query_vectors.append(np.asarray(encode([text]), dtype=np.float32)[0])
+        encode_times.append(time.perf_counter() - start)
+    if dim is None:
+        dim = query_vectors[0].shape[0]
+    mask = facets.mask(FILTERS)
+
+    report = {
+        "mentors": n,
+        "queries": args.queries,
+        "k": args.k,
+        "generate_s": round(generate_s, 3),
+        "student_encode": latency(encode_times),
+        "engines": {}
+    }
+    # Ground truth is exact scoring on float32 vectors, with and without the facet mask
+    start = time.perf_counter()
+    snapshots = {"float32": build_snapshot(ids, texts, facets, encode, dim, "float32")}
+    embed_times = {"float32": time.perf_counter() - start}
+    truth = GroundTruth(snapshots["float32"], query_texts, query_vectors, args.k)
+    filtered_truth = None
+    if "filtered" in args.engines:
+        filtered_truth = GroundTruth(snapshots["float32"], query_texts, query_vectors, args.k, mask=mask)
+
+    for engine in args.engines:
+        dtype = "int8" if engine == "ivf_int8" else "float32"
+        use_ann = engine in ("ivf", "ivf_int8", "filtered")
+
+        # Fresh indexes per engine; rank_mentors reads these module globals
+        matching.tfidf_index = TfidfMentorIndex(refit_ratio=1e9)
+        matching.ann_index = AnnMentorIndex(min_size=1 if use_ann else n + 1, n_probe=args.n_probe)
+
+        snapshot = snapshots.get(dtype)
+        if snapshot is None:
+            start = time.perf_counter()
+            snapshot = snapshots[dtype] = build_snapshot(ids, texts, facets, encode, dim, dtype)
+            embed_times[dtype] = time.perf_counter() - start
+        start = time.perf_counter()
+        matching.tfidf_index.sync(snapshot)
+        tfidf_s = time.perf_counter() - start
+        start = time.perf_counter()
+        matching.ann_index.sync(snapshot)
+        ann_s = time.perf_counter() - start
+
+        times, results = [], []
+        if engine == "batch":
+            for offset in range(0, args.queries, args.batch_size):
+                batch_texts = query_texts[offset:offset + args.batch_size]
+                batch_vectors = np.stack(query_vectors[offset:offset + args.batch_size])
+                start = time.perf_counter()
+                ranked = list(matching.rank_mentors_many(batch_texts, batch_vectors, snapshot, args.k))
+                per_student = (time.perf_counter() - start) / len(batch_texts)
+                times.extend([per_student] * len(batch_texts))
+                results.extend(ranked)
+        else:
+            engine_mask = mask if engine == "filtered" else None
+            for text, vector in zip(query_texts, query_vectors):
+                start = time.perf_counter()
+                results.append(matching.rank_mentors(text, vector, snapshot, args.k, mask=engine_mask))
+                times.append(time.perf_counter() - start)
+        engine_truth = filtered_truth if engine == "filtered" else truth
+        engine_recall = engine_truth.recall(results, query_texts, query_vectors, args.k)
+
+        report["engines"][engine] = dict(
+            latency(times),
+            qps=round(len(times) / sum(times), 1) if sum(times) else None,
+            recall=engine_recall,
+            embed_s=round(embed_times[dtype], 3),
+            tfidf_build_s=round(tfidf_s, 3),
+            ann_build_s=round(ann_s, 3),
+            vector_mb=round(snapshot.vectors.nbytes / (1024 * 1024), 1),
+            peak_rss_mb=peak_rss_mb()
+        )
+        if engine == "filtered":
+            report["engines"][engine]["eligible"] = int(mask.sum()) if mask is not None else n
+
+    report["peak_rss_mb"] = peak_rss_mb()
+    return report
+
+
+def environment():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, timeout=10
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    import sklearn
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "sklearn": sklearn.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count()
+    }
+
+
+def print_report(report, baseline=None):
+    print(f"\n{report['mentors']} mentors, {report['queries']} queries, k={report['k']}, "
+          f"peak RSS {report['peak_rss_mb']} MB, student encode p50 {report['student_encode']['p50_ms']}ms")
+    for engine, row in report["engines"].items():
+        recall_text = "  -   " if row["recall"] is None else f"{row['recall']:.4f}"
+        print(
+            f"  {engine:<9} p50 {row['p50_ms']:8.3f}ms  p95 {row['p95_ms']:8.3f}ms  p99 {row['p99_ms']:8.3f}ms  "
+            f"recall {recall_text}  build {row['tfidf_build_s'] + row['ann_build_s']:.2f}s  rss {row['peak_rss_mb']} MB"
+        )
+        old = (baseline or {}).get(engine)
+        if old:
+            deltas = []
+            for key in ("p50_ms", "p95_ms", "p99_ms", "ann_build_s", "peak_rss_mb"):
+                if old.get(key):
+                    deltas.append(f"{key} {100.0 * (row[key] - old[key]) / old[key]:+.1f}%")
+            if row["recall"] is not None and old.get("recall") is not None:
+                deltas.append(f"recall {row['recall'] - old['recall']:+.4f}")
+            print(f"  {'':<9} vs baseline: {', '.join(deltas)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000, 1000000])
+    parser.add_argument("--engines", nargs="+", choices=ENGINES, default=list(ENGINES))
+    parser.add_argument("--encoder", choices=("hash", "model"), default="hash")
+    parser.add_argument("--dim", type=int, default=384, help="hash encoder dimension")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--n-probe", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write the report to this file")
+    parser.add_argument("--baseline", help="earlier --json report to compare against")
+    args = parser.parse_args()
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = {report["mentors"]: report["engines"] for report in json.load(f)["results"]}
+
+    output = {"environment": environment(), "params": vars(args), "results": []}
+    # A fresh process per size keeps ru_maxrss meaningful and returns memory between sizes
+    context = multiprocessing.get_context("spawn")
+    for n in args.sizes:
+        with context.Pool(1) as pool:
+            report = pool.apply(run, (n, args))
+        print_report(report, baseline.get(n))
+        output["results"].append(report)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(output, f, indent=2)
+        print(f"\nReport written to {args.json}")
@@ -0,0 +1,88 @@
+"""
+Quantization Drift Report
+Scores synthetic clustered embeddings with the float32, float16 and int8
+mentor vector stores and reports how far the compact stores drift from
+float32: absolute score error, top-k overlap, memory and scoring latency.
+
+Usage (from the backend directory):
+    python benchmarks/quantization_drift.py --sizes 10000 100000 --json drift_report.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.ann_index import top_k_indices
+from app.utils.vector_store import DTYPES, VectorStore
+from benchmarks.ann_recall import percentile_ms, synthetic_embeddings, topic_centres
+
+
+def run(n, dim, k, n_queries, spread, seed):
+    rng = np.random.default_rng(seed)
+    centres = topic_centres(n, dim, rng)
+    vectors = synthetic_embeddings(n, centres, spread, rng)
+    queries = synthetic_embeddings(n_queries, centres, spread, rng)
+
+    reference = VectorStore.from_float32(vectors, "float32")
+    exact = [reference.dot(q) for q in queries]
+    exact_top = [set(top_k_indices(scores, k).tolist()) for scores in exact]
+
+    report = {"mentors": n, "dim": dim, "k": k, "stores": []}
+    for dtype in DTYPES:
+        store = VectorStore.from_float32(vectors, dtype)
+        errors, overlaps, times = [], [], []
+        for q, truth, scores in zip(queries, exact_top, exact):
+            start = time.perf_counter()
+            approx = store.dot(q)
+            times.append(time.perf_counter() - start)
+            errors.append(np.abs(approx - scores))
+            overlaps.append(len(truth.intersection(top_k_indices(approx, k).tolist())) / k)
+        errors = np.concatenate(errors)
+        report["stores"].append({
+            "dtype": dtype,
+            "mb": round(store.nbytes / 2 ** 20, 2),
+            "max_abs_error": float(errors.max()),
+            "mean_abs_error": float(errors.mean()),
+            "top_k_overlap": round(float(np.mean(overlaps)), 4),
+            "p50_ms": round(percentile_ms(times, 50), 3),
+            "p95_ms": round(percentile_ms(times, 95), 3)
+        })
+    return report
+
+
+def print_report(report):
+    print(f"\n{report['mentors']} mentors x {report['dim']} dims, top-{report['k']}")
+    for row in report["stores"]:
+        print(
+            f"  {row['dtype']:<8} {row['mb']:9.2f}MB  max err {row['max_abs_error']:.2e}  "
+            f"mean err {row['mean_abs_error']:.2e}  overlap {row['top_k_overlap']:.4f}  "
+            f"p50 {row['p50_ms']:8.3f}ms  p95 {row['p95_ms']:8.3f}ms"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--spread", type=float, default=1.5, help="noise around topic centres; higher is harder")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write the report to this file")
+    args = parser.parse_args()
+
+    reports = []
+    for n in args.sizes:
+        report = run(n, args.dim, args.k, args.queries, args.spread, args.seed)
+        print_report(report)
+        reports.append(report)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(reports, f, indent=2)
+        print(f"\nReport written to {args.json}")
@@ -0,0 +1,395 @@
+"""
+Tech Mentor Load Test
+Drives the tech mentor with 10-500 concurrent askers against a backend whose
+Groq client points at fake_llm_server.py, so no quota is spent. For each
+concurrency level it reports throughput, p50/p95/p99 latency (time to first
+token as well for the streaming endpoint), the status mix, how many askers
+got a fallback answer and why, and how saturated the worker was: upstream
+calls in flight against the adaptive limit, breaker state, and concurrency
+seen by the fake upstream.
+
+Every asker sends a distinct question with no_cache=true, so the semantic
+cache and request coalescing don't hide upstream load (--cache to allow them).
+Worker stats come from /health, which reports on whichever worker answers;
+run the backend with one worker (--spawn-backend does) for exact numbers.
+
+Usage (from the backend directory):
+    python benchmarks/tech_mentor_load.py --spawn-backend --workers 1 --threads 8
+    python benchmarks/tech_mentor_load.py --target http://127.0.0.1:5000 --levels 10 50 100
+    python benchmarks/tech_mentor_load.py --spawn-backend --error-rate 0.2 --latency lognormal:2,0.6 --json load.json
+    python benchmarks/tech_mentor_load.py --spawn-backend --mode stream --baseline load.json
+
+Against an already running backend, start it with
+GROQ_BASE_URL=http://127.0.0.1:5056 GROQ_API_KEY=fake; this script serves the
+fake upstream on --fake-port unless --fake-url names one that is already up.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+TOPICS = (
+    "structure a Flask project", "index a MongoDB collection", "debounce a React search box",
+    "pick between REST and GraphQL", "write integration tests", "prepare for a system design interview",
+    "cache API responses", "deploy with Docker", "learn TypeScript", "profile a slow endpoint"
+)
+FAKE_SETTINGS = ("latency", "tokens_per_second", "answer_tokens", "error_rate", "error_statuses",
+                 "hang_rate", "hang_seconds", "drop_rate", "max_concurrency")
+
+
+def get_json(url, timeout=5):
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as resp:
+            return json.loads(resp.read())
+    except urllib.error.HTTPError as e:
+        # /health answers 500 when Mongo is down but still carries the upstream stats
+        return json.loads(e.read() or b"{}")
+
+
+def post_json(url, body, timeout=5):
+    request = urllib.request.Request(url, data=json.dumps(body).encode("utf-8"),
+                                     headers={"Content-Type": "application/json"}, method="POST")
+    with urllib.request.urlopen(request, timeout=timeout) as resp:
+        return json.loads(resp.read())
+
+
+def wait_until_up(url, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            get_json(url, timeout=2)
+            return True
+        except (OSError, ValueError):
+            time.sleep(0.5)
+    return False
+
+
+def start_fake_upstream(port, settings):
+    """Serve fake_llm_server on a background thread; returns (server, base_url)"""
+    from werkzeug.serving import make_server
+    import fake_llm_server
+
+    app = fake_llm_server.create_app(fake_llm_server.FakeLLM(settings, seed=0))
+    server = make_server("127.0.0.1", port, app, threaded=True)
+    threading.Thread(target=server.serve_forever, name="fake-llm", daemon=True).start()
+    return server, f"http://127.0.0.1:{port}"
+
+
+def spawn_backend(args, fake_url):
+    """Start gunicorn with the backend pointed at the fake upstream; returns (process, base_url)"""
+    env = dict(
+        os.environ,
+        GROQ_BASE_URL=fake_url,
+        GROQ_API_KEY="fake",
+        GUNICORN_BIND=f"127.0.0.1:{args.port}",
+        GUNICORN_WORKERS=str(args.workers),
+        GUNICORN_THREADS=str(args.threads),
+        GUNICORN_TIMEOUT=str(int(args.client_timeout) + 30)
+    )
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "--worker-class", "gthread", "wsgi:app"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT
+    )
+    return process, f"http://127.0.0.1:{args.port}"
+
+
+def ask(target, mode, query, use_cache, timeout):
+    """One question; returns a sample dict with latency, time to first token, status and fallback reason"""
+    body = {"query": query}
+    if not use_cache:
+        body["no_cache"] = True
+    path = "/student/api/tech-mentor/stream" if mode == "stream" else "/student/api/tech-mentor"
+    request = urllib.request.Request(target + path, data=json.dumps(body).encode("utf-8"),
+                                     headers={"Content-Type": "application/json"}, method="POST")
+    sample = {"status": None, "fallback": None, "ttft": None}
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as resp:
+            sample["status"] = resp.status
+            if mode == "stream":
+                event = None
+                for raw in resp:
+                    line = raw.decode("utf-8").strip()
+                    if line.startswith("event:"):
+                        event = line[6:].strip()
+                    elif line.startswith("data:") and event == "token" and sample["ttft"] is None:
+                        sample["ttft"] = time.perf_counter() - started
+                    elif line.startswith("data:") and event == "error":
+                        sample["fallback"] = json.loads(line[5:]).get("reason") or "upstream_error"
+                    elif line.startswith("data:") and event == "done":
+                        break
+                if event not in ("done", "error"):
+                    sample["fallback"] = "stream_incomplete"
+            else:
+                payload = json.loads(resp.read())
+                if not payload.get("success"):
+                    sample["fallback"] = payload.get("reason") or "upstream_error"
+    except urllib.error.HTTPError as e:
+        sample["status"] = e.code
+        try:
+            payload = json.loads(e.read())
+        except ValueError:
+            payload = {}
+        sample["fallback"] = payload.get("reason") or {
+            503: "unavailable", 500: "upstream_error", 429: "backend_rate_limited"
+        }.get(e.code, f"http_{e.code}")
+    except Exception as e:
+        sample["status"] = "client_error"
+        sample["fallback"] = "timeout" if "timed out" in str(e) else "connection_error"
+    sample["latency"] = time.perf_counter() - started
+    return sample
+
+
+class Monitor:
+    """Samples backend upstream stats and the fake upstream's concurrency while a level runs"""
+
+    def __init__(self, target, fake_url, interval=0.5):
+        self.target = target
+        self.fake_url = fake_url
+        self.interval = interval
+        self.samples = []
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="load-monitor", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            sample = {}
+            try:
+                upstream = get_json(self.target + "/health", timeout=2).get("llm_upstream") or {}
+                limiter = upstream.get("limiter", {})
+                sample.update(inflight=limiter.get("inflight"), limit=limiter.get("limit"),
+                              breaker=upstream.get("breaker", {}).get("state"))
+            except (OSError, ValueError):
+                sample["health_error"] = True
+            try:
+                sample["fake_inflight"] = get_json(self.fake_url + "/metrics", timeout=2).get("inflight")
+            except (OSError, ValueError):
+                pass
+            self.samples.append(sample)
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self.summary()
+
+    def summary(self):
+        def values(key):
+            return [s[key] for s in self.samples if isinstance(s.get(key), (int, float))]
+
+        inflight, limits, fake = values("inflight"), values("limit"), values("fake_inflight")
+        breaker = Counter(s.get("breaker") for s in self.samples if s.get("breaker"))
+        return {
+            "worker_inflight_mean": round(float(np.mean(inflight)), 2) if inflight else None,
+            "worker_inflight_max": max(inflight) if inflight else None,
+            "limit_min": min(limits) if limits else None,
+            "limit_max": max(limits) if limits else None,
+            # Share of samples with every limiter slot taken: the worker is holding all the upstream calls it will
+            "saturated_share": round(sum(1 for s in self.samples if s.get("inflight") is not None and s.get("limit")
+                                         and s["inflight"] >= s["limit"]) / len(self.samples), 3)
+            if self.samples else None,
+            "breaker_open_share": round((breaker.get("open", 0) + breaker.get("half_open", 0)) / sum(breaker.values()), 3)
+            if breaker else None,
+            "upstream_inflight_max": max(fake) if fake else None,
+            "health_errors": sum(1 for s in self.samples if s.get("health_error"))
+        }
+
+
+def ms(samples, q):
+    return round(float(np.percentile(samples, q) * 1000), 1) if samples else None
+
+
+def run_level(concurrency, args, target, fake_url):
+    """Hold `concurrency` askers busy for args.duration seconds; returns the level's report"""
+    get_json(fake_url + "/metrics?reset=true")
+    monitor = Monitor(target, fake_url, args.sample_interval)
+    monitor.start()
+
+    samples = []
+    lock = threading.Lock()
+    deadline = time.monotonic() + args.duration
+
+    def asker(user):
+        i = 0
+        while time.monotonic() < deadline:
+            query = f"[load {concurrency}/{user}/{i}] How should I {TOPICS[(user + i) % len(TOPICS)]}?"
+            sample = ask(target, args.mode, query, args.cache, args.client_timeout)
+            with lock:
+                samples.append(sample)
+            i += 1
+            # A student told the mentor is busy waits before asking again rather than retrying at once
+            pause = args.fallback_wait if sample["fallback"] else args.think_time
+            if pause:
+                time.sleep(pause)
+
+    started = time.monotonic()
+    threads = [threading.Thread(target=asker, args=(user,), daemon=True) for user in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(args.duration + args.client_timeout + 5)
+    elapsed = time.monotonic() - started
+    worker = monitor.stop()
+    upstream = get_json(fake_url + "/metrics")
+
+    latencies = [s["latency"] for s in samples]
+    answered = [s["latency"] for s in samples if s["fallback"] is None]
+    ttft = [s["ttft"] for s in samples if s["ttft"] is not None]
+    fallbacks = Counter(s["fallback"] for s in samples if s["fallback"])
+    return {
+        "concurrency": concurrency,
+        "requests": len(samples),
+        "elapsed_s": round(elapsed, 2),
+        "throughput_rps": round(len(samples) / elapsed, 2) if elapsed else None,
+        "goodput_rps": round(len(answered) / elapsed, 2) if elapsed else None,
+        "p50_ms": ms(latencies, 50),
+        "p95_ms": ms(latencies, 95),
+        "p99_ms": ms(latencies, 99),
+        "answered_p95_ms": ms(answered, 95),
+        "ttft_p50_ms": ms(ttft, 50),
+        "ttft_p95_ms": ms(ttft, 95),
+        "statuses": {str(k): v for k, v in Counter(s["status"] for s in samples).items()},
+        "fallback_rate": round(sum(fallbacks.values()) / len(samples), 4) if samples else None,
+        "fallbacks": dict(fallbacks),
+        "worker": worker,
+        "upstream": {k: upstream.get(k) for k in ("requests", "peak_inflight", "errors_injected",
+                                                  "rate_limited", "hung", "dropped")}
+    }
+
+
+def saturation_point(levels, gain=1.1):
+    """First level where more askers stopped buying at least `gain`x goodput, or None"""
+    for previous, current in zip(levels, levels[1:]):
+        if previous["goodput_rps"] and current["goodput_rps"] < previous["goodput_rps"] * gain:
+            return previous["concurrency"]
+    return None
+
+
+def print_level(level, baseline=None):
+    worker = level["worker"]
+    ttft = f"  ttft p95 {level['ttft_p95_ms']}ms" if level["ttft_p95_ms"] is not None else ""
+    print(
+        f"  {level['concurrency']:>4} askers  {level['throughput_rps']:7.2f} req/s  good {level['goodput_rps']:7.2f}/s  "
+        f"p50 {level['p50_ms']}ms  p95 {level['p95_ms']}ms  p99 {level['p99_ms']}ms{ttft}  "
+        f"fallback {level['fallback_rate']:.1%}"
+    )
+    print(
+        f"       worker inflight mean {worker['worker_inflight_mean']} max {worker['worker_inflight_max']} "
+        f"limit {worker['limit_min']}-{worker['limit_max']} saturated {worker['saturated_share']} "
+        f"breaker open {worker['breaker_open_share']}  upstream peak {level['upstream']['peak_inflight']}"
+    )
+    if level["fallbacks"]:
+        print(f"       fallbacks: {', '.join(f'{k} {v}' for k, v in sorted(level['fallbacks'].items()))}")
+    if baseline:
+        deltas = []
+        for key in ("goodput_rps", "p95_ms", "p99_ms"):
+            if baseline.get(key) and level.get(key) is not None:
+                deltas.append(f"{key} {100.0 * (level[key] - baseline[key]) / baseline[key]:+.1f}%")
+        if baseline.get("fallback_rate") is not None:
+            deltas.append(f"fallback_rate {level['fallback_rate'] - baseline['fallback_rate']:+.4f}")
+        print(f"       vs baseline: {', '.join(deltas)}")
+
+
+def environment():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, timeout=10
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {"commit": commit, "python": platform.python_version(), "platform": platform.platform(),
+            "cpus": os.cpu_count()}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--levels", type=int, nargs="+", default=[10, 25, 50, 100, 250, 500])
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds per level")
+    parser.add_argument("--mode", choices=("json", "stream"), default="json")
+    parser.add_argument("--think-time", type=float, default=0.0, help="pause between an asker's questions")
+    parser.add_argument("--fallback-wait", type=float, default=1.0, help="pause after a fallback answer")
+    parser.add_argument("--client-timeout", type=float, default=120.0)
+    parser.add_argument("--cache", action="store_true", help="let the semantic cache and coalescing answer")
+    parser.add_argument("--sample-interval", type=float, default=0.5)
+    parser.add_argument("--target", help="base URL of a running backend (already pointed at the fake upstream)")
+    parser.add_argument("--spawn-backend", action="store_true", help="start gunicorn pointed at the fake upstream")
+    parser.add_argument("--port", type=int, default=5099, help="port for --spawn-backend")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--fake-url", help="use this running fake_llm_server instead of starting one")
+    parser.add_argument("--fake-port", type=int, default=5056)
+    parser.add_argument("--latency", help="fake upstream time to first token, e.g. lognormal:0.8,0.5")
+    parser.add_argument("--tokens-per-second", type=float)
+    parser.add_argument("--answer-tokens", help="fake answer length distribution, e.g. uniform:150,600")
+    parser.add_argument("--error-rate", type=float)
+    parser.add_argument("--error-statuses")
+    parser.add_argument("--hang-rate", type=float)
+    parser.add_argument("--hang-seconds", type=float)
+    parser.add_argument("--drop-rate", type=float)
+    parser.add_argument("--max-concurrency", type=int, help="fake provider rate limit on concurrent calls")
+    parser.add_argument("--json", help="write the report to this file")
+    parser.add_argument("--baseline", help="earlier --json report to compare against")
+    args = parser.parse_args()
+    if not args.target and not args.spawn_backend:
+        parser.error("give --target or --spawn-backend")
+
+    settings = {key: getattr(args, key) for key in FAKE_SETTINGS if getattr(args, key) is not None}
+    fake_server = None
+    if args.fake_url:
+        fake_url = args.fake_url.rstrip("/")
+        if settings:
+            post_json(fake_url + "/config", settings)
+    else:
+        fake_server, fake_url = start_fake_upstream(args.fake_port, settings)
+
+    backend = None
+    target = (args.target or "").rstrip("/")
+    if args.spawn_backend:
+        backend, target = spawn_backend(args, fake_url)
+        if not wait_until_up(target + "/health", 120):
+            backend.terminate()
+            sys.exit("Backend did not come up; is gunicorn installed?")
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = {level["concurrency"]: level for level in json.load(f)["levels"]}
+
+    print(f"Target {target} ({args.mode}), fake upstream {fake_url}: {get_json(fake_url + '/config')}")
+    output = {"environment": environment(), "params": vars(args), "levels": []}
+    try:
+        for concurrency in args.levels:
+            level = run_level(concurrency, args, target, fake_url)
+            print_level(level, baseline.get(concurrency))
+            output["levels"].append(level)
+    finally:
+        if backend is not None:
+            backend.terminate()
+            backend.wait(30)
+        if fake_server is not None:
+            fake_server.shutdown()
+
+    output["saturation_concurrency"] = saturation_point(output["levels"])
+    if output["saturation_concurrency"]:
+        print(f"\nGoodput stops scaling after {output['saturation_concurrency']} askers")
+    else:
+        print("\nGoodput was still scaling at the largest level tested")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(output, f, indent=2)
+        print(f"Report written to {args.json}")
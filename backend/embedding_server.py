@@ -0,0 +1,56 @@
+"""
+Embedding Sidecar
+Runs the micro-batching embedding service as a local HTTP process so that all
+backend workers share one set of model weights and one batching queue.
+
+Start it next to the backend and point the backend at it:
+    python embedding_server.py
+    EMBED_SERVICE_MODE=sidecar EMBED_SERVICE_URL=http://127.0.0.1:5055 gunicorn -c gunicorn.conf.py wsgi:app
+"""
+import logging
+import os
+
+from flask import Flask, jsonify, request
+
+from app.utils.embedding_service import EmbeddingService, pack_vectors
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+app = Flask(__name__)
+
+service = EmbeddingService(
+    mode=os.getenv("EMBED_SIDECAR_MODE", "process"),
+    workers=int(os.getenv("EMBED_SERVICE_WORKERS", "1")),
+    max_batch=int(os.getenv("EMBED_SERVICE_MAX_BATCH", "64")),
+    max_wait_ms=float(os.getenv("EMBED_SERVICE_MAX_WAIT_MS", "5"))
+)
+
+
+@app.route('/encode', methods=['POST'])
+def encode():
+    data = request.get_json(silent=True) or {}
+    texts = data.get("texts")
+    if not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
+        return jsonify({"error": "texts must be a list of strings"}), 400
+    try:
+        return jsonify(pack_vectors(service.encode(texts))), 200
+    except Exception as e:
+        logger.error(f"Encode failed: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return jsonify(service.stats()), 200
+
+
+if __name__ == "__main__":
+    service.start()
+    host = os.getenv("EMBED_SIDECAR_HOST", "127.0.0.1")
+    port = int(os.getenv("EMBED_SIDECAR_PORT", "5055"))
+    logger.info(f"Embedding sidecar listening on http://{host}:{port}")
+    app.run(host=host, port=port, threaded=True)
@@ -0,0 +1,325 @@
+"""
+Fake LLM Server
+Local stand-in for the Groq chat-completions API so the tech mentor can be
+load-tested without spending quota. Serves the OpenAI-compatible
+/openai/v1/chat/completions endpoint the groq client calls, as plain JSON or
+as streamed chunks, with configurable latency, generation speed and faults.
+
+Settings come from environment variables and can be changed while running
+with POST /config (same names, lower case, without the prefix):
+    FAKE_LLM_LATENCY            time to first token, a distribution:
+                                "fixed:0.5", "uniform:0.2,1.5",
+                                "lognormal:0.8,0.6" (median, sigma),
+                                "exponential:0.5" (mean)
+    FAKE_LLM_TOKENS_PER_SECOND  generation rate once started (0 = instant)
+    FAKE_LLM_ANSWER_TOKENS      answer length in tokens, a distribution as above
+    FAKE_LLM_ERROR_RATE         fraction of calls answered with an error status
+    FAKE_LLM_ERROR_STATUSES     statuses to pick from, e.g. "429,500,503"
+    FAKE_LLM_HANG_RATE          fraction of calls that never answer, to exercise client timeouts
+    FAKE_LLM_HANG_SECONDS       how long a hung call holds its connection
+    FAKE_LLM_DROP_RATE          fraction of streams cut off halfway
+    FAKE_LLM_MAX_CONCURRENCY    calls beyond this many in flight get 429 (0 = unlimited)
+
+Run it and point the backend at it:
+    python fake_llm_server.py
+    GROQ_BASE_URL=http://127.0.0.1:5056 GROQ_API_KEY=fake python run.py
+"""
+import json
+import logging
+import math
+import os
+import random
+import threading
+import time
+import uuid
+
+from flask import Flask, Response, jsonify, request
+
+logger = logging.getLogger(__name__)
+
+WORDS = (
+    "the", "service", "request", "cache", "index", "query", "thread", "process", "latency", "database",
+    "function", "returns", "value", "should", "because", "when", "then", "you", "can", "use", "a", "an",
+    "React", "Flask", "Python", "deploy", "test", "design", "pattern", "scale", "worker", "queue"
+)
+
+DEFAULTS = {
+    "latency": "lognormal:0.8,0.5",
+    "tokens_per_second": 250.0,
+    "answer_tokens": "uniform:150,600",
+    "error_rate": 0.0,
+    "error_statuses": "500,503",
+    "hang_rate": 0.0,
+    "hang_seconds": 600.0,
+    "drop_rate": 0.0,
+    "max_concurrency": 0
+}
+
+
+def parse_distribution(spec):
+    """A sampler rng -> float for specs like "fixed:1", "uniform:a,b", "lognormal:median,sigma", "exponential:mean" """
+    kind, _, args = str(spec).partition(":")
+    if not args:
+        kind, args = "fixed", kind
+    params = [float(arg) for arg in args.split(",") if arg.strip()]
+    kind = kind.strip().lower()
+    if kind == "fixed" and len(params) == 1:
+        return lambda rng: params[0]
+    if kind == "uniform" and len(params) == 2:
+        return lambda rng: rng.uniform(params[0], params[1])
+    if kind == "lognormal" and len(params) == 2:
+        return lambda rng: rng.lognormvariate(math.log(params[0]), params[1])
+    if kind == "exponential" and len(params) == 1:
+        return lambda rng: rng.expovariate(1.0 / params[0]) if params[0] > 0 else 0.0
+    raise ValueError(f"Unrecognised distribution '{spec}'")
+
+
+def config_from_env():
+    config = {}
+    for key, default in DEFAULTS.items():
+        raw = os.getenv(f"FAKE_LLM_{key.upper()}")
+        config[key] = default if raw is None else type(default)(raw)
+    return config
+
+
+class FakeLLM:
+    """Fault-injecting chat-completions responder with counters"""
+
+    def __init__(self, config=None, seed=None):
+        self._lock = threading.Lock()
+        self._rng = random.Random(seed)
+        self.config = dict(DEFAULTS)
+        self.configure(config or {})
+        self._inflight = 0
+        self.reset_stats()
+
+    def configure(self, changes):
+        """Apply setting changes, validating them first; returns the full configuration"""
+        config = dict(self.config)
+        for key, value in changes.items():
+            if key not in DEFAULTS:
+                raise ValueError(f"Unknown setting '{key}'")
+            config[key] = type(DEFAULTS[key])(value)
+        latency = parse_distribution(config["latency"])
+        answer_tokens = parse_distribution(config["answer_tokens"])
+        statuses = [int(status) for status in str(config["error_statuses"]).split(",") if status.strip()]
+        with self._lock:
+            self.config = config
+            self._latency = latency
+            self._answer_tokens = answer_tokens
+            self._statuses = statuses or [500]
+        return dict(config)
+
+    def reset_stats(self):
+        with self._lock:
+            self.requests = 0
+            self.streamed = 0
+            self.completed = 0
+            self.errors_injected = 0
+            self.rate_limited = 0
+            self.hung = 0
+            self.dropped = 0
+            self.tokens_sent = 0
+            self.peak_inflight = self._inflight
+
+    def stats(self):
+        with self._lock:
+            return {
+                "inflight": self._inflight,
+                "peak_inflight": self.peak_inflight,
+                "requests": self.requests,
+                "streamed": self.streamed,
+                "completed": self.completed,
+                "errors_injected": self.errors_injected,
+                "rate_limited": self.rate_limited,
+                "hung": self.hung,
+                "dropped": self.dropped,
+                "tokens_sent": self.tokens_sent,
+                "config": dict(self.config)
+            }
+
+    def enter(self):
+        """Admit one call: returns None to proceed, or an error status to answer with"""
+        with self._lock:
+            self.requests += 1
+            limit = self.config["max_concurrency"]
+            if limit and self._inflight >= limit:
+                self.rate_limited += 1
+                return 429
+            self._inflight += 1
+            self.peak_inflight = max(self.peak_inflight, self._inflight)
+            return None
+
+    def leave(self):
+        with self._lock:
+            self._inflight -= 1
+
+    def plan(self):
+        """Decide this call's fate up front: (fault, status, delay, tokens)"""
+        with self._lock:
+            rng = self._rng
+            config = self.config
+            roll = rng.random()
+            delay = max(0.0, self._latency(rng))
+            tokens = max(1, int(self._answer_tokens(rng)))
+            if roll < config["error_rate"]:
+                self.errors_injected += 1
+                return "error", rng.choice(self._statuses), delay, tokens
+            if roll < config["error_rate"] + config["hang_rate"]:
+                self.hung += 1
+                return "hang", None, config["hang_seconds"], tokens
+            if rng.random() < config["drop_rate"]:
+                return "drop", None, delay, tokens
+            return None, None, delay, tokens
+
+    def words(self, count):
+        with self._lock:
+            return [self._rng.choice(WORDS) for _ in range(count)]
+
+    def generation_seconds(self, tokens):
+        rate = self.config["tokens_per_second"]
+        return tokens / rate if rate > 0 else 0.0
+
+    def record_drop(self):
+        with self._lock:
+            self.dropped += 1
+
+    def count_tokens(self, count, streamed=False):
+        with self._lock:
+            self.tokens_sent += count
+            self.completed += 1
+            if streamed:
+                self.streamed += 1
+
+
+def error_response(status, message):
+    kind = "rate_limit_exceeded" if status == 429 else "server_error"
+    response = jsonify({"error": {"message": message, "type": kind, "code": kind}})
+    if status == 429:
+        response.headers["Retry-After"] = "1"
+    return response, status
+
+
+def prompt_tokens(messages):
+    # Rough count for the usage block; about four characters per token
+    return sum(len(str(message.get("content", ""))) // 4 + 4 for message in messages or [])
+
+
+def create_app(fake=None):
+    fake = fake or FakeLLM(config_from_env(), seed=os.getenv("FAKE_LLM_SEED"))
+    app = Flask(__name__)
+    app.config["FAKE_LLM"] = fake
+
+    @app.route('/openai/v1/chat/completions', methods=['POST'])
+    @app.route('/v1/chat/completions', methods=['POST'])
+    def chat_completions():
+        body = request.get_json(silent=True) or {}
+        status = fake.enter()
+        if status:
+            return error_response(status, "Too many concurrent requests (fake rate limit)")
+
+        fault, status, delay, tokens = fake.plan()
+        tokens = min(tokens, int(body.get("max_tokens") or tokens))
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        model = body.get("model", "fake-model")
+        created = int(time.time())
+
+        if not body.get("stream"):
+            try:
+                time.sleep(delay)
+                if fault == "error":
+                    return error_response(status, "Injected upstream error")
+                time.sleep(fake.generation_seconds(tokens))
+                fake.count_tokens(tokens)
+                prompt = prompt_tokens(body.get("messages"))
+                return jsonify({
+                    "id": completion_id,
+                    "object": "chat.completion",
+                    "created": created,
+                    "model": model,
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": " ".join(fake.words(tokens))},
+                        "finish_reason": "stop"
+                    }],
+                    "usage": {"prompt_tokens": prompt, "completion_tokens": tokens, "total_tokens": prompt + tokens}
+                }), 200
+            finally:
+                fake.leave()
+
+        # Errors on a streamed call are still plain HTTP errors, as with the real API
+        if fault == "error":
+            try:
+                time.sleep(delay)
+            finally:
+                fake.leave()
+            return error_response(status, "Injected upstream error")
+
+        def chunk(delta, finish_reason=None):
+            return "data: " + json.dumps({
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+            }) + "\n\n"
+
+        def generate():
+            try:
+                time.sleep(delay)
+                yield chunk({"role": "assistant", "content": ""})
+                # Batch tokens into chunks at most every 20ms so high rates don't cost a write per token
+                per_chunk = max(1, int(fake.config["tokens_per_second"] * 0.02))
+                interval = fake.generation_seconds(per_chunk)
+                stop_at = tokens // 2 if fault == "drop" else tokens
+                sent = 0
+                while sent < stop_at:
+                    count = min(per_chunk, stop_at - sent)
+                    yield chunk({"content": " ".join(fake.words(count)) + " "})
+                    sent += count
+                    if interval:
+                        time.sleep(interval)
+                if fault == "drop":
+                    fake.record_drop()
+                    # Ending the response without [DONE] looks like a dropped connection to the client
+                    return
+                yield chunk({}, finish_reason="stop")
+                yield "data: [DONE]\n\n"
+                fake.count_tokens(sent, streamed=True)
+            finally:
+                fake.leave()
+
+        return Response(generate(), mimetype="text/event-stream")
+
+    @app.route('/config', methods=['GET', 'POST'])
+    def config():
+        if request.method == 'GET':
+            return jsonify(fake.config), 200
+        try:
+            return jsonify(fake.configure(request.get_json(silent=True) or {})), 200
+        except (TypeError, ValueError) as e:
+            return jsonify({"error": str(e)}), 400
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        """Counters since the last reset; ?reset=true starts a new measurement window"""
+        stats = fake.stats()
+        if request.args.get("reset", "").lower() in ("true", "1", "t"):
+            fake.reset_stats()
+        return jsonify(stats), 200
+
+    return app
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    # Per-request access logs would dominate the output under load
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    app = create_app()
+    host = os.getenv("FAKE_LLM_HOST", "127.0.0.1")
+    port = int(os.getenv("FAKE_LLM_PORT", "5056"))
+    logger.info(f"Fake LLM listening on http://{host}:{port} with {app.config['FAKE_LLM'].config}")
+    app.run(host=host, port=port, threaded=True)
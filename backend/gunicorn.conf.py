@@ -0,0 +1,35 @@
+# Gunicorn settings for serving the backend with the embedding model preloaded
+import os
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:5000")
+workers = int(os.getenv("GUNICORN_WORKERS", "4"))
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+
+# Import wsgi.py (and load the model) once in the master before forking workers
+preload_app = True
+
+
+def post_fork(server, worker):
+    # Inline mode reuses the model preloaded by the master; a process pool can't be
+    # inherited across fork, so in that mode each worker starts its own
+    from app.utils import embedding_service
+    from app.routes.matching import match_table, opportunity_index, start_mentor_index
+    from app.routes.student import tech_mentor_jobs
+    from app.routes.opportunity import opportunity_search
+    embedding_service.warmup()
+    # Every worker runs the loop; a Mongo lease lets only one of them do the work
+    match_table.start()
+    # Picks up tech mentor jobs left behind by a worker that died
+    tech_mentor_jobs.start()
+    # Each worker builds its own search index and follows changes from Mongo
+    opportunity_search.start()
+    # Recommendation and mentor indexes: built and rescanned off the request path
+    opportunity_index.start()
+    start_mentor_index()
+
+
+def worker_exit(server, worker):
+    # Write out batched log entries before the worker goes away
+    from app.utils import write_behind
+    write_behind.flush_all()
@@ -38,6 +38,22 @@ if __name__ == "__main__":
     # Initialize database with sample data if needed
     with app.app_context():
         init_db()
+
+    # Get embedding inference ready in the background so startup isn't blocked
+    # and start the match table worker, the tech mentor job sweeper, the
+    # opportunity search index, the recommendation index and the mentor index
+    # (only in the reloader's child process, which is the one serving requests)
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        from app.utils import embedding_service
+        from app.routes.matching import match_table, opportunity_index, start_mentor_index
+        from app.routes.student import tech_mentor_jobs
+        from app.routes.opportunity import opportunity_search
+        embedding_service.warmup()
+        match_table.start()
+        tech_mentor_jobs.start()
+        opportunity_search.start()
+        opportunity_index.start()
+        start_mentor_index()
     
     logger.info("================================")
     logger.info("Starting EduSpark Backend Server")
@@ -1,11 +1,16 @@
+"""
+Seed the mentors collection.
+
+    python seed_mentors.py                                 # the sample mentors, if the collection is empty
+    python seed_mentors.py --synthetic 10000 --students 500
+
+The synthetic generators are also used by benchmarks/matching_benchmark.py.
+"""
 from pymongo import MongoClient
 from bson import ObjectId
+import argparse
 import datetime
-
-# Connect to MongoDB
-client = MongoClient("mongodb://localhost:27017/")
-db = client["eduspark"]
-mentors_collection = db["mentors"]
+import random
 
 # Sample mentor data
 sample_mentors = [
@@ -75,16 +80,134 @@ sample_mentors = [
     }
 ]
 
-# Check if collection is empty before inserting
-if mentors_collection.count_documents({}) == 0:
-    mentors_collection.insert_many(sample_mentors)
-    print(f"Inserted {len(sample_mentors)} sample mentors")
-else:
-    print("Mentors collection already contains data. Skipping insertion.")
-    
-    # Display existing mentors
-    print("\nExisting mentors:")
-    for mentor in mentors_collection.find():
-        print(f"ID: {mentor.get('_id')}, Name: {mentor.get('name')}, Email: {mentor.get('email')}")
-
-print("\nDone!") 
\ No newline at end of file
+# Related skills grouped by domain; generated profiles mostly stay within one domain
+DOMAINS = {
+    "Technology": ["Machine Learning", "Data Science", "Python", "Deep Learning", "NLP", "Computer Vision",
+                   "TensorFlow", "PyTorch", "Statistics", "MLOps"],
+    "Software": ["Web Development", "Frontend", "React", "JavaScript", "TypeScript", "Node.js", "CSS",
+                 "UI/UX", "GraphQL", "Next.js"],
+    "Mobile": ["Mobile Development", "iOS", "Swift", "Android", "Kotlin", "Flutter", "React Native",
+               "App Store Optimization"],
+    "Startups": ["Entrepreneurship", "Business Development", "Startup", "Fundraising", "Pitching",
+                 "Product Management", "Go-to-Market", "Growth"],
+    "Cloud": ["Cloud Computing", "AWS", "DevOps", "Kubernetes", "Docker", "Terraform", "CI/CD",
+              "Site Reliability"],
+    "Security": ["Cybersecurity", "Penetration Testing", "Cryptography", "Network Security",
+                 "Incident Response", "Compliance"],
+    "Data": ["Data Engineering", "SQL", "Spark", "Airflow", "Data Warehousing", "ETL", "Kafka", "dbt"],
+    "Design": ["Product Design", "Figma", "User Research", "Interaction Design", "Design Systems",
+               "Prototyping"],
+}
+AVAILABILITY = ["Weekends", "Evenings", "Weekdays", "Flexible"]
+FIRST_NAMES = ["Alex", "Sam", "Priya", "Wei", "Maria", "Omar", "Lena", "Kofi", "Yuki", "Diego"]
+LAST_NAMES = ["Smith", "Patel", "Chen", "Garcia", "Okafor", "Muller", "Kim", "Silva", "Novak", "Haddad"]
+
+
+def _pick_skills(rng, low, high):
+    domain = rng.choice(list(DOMAINS))
+    skills = rng.sample(DOMAINS[domain], rng.randint(low, high))
+    # Some profiles cross over into a second domain
+    if rng.random() < 0.3:
+        skills.append(rng.choice(DOMAINS[rng.choice(list(DOMAINS))]))
+    return domain, list(dict.fromkeys(skills))
+
+
+def synthetic_mentor(rng, index):
+    domain, expertise = _pick_skills(rng, 2, 4)
+    name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    availability = rng.choice(AVAILABILITY) if rng.random() < 0.5 else rng.sample(AVAILABILITY, 2)
+    now = datetime.datetime.now()
+    return {
+        "_id": ObjectId(),
+        "name": name,
+        "email": f"mentor{index}@example.com",
+        "expertise": expertise,
+        "skills": rng.sample(DOMAINS[domain], 3),
+        "bio": f"{domain} mentor focused on {expertise[0]}",
+        "title": f"Senior {expertise[0]} Specialist",
+        "industry": domain,
+        "years_experience": rng.randint(2, 25),
+        "availability": availability,
+        "rating": round(rng.uniform(2.5, 5.0), 1) if rng.random() < 0.85 else 0,
+        "profile_image": "default-mentor.jpg",
+        "created_at": now,
+        "updated_at": now
+    }
+
+
+def synthetic_mentors(n, seed=0):
+    """n generated mentor documents, reproducible for a given seed"""
+    rng = random.Random(seed)
+    for index in range(n):
+        yield synthetic_mentor(rng, index)
+
+
+def synthetic_student(rng, index):
+    _, interests = _pick_skills(rng, 1, 3)
+    _, skills = _pick_skills(rng, 1, 3)
+    return {
+        "_id": ObjectId(),
+        "fullName": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+        "email": f"student{index}@example.com",
+        "interests": interests,
+        "skills": skills,
+        "enrolled_courses": [],
+        "mentors": []
+    }
+
+
+def synthetic_students(n, seed=0):
+    """n generated student documents, reproducible for a given seed"""
+    rng = random.Random(seed + 1)
+    for index in range(n):
+        yield synthetic_student(rng, index)
+
+
+def insert_batched(collection, docs, batch_size=10000):
+    batch, inserted = [], 0
+    for doc in docs:
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            inserted += len(collection.insert_many(batch, ordered=False).inserted_ids)
+            batch = []
+    if batch:
+        inserted += len(collection.insert_many(batch, ordered=False).inserted_ids)
+    return inserted
+
+
+def seed(db, synthetic=0, students=0, seed_value=0):
+    mentors_collection = db["mentors"]
+
+    # Check if collection is empty before inserting
+    if mentors_collection.count_documents({}) == 0:
+        mentors_collection.insert_many(sample_mentors)
+        print(f"Inserted {len(sample_mentors)} sample mentors")
+    else:
+        print("Mentors collection already contains data. Skipping insertion.")
+
+        # Display existing mentors
+        print("\nExisting mentors:")
+        for mentor in mentors_collection.find().limit(20):
+            print(f"ID: {mentor.get('_id')}, Name: {mentor.get('name')}, Email: {mentor.get('email')}")
+
+    if synthetic:
+        count = insert_batched(mentors_collection, synthetic_mentors(synthetic, seed_value))
+        print(f"Inserted {count} synthetic mentors")
+    if students:
+        count = insert_batched(db["students"], synthetic_students(students, seed_value))
+        print(f"Inserted {count} synthetic students")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seed mentors (and optionally synthetic students)")
+    parser.add_argument("--synthetic", type=int, default=0, help="also insert this many generated mentors")
+    parser.add_argument("--students", type=int, default=0, help="also insert this many generated students")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--uri", default="mongodb://localhost:27017/")
+    args = parser.parse_args()
+
+    # Connect to MongoDB
+    client = MongoClient(args.uri)
+    seed(client["eduspark"], synthetic=args.synthetic, students=args.students, seed_value=args.seed)
+
+    print("\nDone!")
@@ -0,0 +1,32 @@
+"""
+WSGI entry point for pre-fork servers:
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+With preload_app the master imports this module once, loads the embedding
+model, then forks; workers share the model weights copy-on-write instead of
+each loading their own copy. This applies to EMBED_SERVICE_MODE=inline, the
+default; with the process pool (one model copy per worker) or sidecar (one
+copy per host) modes inference lives outside the workers, started per worker
+from gunicorn's post_fork hook. See app/utils/embedding_service.py.
+"""
+import gc
+import logging
+import os
+
+from app import create_app
+from app.utils import embedding_model, embedding_service
+
+logger = logging.getLogger(__name__)
+
+app = create_app()
+
+if (embedding_service.get_service().mode == "inline"
+        and os.getenv("EMBED_MODEL_PRELOAD", "true").lower() in ("true", "1", "t")):
+    try:
+        embedding_model.load_model()
+    except Exception as e:
+        logger.warning(f"Embedding model preload failed, workers will load it on first use: {e}")
+
+# Move everything loaded so far out of the GC's reach so collections in the
+# workers don't touch (and un-share) the master's pages
+gc.freeze()
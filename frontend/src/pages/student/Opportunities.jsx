@@ -26,6 +26,37 @@ function Opportunities() {
   const [error, setError] = useState('');
   const [success, setSuccess] = useState(false);
   const [debugInfo, setDebugInfo] = useState(null);
+  // Cursor for the next page of opportunities (from the X-Next-Cursor header); null when all are loaded
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+  // Filter option counts from /opportunity/facets, e.g. { type: [{ value, count }], skills: [...] }
+  const [facets, setFacets] = useState(null);
+
+  const fetchOpportunityPage = async (cursor) => {
+    const params = new URLSearchParams({ limit: '50' });
+    if (cursor) params.set('cursor', cursor);
+    const response = await fetch(`http://localhost:5000/shared/opportunities?${params}`);
+    if (!response.ok) {
+      throw new Error('Failed to fetch opportunities');
+    }
+    const data = await response.json();
+    setNextCursor(response.headers.get('X-Next-Cursor'));
+    return data;
+  };
+
+  const loadMoreOpportunities = async () => {
+    if (!nextCursor || loadingMore) return;
+    setLoadingMore(true);
+    try {
+      const data = await fetchOpportunityPage(nextCursor);
+      setOpportunities(prev => [...prev, ...data]);
+    } catch (error) {
+      console.error('Error fetching more opportunities:', error);
+      setApiError('Failed to load more opportunities. Please try again later.');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
 
   useEffect(() => {
     // Get user data from localStorage (auth data only)
@@ -37,13 +68,7 @@ function Opportunities() {
     // Fetch opportunities from API
     async function fetchOpportunities() {
       try {
-        const response = await fetch('http://localhost:5000/shared/opportunities');
-        
-        if (!response.ok) {
-          throw new Error('Failed to fetch opportunities');
-        }
-        
-        const data = await response.json();
+        const data = await fetchOpportunityPage(null);
         setOpportunities(data);
         setFilteredOpportunities(data);
       } catch (error) {
@@ -59,6 +84,24 @@ function Opportunities() {
     fetchOpportunities();
   }, []);
 
+  // Refresh the filter counts whenever the selected filters change
+  useEffect(() => {
+    const params = new URLSearchParams();
+    if (filters.types.length > 0) params.set('type', filters.types.join(','));
+    if (filters.location !== 'all') params.set('location', filters.location);
+    if (filters.skills.length > 0) params.set('skills', filters.skills.join(','));
+    fetch(`http://localhost:5000/opportunity/facets?${params}`)
+      .then(response => (response.ok ? response.json() : null))
+      .then(data => setFacets(data ? data.facets : null))
+      .catch(error => console.error('Error fetching filter counts:', error));
+  }, [filters]);
+
+  const facetCount = (field, value) => {
+    if (!facets || !facets[field]) return null;
+    const bucket = facets[field].find(item => item.value === value);
+    return <span className="ml-1 text-xs text-gray-400">({bucket ? bucket.count : 0})</span>;
+  };
+
   // Fetch user applications to check which opportunities the user has already applied for
   useEffect(() => {
     if (user && user.id) {
@@ -166,10 +209,12 @@ function Opportunities() {
     });
   };
 
-  // Get all unique skills from opportunities
-  const allSkills = [...new Set(opportunities
-    .filter(opportunity => opportunity.skills)
-    .flatMap(opportunity => opportunity.skills))];
+  // Skills to filter by: the most common ones across all opportunities, or those loaded so far
+  const allSkills = facets && facets.skills
+    ? facets.skills.map(item => item.value)
+    : [...new Set(opportunities
+      .filter(opportunity => opportunity.skills)
+      .flatMap(opportunity => opportunity.skills))];
 
   // Handle opening the application modal
   const handleOpenApplyModal = (opportunity) => {
@@ -302,6 +347,7 @@ function Opportunities() {
                         className="h-4 w-4 text-primary-600 focus:ring-primary-500 border-gray-300 rounded"
                       />
                       <span className="ml-2 text-sm text-gray-700">{type}</span>
+                      {facetCount('type', type)}
                     </label>
                   ))}
                 </div>
@@ -327,6 +373,7 @@ function Opportunities() {
                       className="h-4 w-4 text-primary-600 focus:ring-primary-500 border-gray-300"
                     />
                     <span className="ml-2 text-sm text-gray-700">Remote</span>
+                    {facetCount('location', 'Remote')}
                   </label>
                   <label className="flex items-center">
                     <input
@@ -336,6 +383,7 @@ function Opportunities() {
                       className="h-4 w-4 text-primary-600 focus:ring-primary-500 border-gray-300"
                     />
                     <span className="ml-2 text-sm text-gray-700">On-site</span>
+                    {facetCount('location', 'On-site')}
                   </label>
                   <label className="flex items-center">
                     <input
@@ -345,6 +393,7 @@ function Opportunities() {
                       className="h-4 w-4 text-primary-600 focus:ring-primary-500 border-gray-300"
                     />
                     <span className="ml-2 text-sm text-gray-700">Hybrid</span>
+                    {facetCount('location', 'Hybrid')}
                   </label>
                 </div>
               </div>
@@ -362,6 +411,7 @@ function Opportunities() {
                           className="h-4 w-4 text-primary-600 focus:ring-primary-500 border-gray-300 rounded"
                         />
                         <span className="ml-2 text-sm text-gray-700">{skill}</span>
+                        {facetCount('skills', skill)}
                       </label>
                     ))}
                   </div>
@@ -427,6 +477,7 @@ function Opportunities() {
                             className="h-4 w-4 text-primary-600 focus:ring-primary-500 border-gray-300 rounded"
                           />
                           <span className="ml-2 text-sm text-gray-700">{type}</span>
+                          {facetCount('type', type)}
                         </label>
                       ))}
                     </div>
@@ -452,6 +503,7 @@ function Opportunities() {
                           className="h-4 w-4 text-primary-600 focus:ring-primary-500 border-gray-300"
                         />
                         <span className="ml-2 text-sm text-gray-700">Remote</span>
+                        {facetCount('location', 'Remote')}
                       </label>
                       <label className="flex items-center">
                         <input
@@ -461,6 +513,7 @@ function Opportunities() {
                           className="h-4 w-4 text-primary-600 focus:ring-primary-500 border-gray-300"
                         />
                         <span className="ml-2 text-sm text-gray-700">On-site</span>
+                        {facetCount('location', 'On-site')}
                       </label>
                       <label className="flex items-center">
                         <input
@@ -470,6 +523,7 @@ function Opportunities() {
                           className="h-4 w-4 text-primary-600 focus:ring-primary-500 border-gray-300"
                         />
                         <span className="ml-2 text-sm text-gray-700">Hybrid</span>
+                        {facetCount('location', 'Hybrid')}
                       </label>
                     </div>
                   </div>
@@ -487,6 +541,7 @@ function Opportunities() {
                               className="h-4 w-4 text-primary-600 focus:ring-primary-500 border-gray-300 rounded"
                             />
                             <span className="ml-2 text-sm text-gray-700">{skill}</span>
+                            {facetCount('skills', skill)}
                           </label>
                         ))}
                       </div>
@@ -622,6 +677,18 @@ function Opportunities() {
                 ))}
               </div>
             )}
+
+            {nextCursor && (
+              <div className="mt-6 text-center">
+                <button
+                  onClick={loadMoreOpportunities}
+                  disabled={loadingMore}
+                  className="px-4 py-2 bg-white border border-gray-300 rounded-md text-sm font-medium text-gray-700 hover:bg-gray-50 disabled:opacity-50"
+                >
+                  {loadingMore ? 'Loading...' : 'Load more opportunities'}
+                </button>
+              </div>
+            )}
           </div>
         </div>
       </div>
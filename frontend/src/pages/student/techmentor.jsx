@@ -5,49 +5,113 @@ const TechMentor = () => {
   const [query, setQuery] = useState('');
   const [response, setResponse] = useState(null);
   const [loading, setLoading] = useState(false);
+  const [streaming, setStreaming] = useState(false);
   const [error, setError] = useState(null);
   const [history, setHistory] = useState([]);
+  // Server-side conversation: earlier turns are sent upstream by the backend, not pasted in by the client
+  const [sessionId, setSessionId] = useState(null);
+
+  const createSession = async () => {
+    const res = await fetch('http://localhost:5000/student/api/tech-mentor/sessions', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({}),
+    });
+    if (!res.ok) throw new Error('Failed to start a tech mentor session');
+    const { data } = await res.json();
+    setSessionId(data.session_id);
+    return data.session_id;
+  };
+
+  const openStream = (askedQuery, activeSession) =>
+    fetch('http://localhost:5000/student/api/tech-mentor/stream', {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+        Accept: 'text/event-stream',
+      },
+      body: JSON.stringify({ query: askedQuery, session_id: activeSession }),
+    });
+
+  const startNewConversation = () => {
+    setSessionId(null);
+    setHistory([]);
+    setResponse(null);
+  };
 
   const handleSubmit = async (event) => {
     event.preventDefault();
     if (!query.trim()) return;
 
+    const askedQuery = query;
     try {
       setLoading(true);
+      setStreaming(true);
       setError(null);
+      setResponse(null);
 
-      const response = await fetch('http://localhost:5000/student/api/tech-mentor', {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-        },
-        body: JSON.stringify({ query }),
-      });
+      // Server-sent events: the answer arrives as 'token' events while it is generated
+      let response = await openStream(askedQuery, sessionId || (await createSession()));
+      if (response.status === 404) {
+        // Session expired on the server; carry on in a fresh one
+        response = await openStream(askedQuery, await createSession());
+      }
 
-      if (!response.ok) {
+      if (!response.ok || !response.body) {
         throw new Error('Failed to get response from tech mentor');
       }
 
-      const data = await response.json();
-
-      if (data.success && data.data) {
-        const newQA = {
-          query,
-          response: data.data.response,
-          timestamp: new Date().toISOString(),
-        };
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      let answer = '';
+      let finished = false;
+
+      while (!finished) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        // Events are separated by a blank line; keep any trailing partial event in the buffer
+        const events = buffer.split('\n\n');
+        buffer = events.pop();
+        for (const raw of events) {
+          let eventName = 'message';
+          let payload = '';
+          for (const line of raw.split('\n')) {
+            if (line.startsWith('event:')) eventName = line.slice(6).trim();
+            else if (line.startsWith('data:')) payload += line.slice(5).trim();
+          }
+          if (!payload) continue;
+          const data = JSON.parse(payload);
+
+          if (eventName === 'token') {
+            answer += data.content;
+            setResponse(answer);
+            setLoading(false);
+          } else if (eventName === 'error') {
+            setResponse(null);
+            throw new Error(data.message || 'Error calling AI API');
+          } else if (eventName === 'done') {
+            finished = true;
+          }
+        }
+      }
 
-        setResponse(data.data.response);
-        setHistory((prevHistory) => [newQA, ...prevHistory]);
-        setQuery('');
-      } else {
+      if (!answer) {
         throw new Error('Invalid response format');
       }
+      setHistory((prevHistory) => [
+        { query: askedQuery, response: answer, timestamp: new Date().toISOString() },
+        ...prevHistory,
+      ]);
+      setQuery('');
     } catch (error) {
       console.error('Error querying tech mentor:', error);
       setError(error.message);
     } finally {
       setLoading(false);
+      setStreaming(false);
     }
   };
 
@@ -457,7 +521,7 @@ const TechMentor = () => {
             <div style={{ textAlign: 'right' }}>
               <button
                 type="submit"
-                disabled={loading}
+                disabled={streaming}
                 style={{
                   background: '#3498DB',
                   color: '#fff',
@@ -466,11 +530,11 @@ const TechMentor = () => {
                   borderRadius: 4,
                   fontWeight: 500,
                   fontSize: 14,
-                  cursor: loading ? 'not-allowed' : 'pointer',
-                  opacity: loading ? 0.7 : 1,
+                  cursor: streaming ? 'not-allowed' : 'pointer',
+                  opacity: streaming ? 0.7 : 1,
                 }}
               >
-                {loading ? 'Thinking...' : 'Ask Tech Mentor'}
+                {streaming ? 'Thinking...' : 'Ask Tech Mentor'}
               </button>
             </div>
           </form>
@@ -582,7 +646,7 @@ const TechMentor = () => {
             >
               <span>Previous Questions ({history.length})</span>
               <button
-                onClick={() => setHistory([])}
+                onClick={startNewConversation}
                 style={{
                   background: 'none',
                   border: 'none',
@@ -591,7 +655,7 @@ const TechMentor = () => {
                   cursor: 'pointer',
                 }}
               >
-                Clear History
+                New Conversation
               </button>
             </h2>
 
@@ -57,10 +57,12 @@ export const mentorAPI = {
   // Mentor connections
   requestConnection: (data) => api.post('/mentor/connections/request', data),
   getUserConnections: (userId, userRole) => api.get(`/mentor/connections/${userId}/${userRole}`),
-  getMentorConnections: (mentorId) => api.get(`/mentor/connections/mentor/${mentorId}`),
+  getMentorConnections: (mentorId, rank = false) =>
+    api.get(`/mentor/connections/mentor/${mentorId}`, rank ? { params: { rank: true } } : undefined),
   updateConnectionStatus: (connectionId, status) => api.put(`/mentor/connections/${connectionId}/status`, { status }),
   // Mentor matching
-  getMatchingMentors: (studentId) => api.post('/match/', { student_id: studentId }),
+  getMatchingMentors: (studentId, filters) =>
+    api.post('/match/', filters ? { student_id: studentId, filters } : { student_id: studentId }),
 };
 
 
@@ -71,6 +73,8 @@ export const studentAPI = {
   createProject: (data) => api.post('/student/projects', data),
   updateProject: (projectId, data) => api.put(`/student/projects/${projectId}`, data),
   deleteProject: (projectId) => api.delete(`/student/projects/${projectId}`),
+  getRecommendedOpportunities: (studentId, page = 1, limit = 20) =>
+    api.get(`/shared/opportunities/recommended/${studentId}`, { params: { page, limit } }),
 };
 
 export const entrepreneurAPI = {